@@ -0,0 +1,6 @@
+"""Building blocks for the Bakery Pro desktop system.
+
+Only ``bakery.widgets`` imports Tk; everything else runs headless.
+"""
+
+BAKERY_NAME = "MayLauren's Artisan Bakeshop"  # window title and report header, shared by the app and the CLI
@@ -0,0 +1,199 @@
+"""Per-product sales series and next-day demand forecasts.
+
+Sales are pre-aggregated to one row per product per hour, one file per
+month: ``analytics/YYYY-MM.npz`` (hour, product, units, revenue), plus the
+byte size of the sales partition it covers. Like the dashboard rollups, a
+refresh only parses what was appended to each partition since, so after the
+first build a multi-year history answers from a few hundred thousand hourly
+rows instead of every ticket.
+
+:meth:`SalesAnalytics.series` pivots the hourly rows to one column per
+product and resamples them to hours, days or weeks in one vectorized pass
+(zero-filled, so quiet hours and days count as zero sales).
+:meth:`SalesAnalytics.forecast` predicts a day's units per product from the
+same weekday of the last few weeks (bakery demand follows the week), either
+as a moving average or with exponential smoothing.
+:meth:`SalesAnalytics.recommend` adds the pending pre-orders for that day to
+give the units to bake.
+
+Tk-free and thread-safe, so it runs on the report pool or headless::
+
+    python -m bakery bake-plan                # tomorrow, for a nightly job
+    python -m bakery sales-series --freq W --out weekly.csv
+"""
+import io
+import os
+import glob
+import threading
+import numpy as np
+import pandas as pd
+
+from bakery.partitions import SALES_COLUMNS, SALES_DIR, UNDATED, month_key
+from bakery.metrics import metrics
+
+ANALYTICS_DIR = "analytics"
+FREQUENCIES = {"h": "h", "D": "D", "W": "W-SUN"}  # hourly, daily, weekly (weeks end on Sunday)
+METHODS = ("ewm", "ma")  # exponential smoothing, moving average
+HISTORY_WEEKS = 8
+ALPHA = 0.3  # smoothing weight of the most recent week
+
+_EMPTY = pd.DataFrame({"Hour": pd.Series(dtype="datetime64[ns]"), "Product": pd.Series(dtype=str),
+                       "Qty": pd.Series(dtype=float), "Total": pd.Series(dtype=float)})
+
+
+def _hourly(df):
+    """Sums sales rows (Date parsed) per hour and product."""
+    df = df.dropna(subset=['Date'])
+    if df.empty:
+        return _EMPTY
+    hours = df['Date'].dt.floor("h").rename("Hour")
+    return (pd.DataFrame({"Qty": pd.to_numeric(df['Qty'], errors='coerce').fillna(0),
+                          "Total": pd.to_numeric(df['Total'], errors='coerce').fillna(0)})
+            .groupby([hours, df['Product'].astype(str)]).sum().reset_index())
+
+
+class SalesAnalytics:
+    def __init__(self, folder="."):
+        self.folder = folder
+        self.dir = os.path.join(folder, ANALYTICS_DIR)
+        self.sales_dir = os.path.join(folder, SALES_DIR)
+        self._months = {}  # "YYYY-MM" -> (sales bytes covered, hourly frame)
+        self._lock = threading.RLock()
+
+    def _path(self, key):
+        return os.path.join(self.dir, f"{key}.npz")
+
+    # ------------------------------------------
+    # HOURLY ROLLUPS
+    # ------------------------------------------
+    def refresh(self, sizes):
+        """Brings the monthly rollups up to ``sizes`` (``store.sales.sizes()``).
+
+        Take ``sizes`` on the thread that records sales; only bytes up to
+        them are read, so a sale being appended meanwhile is left for next time.
+        """
+        with self._lock, metrics.span("analytics refresh", "load"):
+            os.makedirs(self.dir, exist_ok=True)
+            for key, size in sizes.items():
+                if key == UNDATED:
+                    continue
+                done, hourly = self._load(key)
+                if done == size:
+                    continue
+                if done > size:  # partition replaced (restore, rewrite): start over
+                    done, hourly = 0, _EMPTY
+                with open(os.path.join(self.sales_dir, f"{key}.csv"), "rb") as f:
+                    f.seek(done); tail = f.read(size - done)
+                rows = pd.read_csv(io.BytesIO(tail), header=0 if done == 0 else None, names=SALES_COLUMNS)
+                rows['Date'] = pd.to_datetime(rows['Date'], errors='coerce')
+                new = _hourly(rows)
+                if not hourly.empty:
+                    new = pd.concat([hourly, new], ignore_index=True).groupby(["Hour", "Product"]).sum().reset_index()
+                self._save(key, size, new)
+            for path in glob.glob(os.path.join(self.dir, "*.npz")):
+                key = os.path.splitext(os.path.basename(path))[0]
+                if key not in sizes:  # its partition is gone
+                    self._months.pop(key, None)
+                    os.remove(path)
+        return self
+
+    def _load(self, key):
+        if key not in self._months:
+            try:
+                with np.load(self._path(key), allow_pickle=False) as z:
+                    hourly = pd.DataFrame({"Hour": pd.to_datetime(z["hours"], unit="h"), "Product": z["products"][z["codes"]],
+                                           "Qty": z["qty"], "Total": z["total"]})
+                    self._months[key] = (int(z["covered"]), hourly)
+            except (OSError, ValueError, KeyError):
+                return 0, _EMPTY
+        return self._months[key]
+
+    def _save(self, key, covered, hourly):
+        codes, products = pd.factorize(hourly['Product'])
+        tmp = self._path(key) + f".{os.getpid()}.tmp"  # counters sharing the folder may save the same month
+        with open(tmp, "wb") as f:
+            np.savez(f, covered=np.int64(covered), hours=hourly['Hour'].to_numpy(dtype="datetime64[h]").astype(np.int64),
+                     codes=codes.astype(np.int32), products=np.asarray(products, dtype=str),
+                     qty=hourly['Qty'].to_numpy(dtype=float), total=hourly['Total'].to_numpy(dtype=float))
+        os.replace(tmp, self._path(key))
+        self._months[key] = (covered, hourly)
+
+    def hourly(self, start=None, end=None):
+        """Hourly rows (Hour, Product, Qty, Total) in ``[start, end)`` from the rollups already refreshed."""
+        keys = sorted(os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(self.dir, "*.npz")))
+        lo = month_key(start) if start is not None else ""
+        hi = month_key(pd.Timestamp(end) - pd.Timedelta(microseconds=1)) if end is not None else "9999-99"
+        with self._lock:
+            frames = [self._load(k)[1] for k in keys if lo <= k <= hi]
+        df = pd.concat(frames, ignore_index=True) if frames else _EMPTY
+        if start is not None:
+            df = df[df['Hour'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['Hour'] < pd.Timestamp(end)]
+        return df
+
+    # ------------------------------------------
+    # SERIES AND FORECASTS
+    # ------------------------------------------
+    def series(self, freq="D", start=None, end=None, products=None, value="Qty"):
+        """One column per product, one row per hour/day/week (``freq`` "h", "D" or "W"), zero-filled.
+
+        ``value`` is "Qty" (units) or "Total" (revenue). With ``start`` and
+        ``end`` the index covers the whole range even where nothing sold.
+        """
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency {freq!r} (use h, D or W)")
+        df = self.hourly(start, end)
+        if products is not None:
+            df = df[df['Product'].isin(products)]
+        # Days before pivoting for daily/weekly, so a long history never becomes a dense hourly grid
+        step = "h" if freq == "h" else "D"
+        wide = df[value].groupby([df['Hour'].dt.floor(step), df['Product']]).sum().unstack(fill_value=0.0)
+        wide = wide.resample(FREQUENCIES[freq]).sum()
+        if start is not None and end is not None:  # the periods resampling [start, end) gives
+            span = pd.DatetimeIndex([pd.Timestamp(start), pd.Timestamp(end) - pd.Timedelta(microseconds=1)]).floor(step)
+            wide = wide.reindex(pd.Series(0.0, index=span).resample(FREQUENCIES[freq]).sum().index, fill_value=0.0)
+        wide.index.name, wide.columns.name = "Date", None
+        return wide
+
+    def forecast(self, day, method="ewm", weeks=HISTORY_WEEKS, alpha=ALPHA):
+        """Expected units per product on ``day``, from the same weekday of the previous ``weeks`` weeks.
+
+        ``method`` "ma" averages those days; "ewm" smooths them exponentially
+        with weight ``alpha`` on the latest. Weeks before a product's first
+        sale in the window don't count against it.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown forecast method {method!r} (use ewm or ma)")
+        with metrics.span("sales forecast", "compute"):
+            day = pd.Timestamp(day).normalize()
+            daily = self.series("D", day - pd.Timedelta(weeks=weeks), day)
+            same = daily[daily.index.dayofweek == day.dayofweek]
+            same = same.where(same.cumsum() > 0)  # not on sale yet
+            if same.empty:
+                return pd.Series(dtype=float)
+            fc = same.mean() if method == "ma" else same.ewm(alpha=alpha, ignore_na=True).mean().iloc[-1]
+            return fc.fillna(0.0)
+
+    def recommend(self, day, orders, method="ewm", weeks=HISTORY_WEEKS, menu=None):
+        """Units to bake on ``day``: the forecast walk-in demand, rounded up, plus pending pre-orders.
+
+        ``orders`` are the pre-orders picked up that day
+        (:meth:`bakery.planning.ProductionPlanner.orders`); ``menu`` limits
+        the plan to products still sold. Returns Product/Forecast/Pre-orders/Bake, biggest bake first.
+        """
+        fc = self.forecast(day, method, weeks)
+        pending = orders[orders['Total'].astype(str).str.upper().eq("PENDING")]
+        booked = pending.groupby(pending['Product'].astype(str))['Qty'].sum().astype(float)
+        plan = pd.DataFrame({"Forecast": fc, "Pre-orders": booked}).fillna(0.0)
+        if menu is not None:
+            plan = plan[plan.index.isin(list(menu))]
+        plan["Pre-orders"] = plan["Pre-orders"].astype(int)
+        plan["Bake"] = np.ceil(plan["Forecast"].round(6)).astype(int) + plan["Pre-orders"]
+        plan = plan[plan["Bake"] > 0].sort_values(["Bake", "Forecast"], ascending=False, kind="stable")
+        return plan.rename_axis("Product").reset_index()
+
+    def bake_plan(self, sizes, day, orders, method="ewm", menu=None, weeks=HISTORY_WEEKS, task=None):
+        """Worker-pool job: refreshes the rollups, then :meth:`recommend`."""
+        with self._lock:
+            return self.refresh(sizes).recommend(day, orders, method, weeks, menu)
@@ -0,0 +1,264 @@
+"""Incremental, content-addressed backups.
+
+Every backup is a small *set* file (``backups/sets/<timestamp>.json``) that
+lists, per data file, its size, SHA-256 and the chunks it is made of.
+Chunks are gzip-compressed blobs stored once under
+``backups/objects/<aa>/<sha256>.gz``, so an unchanged file costs nothing and
+a grown sales partition only adds its new tail as one more chunk.
+
+Every counter sharing the folder backs up on startup, so writing a set,
+pruning and restoring all hold ``backups/backup.lock``: a prune on one
+counter must not delete the objects another has stored but not yet listed
+in its set file.
+
+:func:`capture` runs on the Tk thread and freezes what the backup will
+contain: the small tables are read into memory there (a consistent view
+across a journal checkpoint), while the append-only sales partitions are
+only sized; the worker reads them up to those sizes. :func:`write_backup`
+does the hashing, compression and pruning and is safe on a worker thread.
+
+Restore with the app closed::
+
+    python -m bakery.backup list
+    python -m bakery.backup restore 2026-10-18_09-30-00
+"""
+import os
+import sys
+import glob
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+
+from bakery.datastore import INVENTORY_FILE, INGREDIENTS_FILE, PREORDER_FILE, RECIPE_FILE
+from bakery.journal import JOURNAL_FILE, PREVIOUS_JOURNAL_FILE
+from bakery.partitions import SALES_DIR, MANIFEST_FILE
+from bakery.rollups import ROLLUP_FILE
+from bakery.snapshot import SNAPSHOT_DIR, META_FILE
+from bakery.stock import MOVEMENTS_DIR
+from bakery.analytics import ANALYTICS_DIR
+from bakery.locking import FolderLock
+from bakery.metrics import metrics
+
+BACKUP_DIR = "backups"
+OBJECTS_DIR = "objects"
+SETS_DIR = "sets"
+BACKUP_LOCK_FILE = "backup.lock"
+BACKUP_LOCK_TIMEOUT = 300.0  # seconds to wait for another counter's backup (hashing a large history is slow)
+BACKUP_FILES = (INVENTORY_FILE, INGREDIENTS_FILE, PREORDER_FILE, RECIPE_FILE, JOURNAL_FILE)
+PARTITIONED_DIRS = (SALES_DIR, MOVEMENTS_DIR)  # append-only monthly CSVs plus a manifest
+RETENTION = {"last": 10, "daily": 14, "monthly": 12}  # newest N, then one per day / per month
+
+_lock = threading.Lock()  # one backup (or prune) at a time in this process; backup.lock covers the others
+
+
+def _rel(*parts):
+    return "/".join(parts)
+
+
+def _partition_rel(dirname, key):
+    return _rel(dirname, f"{key}.csv")
+
+
+def capture(store):
+    """``[(relpath, bytes or None, size)]`` for everything a backup covers.
+
+    Call on the thread that writes the data. Sales and movement partitions
+    are append-only, so recording their size is enough to pin them.
+    """
+    items = []
+    with store.lock:  # a consistent view across every counter sharing the folder
+        for rel in BACKUP_FILES + tuple(_rel(d, MANIFEST_FILE) for d in PARTITIONED_DIRS):
+            path = store.path(rel)
+            if os.path.exists(path):
+                with open(path, "rb") as f: data = f.read()
+                items.append((rel, data, len(data)))
+        for dirname, parts in ((SALES_DIR, store.sales), (MOVEMENTS_DIR, store.movements)):
+            for key, size in parts.sizes().items():
+                items.append((_partition_rel(dirname, key), None, size))
+    return items
+
+
+class BackupStore:
+    def __init__(self, root=BACKUP_DIR, timeout=BACKUP_LOCK_TIMEOUT):
+        self.root = root
+        self.objects = os.path.join(root, OBJECTS_DIR)
+        self.sets = os.path.join(root, SETS_DIR)
+        self.lock = FolderLock(os.path.join(root, BACKUP_LOCK_FILE), timeout=timeout)
+
+    def _locked(self):
+        os.makedirs(self.root, exist_ok=True)
+        return self.lock
+
+    # ------------------------------------------
+    # OBJECTS
+    # ------------------------------------------
+    def _object_path(self, digest):
+        return os.path.join(self.objects, digest[:2], digest + ".gz")
+
+    def put(self, data):
+        """Stores ``data`` once, compressed; returns its SHA-256."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp"
+            with gzip.open(tmp, "wb") as f: f.write(data)
+            os.replace(tmp, path)
+        return digest
+
+    def get(self, digest):
+        with gzip.open(self._object_path(digest), "rb") as f: data = f.read()
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Backup object {digest[:12]} is damaged")
+        return data
+
+    # ------------------------------------------
+    # SETS
+    # ------------------------------------------
+    def names(self):
+        """Backup names, oldest first."""
+        return sorted(os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(self.sets, "*.json")))
+
+    def load(self, name):
+        with open(os.path.join(self.sets, name + ".json"), "r") as f: return json.load(f)
+
+    def _new_name(self, when):
+        base = name = when.strftime("%Y-%m-%d_%H-%M-%S")
+        n = 1
+        while os.path.exists(os.path.join(self.sets, name + ".json")):
+            n += 1
+            name = f"{base}_{n}"  # two backups in the same second
+        return name
+
+    def backup(self, items, folder=".", task=None):
+        """Writes one backup set from :func:`capture` output; returns its name."""
+        with _lock, self._locked(), metrics.span("backup", "write"):
+            os.makedirs(self.sets, exist_ok=True)
+            names = self.names()
+            prev = self.load(names[-1])["files"] if names else {}
+            files = {}
+            for done, (rel, data, size) in enumerate(items, 1):
+                if data is None:
+                    with open(os.path.join(folder, *rel.split("/")), "rb") as f: data = f.read(size)
+                files[rel] = self._entry(data, prev.get(rel))
+                if task is not None:
+                    task.progress(done, len(items))
+            name = self._new_name(datetime.now())
+            path = os.path.join(self.sets, name + ".json")
+            with open(path + ".tmp", "w") as f:
+                json.dump({"created": datetime.now().isoformat(timespec="seconds"), "files": files}, f, indent=1)
+            os.replace(path + ".tmp", path)
+            return name
+
+    def _entry(self, data, prev):
+        digest = hashlib.sha256(data).hexdigest()
+        if prev and prev["sha"] == digest:
+            return prev
+        if prev and prev["size"] < len(data) and hashlib.sha256(data[:prev["size"]]).hexdigest() == prev["sha"]:
+            chunks = prev["chunks"] + [self.put(data[prev["size"]:])]  # appended since: store only the tail
+        else:
+            chunks = [self.put(data)]
+        return {"sha": digest, "size": len(data), "chunks": chunks}
+
+    # ------------------------------------------
+    # RETENTION
+    # ------------------------------------------
+    def prune(self, retention=RETENTION):
+        """Applies ``retention`` to the sets, then deletes unreferenced objects."""
+        with _lock, self._locked():
+            names = self.names()[::-1]  # newest first
+            keep = set(names[:retention["last"]])
+            for width, count in ((10, retention["daily"]), (7, retention["monthly"])):
+                periods = {}
+                for name in names:
+                    periods.setdefault(name[:width], name)  # newest backup of each day/month
+                keep.update(list(periods.values())[:count])
+            for name in set(names) - keep:
+                os.remove(os.path.join(self.sets, name + ".json"))
+            live = {c for name in keep for e in self.load(name)["files"].values() for c in e["chunks"]}
+            removed = 0
+            for path in glob.glob(os.path.join(self.objects, "*", "*.gz")):
+                if os.path.basename(path)[:-3] not in live:
+                    os.remove(path)
+                    removed += 1
+            return len(names) - len(keep), removed
+
+    # ------------------------------------------
+    # RESTORE
+    # ------------------------------------------
+    def restore(self, name, folder="."):
+        """Puts the data files of backup ``name`` back into ``folder``.
+
+        Every file is reassembled and verified before anything is replaced.
+        Files the backup doesn't have (a newer partition, a pending journal)
+        are removed, and derived caches are dropped so they rebuild.
+        """
+        with _lock, self._locked():
+            return self._restore(name, folder)
+
+    def _restore(self, name, folder):
+        files = self.load(name)["files"]
+        blobs = {}
+        for rel, entry in files.items():
+            data = b"".join(self.get(c) for c in entry["chunks"])
+            if hashlib.sha256(data).hexdigest() != entry["sha"]:
+                raise ValueError(f"Backup {name}: {rel} does not match its checksum")
+            blobs[rel] = data
+        for dirname in PARTITIONED_DIRS:
+            os.makedirs(os.path.join(folder, dirname), exist_ok=True)
+        for rel, data in blobs.items():
+            path = os.path.join(folder, *rel.split("/"))
+            with open(path + ".tmp", "wb") as f: f.write(data)
+            os.replace(path + ".tmp", path)
+        current = list(BACKUP_FILES) + [_rel(d, os.path.basename(p)) for d in PARTITIONED_DIRS
+                                        for p in glob.glob(os.path.join(folder, d, "*.csv"))]
+        for rel in current:
+            if rel not in blobs and os.path.exists(os.path.join(folder, *rel.split("/"))):
+                os.remove(os.path.join(folder, *rel.split("/")))
+        for derived in (ROLLUP_FILE, PREVIOUS_JOURNAL_FILE, os.path.join(SNAPSHOT_DIR, META_FILE)):
+            if os.path.exists(os.path.join(folder, derived)):
+                os.remove(os.path.join(folder, derived))
+        shutil.rmtree(os.path.join(folder, ANALYTICS_DIR), ignore_errors=True)
+        return sorted(blobs)
+
+
+def write_backup(items, folder=".", root=BACKUP_DIR, retention=RETENTION, task=None):
+    """Worker-pool job: backs up :func:`capture` output and prunes old sets."""
+    backups = BackupStore(os.path.join(folder, root))
+    name = backups.backup(items, folder, task=task)
+    backups.prune(retention)
+    return name
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bakery.backup", description="Bakery Pro backups")
+    parser.add_argument("--folder", default=".", help="data folder (default: current)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="show backups, oldest first")
+    sub.add_parser("create", help="take a backup now")
+    r = sub.add_parser("restore", help="restore a backup (close the app first)")
+    r.add_argument("name")
+    args = parser.parse_args(argv)
+
+    backups = BackupStore(os.path.join(args.folder, BACKUP_DIR))
+    if args.cmd == "list":
+        for name in backups.names():
+            files = backups.load(name)["files"]
+            print(f"{name}  {len(files):>3} files  {sum(e['size'] for e in files.values()):>12,} bytes")
+    elif args.cmd == "create":
+        from bakery.datastore import DataStore
+        print(write_backup(capture(DataStore(args.folder)), args.folder))
+    else:
+        if args.name not in backups.names():
+            parser.error(f"no backup named {args.name}")
+        for rel in backups.restore(args.name, args.folder):
+            print("restored", rel)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
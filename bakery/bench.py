@@ -0,0 +1,211 @@
+"""Headless benchmarks over synthetic bakery data.
+
+    python -m bakery.bench --size small --out baseline.json
+    python -m bakery.bench --size small --compare baseline.json
+
+:func:`generate` writes a reproducible dataset (fixed seed and end date) in
+the app's own file formats: ``bakery_inventory.csv``, ``ingredients.csv``,
+``recipes.json`` (with some sub-recipes), ``pre_orders.csv`` and a legacy
+single-file ``sales_records.csv``, so the first open also measures the
+partition migration. :func:`run` then times the core operations through the
+same code the app uses and returns a JSON-able baseline: per operation the
+number of runs and min / median / mean / p95 in milliseconds, plus the
+sizes and library versions. ``--compare`` prints the ratio to an earlier
+baseline.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import numpy as np
+import pandas as pd
+
+from bakery.datastore import DataStore, INVENTORY_FILE, INGREDIENTS_FILE, PREORDER_FILE, RECIPE_FILE
+from bakery.partitions import LEGACY_SALES_FILE, SALES_COLUMNS, SALES_DIR
+from bakery.journal import SalesJournal, JOURNAL_FILE, PREVIOUS_JOURNAL_FILE
+from bakery.rollups import Rollups, ROLLUP_FILE
+from bakery.costing import CostingEngine
+from bakery.planning import ProductionPlanner
+from bakery.snapshot import SNAPSHOT_DIR
+from bakery.stock import MOVEMENTS_DIR
+from bakery.analytics import SalesAnalytics, ANALYTICS_DIR
+from bakery import reports
+
+SIZES = {  # sales rows, SKUs, ingredients, pre-orders
+    "tiny": (10, 10, 10, 10),
+    "small": (10_000, 100, 50, 500),
+    "medium": (1_000_000, 1_000, 300, 20_000),
+    "large": (10_000_000, 5_000, 1_000, 200_000),
+}
+END_DATE = "2026-06-30"  # last day of generated sales; fixed so runs are comparable
+HISTORY_DAYS = 730
+CHUNK_ROWS = 1_000_000
+
+
+def generate(folder, sales, skus, ingredients, preorders, seed=0, end=END_DATE):
+    """Writes a synthetic dataset into ``folder`` (created if needed, derived state cleared)."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(folder, exist_ok=True)
+    for stale in (SALES_DIR, MOVEMENTS_DIR, ANALYTICS_DIR, SNAPSHOT_DIR):
+        shutil.rmtree(os.path.join(folder, stale), ignore_errors=True)
+    for stale in (ROLLUP_FILE, JOURNAL_FILE, PREVIOUS_JOURNAL_FILE, LEGACY_SALES_FILE + ".migrated"):
+        if os.path.exists(os.path.join(folder, stale)):
+            os.remove(os.path.join(folder, stale))
+    products = np.array([f"SKU {i:05d}" for i in range(skus)])
+    prices = rng.uniform(5, 500, skus).round(2)
+    pd.DataFrame({"Product": products, "Price": prices, "Stock": 10**9}).to_csv(os.path.join(folder, INVENTORY_FILE), index=False)
+
+    mats = [f"Material {i:04d}" for i in range(ingredients)]
+    pd.DataFrame({"Ingredient": mats + ["[ADMIN] Rent"], "Qty": np.append(rng.uniform(1e6, 1e7, ingredients).round(2), 1.0),
+                  "Cost": np.append(rng.uniform(100, 10_000, ingredients).round(2), 5_000.0)}).to_csv(os.path.join(folder, INGREDIENTS_FILE), index=False)
+
+    # A few shared sub-recipes (doughs, fillings) so flattening is exercised
+    subs = {f"Base {i:02d}": {mats[j]: round(float(rng.uniform(0.1, 1)), 3) for j in rng.choice(ingredients, min(4, ingredients), replace=False)}
+            for i in range(max(1, skus // 100))}
+    recipes = dict(subs)
+    for p in products:
+        parts = {mats[j]: round(float(rng.uniform(0.001, 0.5)), 3) for j in rng.choice(ingredients, min(int(rng.integers(3, 9)), ingredients), replace=False)}
+        if rng.random() < 0.5:
+            parts[str(rng.choice(list(subs)))] = round(float(rng.uniform(0.05, 0.5)), 3)
+        recipes[str(p)] = parts
+    with open(os.path.join(folder, RECIPE_FILE), "w") as f: json.dump(recipes, f)
+
+    last = pd.Timestamp(end) + pd.Timedelta(days=1)
+    first = last - pd.Timedelta(days=HISTORY_DAYS)
+    path, written = os.path.join(folder, LEGACY_SALES_FILE), 0
+    pd.DataFrame(columns=SALES_COLUMNS).to_csv(path, index=False)
+    span = HISTORY_DAYS * 86400
+    while written < sales:
+        n = min(CHUNK_ROWS, sales - written)
+        # Each chunk covers its share of the history, sorted like a real till roll
+        lo, hi = span * written // sales, span * (written + n) // sales
+        offsets = np.sort(rng.integers(lo, max(hi, lo + 1), n))
+        sku = rng.integers(0, skus, n); qty = rng.integers(1, 6, n)
+        pd.DataFrame({"Date": (first + pd.to_timedelta(offsets, unit="s")).strftime("%Y-%m-%d %H:%M:%S"),
+                      "Product": products[sku], "Qty": qty, "Total": (prices[sku] * qty).round(2)}).to_csv(path, mode="a", header=False, index=False)
+        written += n
+
+    days = rng.integers(-7, 30, preorders)
+    pd.DataFrame({"Date": (pd.Timestamp(end) + pd.to_timedelta(days, unit="D")).strftime("%Y-%m-%d"),
+                  "Item": "", "Qty": rng.integers(1, 50, preorders), "Total": "PENDING",
+                  "Customer": [f"Customer {i}" for i in rng.integers(0, 5000, preorders)],
+                  "Product": products[rng.integers(0, skus, preorders)]}).assign(
+        Item=lambda d: "RESERVE: " + d["Customer"] + " (" + d["Product"] + ")").to_csv(os.path.join(folder, PREORDER_FILE), index=False)
+    return folder
+
+
+def _time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    t = np.asarray(times)
+    return {"runs": repeat, "min_ms": float(t.min()), "median_ms": float(np.median(t)),
+            "mean_ms": float(t.mean()), "p95_ms": float(np.percentile(t, 95))}
+
+
+def run(folder, repeat=5, sells=200, end=END_DATE):
+    """Times the core operations on the dataset in ``folder``; returns the results dict."""
+    results = {}
+    end = pd.Timestamp(end)
+    results["open: migrate sales + first load"] = _time(lambda: DataStore(folder).init_files(), 1)
+
+    def cold_start():
+        store = DataStore(folder); store.init_files()
+        SalesJournal(store).open(); Rollups(store).load()
+        store.get(INVENTORY_FILE); store.get(INGREDIENTS_FILE); store.get(PREORDER_FILE)
+    results["startup: rollup rebuild"] = _time(cold_start, 1)  # no rollup file yet
+    results["startup: warm"] = _time(cold_start, repeat)
+
+    store = DataStore(folder); store.init_files()
+    journal = SalesJournal(store, compact_every=10**9).open()
+    rollups = Rollups(store, save_every=10**9).load()
+    products = list(store.get(INVENTORY_FILE)['Product'])
+    rng = np.random.default_rng(1)
+    picks = iter(rng.choice(products, sells))
+    results["sale: journal.sell"] = _time(lambda: journal.sell(next(picks), 1), sells)
+    results["sale: journal compact"] = _time(journal.compact, 1)
+
+    results["stats: day/month/expense aggregates"] = _time(
+        lambda: (rollups.day_sales(end), rollups.month_sales(end), rollups.month_expenses(end)), repeat)
+
+    out = os.path.join(folder, "bench_ledger.txt")
+    first, last = reports.month_range(end)
+    results["report: monthly ledger"] = _time(lambda: reports.write_ledger(
+        out, reports.BAKERY_NAME, store.sales.paths(first, pd.Timestamp(last) + pd.Timedelta(days=1)),
+        first, last, store.movements.paths(first, pd.Timestamp(last) + pd.Timedelta(days=1))), repeat)
+
+    results["costing: compile"] = _time(lambda: CostingEngine(store.flat_recipes(), store.get(INGREDIENTS_FILE), store.get(INVENTORY_FILE)), repeat)
+    engine = CostingEngine(store.flat_recipes(), store.get(INGREDIENTS_FILE), store.get(INVENTORY_FILE))
+    results["costing: evaluate what-if"] = _time(lambda: engine.evaluate({"all": 0.15}), repeat)
+
+    planner = ProductionPlanner(store)
+    results["pre-orders: week plan"] = _time(lambda: planner.plan(end, end + pd.Timedelta(days=6)), repeat)
+
+    day = end + pd.Timedelta(days=1)
+    results["analytics: hourly rollup build"] = _time(lambda: SalesAnalytics(folder).refresh(store.sales.sizes()), 1)
+    analytics = SalesAnalytics(folder)
+    results["analytics: bake plan (cold)"] = _time(lambda: analytics.bake_plan(store.sales.sizes(), day, planner.orders(day, day)), 1)
+    results["analytics: bake plan (warm)"] = _time(lambda: analytics.bake_plan(store.sales.sizes(), day, planner.orders(day, day)), repeat)
+    results["analytics: daily series, full history"] = _time(lambda: analytics.series("D"), repeat)
+    return results
+
+
+def _environment():
+    return {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "platform": platform.platform(), "machine": platform.machine()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bakery.bench", description="Bakery Pro benchmarks")
+    parser.add_argument("--size", choices=list(SIZES), default="small")
+    parser.add_argument("--sales", type=int); parser.add_argument("--skus", type=int)
+    parser.add_argument("--ingredients", type=int); parser.add_argument("--preorders", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--folder", help="generate here and keep it (default: a temp folder, removed after)")
+    parser.add_argument("--out", help="write the baseline JSON here (default: stdout)")
+    parser.add_argument("--compare", help="earlier baseline JSON to compare against")
+    args = parser.parse_args(argv)
+
+    sales, skus, ingredients, preorders = SIZES[args.size]
+    sizes = {"sales": args.sales or sales, "skus": args.skus or skus,
+             "ingredients": args.ingredients or ingredients, "preorders": args.preorders or preorders}
+    folder = args.folder or tempfile.mkdtemp(prefix="bakery-bench-")
+    try:
+        t0 = time.perf_counter()
+        generate(folder, seed=args.seed, **sizes)
+        gen_s = time.perf_counter() - t0
+        results = run(folder, repeat=args.repeat)
+    finally:
+        if not args.folder:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    baseline = {"format": 1, "created": pd.Timestamp.now().isoformat(timespec="seconds"), "sizes": sizes,
+                "seed": args.seed, "end_date": END_DATE, "generate_s": round(gen_s, 3),
+                "environment": _environment(), "results": results}
+    text = json.dumps(baseline, indent=1)
+    if args.out:
+        with open(args.out, "w") as f: f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r") as f: old = json.load(f)
+        if old.get("sizes") != sizes:
+            print(f"warning: sizes differ from {args.compare}: {old.get('sizes')}", file=sys.stderr)
+        print(f"\n{'Operation':<40} {'Before':>10} {'After':>10} {'Ratio':>7}", file=sys.stderr)
+        for name, r in results.items():
+            before = old.get("results", {}).get(name, {}).get("median_ms")
+            ratio = f"{r['median_ms'] / before:>6.2f}x" if before else "    new"
+            print(f"{name:<40} {before if before is not None else float('nan'):>10.2f} {r['median_ms']:>10.2f} {ratio}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""One customer's basket at the POS.
+
+Lines are merged by product (adding 2 then 3 Pandesal is one line of 5).
+:meth:`Cart.checkout` sells the whole basket through
+:meth:`~bakery.journal.SalesJournal.sell_many`: stock is checked for all
+lines together, and the sale is recorded as one journal transaction, or
+not at all. A basket of several products is also checked against recipe
+ingredients, since its lines draw on the same stock; a one-product basket
+is not, like a plain sale before carts, however it was entered.
+"""
+from bakery.datastore import INVENTORY_FILE
+
+
+class Cart:
+    def __init__(self):
+        self.lines = {}  # product -> qty, in the order first added
+
+    def __len__(self):
+        return len(self.lines)
+
+    def add(self, prod, qty):
+        if qty <= 0:
+            raise ValueError("Quantity must be above 0")
+        self.lines[prod] = self.lines.get(prod, 0) + qty
+
+    def remove(self, prod):
+        self.lines.pop(prod, None)
+
+    def clear(self):
+        self.lines.clear()
+
+    def items(self):
+        return [{"Product": p, "Qty": q} for p, q in self.lines.items()]
+
+    def total(self, store):
+        df_p, index = store.get(INVENTORY_FILE), store.index(INVENTORY_FILE)
+        return sum(float(df_p.at[index[p], 'Price']) * q for p, q in self.lines.items() if p in index)
+
+    def checkout(self, journal, check_ingredients=None):
+        """Sells every line or none; returns ``(sales rows, problems)`` like ``sell_many``.
+
+        ``problems`` name products, not line numbers. The cart is emptied on
+        success. Ingredients are checked by default when there are several lines.
+        """
+        lines = list(self.lines)
+        if check_ingredients is None:
+            check_ingredients = len(lines) > 1
+        sales, problems = journal.sell_many(self.items(), strict=True, check_ingredients=check_ingredients)
+        if sales:
+            self.clear()
+        return sales, [(lines[n - 1], problem) for n, problem in problems]
@@ -0,0 +1,168 @@
+"""Headless entry point: bulk sales import and reports without the GUI.
+
+    python -m bakery import-sales tickets.csv
+    python -m bakery ledger --start 2026-10-01 --end 2026-10-31
+    python -m bakery costing --what-if "Flour +15%"
+    python -m bakery production-sheet --start 2026-10-20 --end 2026-10-21
+    python -m bakery bake-plan --date 2026-10-19
+    python -m bakery sales-series --freq D --start 2026-09-01 --end 2026-09-30 --out daily.csv
+
+Uses the same store, journal and report code as the app, and the same
+folder lock, so it is safe to run while counters are open: an import shows
+up on their screens through the change feed like any other sale.
+"""
+import sys
+import argparse
+from datetime import datetime
+import pandas as pd
+
+from bakery.datastore import DataStore, INVENTORY_FILE, INGREDIENTS_FILE
+from bakery.journal import SalesJournal
+from bakery.costing import CostingEngine, parse_what_if
+from bakery.planning import ProductionPlanner
+from bakery.analytics import SalesAnalytics, FREQUENCIES, METHODS, HISTORY_WEEKS
+from bakery import reports
+
+MAX_PROBLEMS = 20  # bad import lines listed before summarising
+
+
+def _open(folder):
+    store = DataStore(folder)
+    store.init_files()
+    return store, SalesJournal(store).open()
+
+
+def import_sales(args):
+    """Every line of the file becomes one sale, all in a single journal transaction."""
+    lines = pd.read_csv(args.file, dtype=str, keep_default_na=False)
+    if "Product" not in lines and "Item" in lines:
+        lines = lines.rename(columns={"Item": "Product"})
+    if "Product" not in lines or "Qty" not in lines:
+        sys.exit(f"{args.file}: needs Product (or Item) and Qty columns; Date and Total are optional")
+    store, journal = _open(args.folder)
+    sales, problems = journal.sell_many(lines.to_dict("records"), strict=not args.partial)
+    journal.compact()  # leave clean CSVs behind, like closing the app does
+    for n, problem in problems[:MAX_PROBLEMS]:
+        print(f"line {n + 1}: {problem}", file=sys.stderr)  # +1 for the header row
+    if len(problems) > MAX_PROBLEMS:
+        print(f"... and {len(problems) - MAX_PROBLEMS} more", file=sys.stderr)
+    if problems and not sales:
+        print(f"Nothing imported ({len(problems)} bad lines){'' if args.partial else '; use --partial to skip them'}", file=sys.stderr)
+        return 1
+    print(f"Imported {len(sales)} sales, total ₱{sum(s['Total'] for s in sales):,.2f}")
+    return 0
+
+
+def _dates(args, default):
+    start, end = default
+    try:
+        return (pd.Timestamp(args.start) if args.start else pd.Timestamp(start),
+                pd.Timestamp(args.end) if args.end else pd.Timestamp(end))
+    except ValueError:
+        sys.exit("Dates must be YYYY-MM-DD")
+
+
+def ledger(args):
+    store, _ = _open(args.folder)
+    sd, ed = _dates(args, reports.month_range(datetime.now()))
+    title = reports.ledger_title(sd, ed)
+    out = args.out or f"Ledger_{title.replace(' to ', '_to_').replace(' ', '_')}.txt"
+    print(reports.write_ledger(out, reports.BAKERY_NAME, store.sales.paths(sd, ed + pd.Timedelta(days=1)),
+                               sd, ed, store.movements.paths(sd, ed + pd.Timedelta(days=1))))
+    return 0
+
+
+def costing(args):
+    store, _ = _open(args.folder)
+    try:
+        costs = CostingEngine(store.flat_recipes(), store.get(INGREDIENTS_FILE), store.get(INVENTORY_FILE)).evaluate(parse_what_if(args.what_if))
+    except ValueError as e:
+        sys.exit(str(e))
+    if args.out is None:
+        print(reports.format_costing_table(costs))
+    else:
+        print(reports.write_costing_report(args.out, reports.BAKERY_NAME, costs, args.what_if))
+    return 0
+
+
+def production_sheet(args):
+    store, _ = _open(args.folder)
+    today = datetime.now().strftime("%Y-%m-%d")
+    sd, ed = _dates(args, (today, today))
+    sd, ed = sd.strftime("%Y-%m-%d"), ed.strftime("%Y-%m-%d")
+    path = reports.write_production_sheet(args.out or f"Production_{sd}.txt", ProductionPlanner(store).plan(sd, ed))
+    if path is None:
+        print("No orders in range", file=sys.stderr)
+        return 1
+    print(path)
+    return 0
+
+
+def bake_plan(args):
+    """Units to bake on ``--date`` (default tomorrow); meant for a nightly scheduled run."""
+    store, _ = _open(args.folder)
+    try:
+        day = pd.Timestamp(args.date).normalize() if args.date else pd.Timestamp(datetime.now().date()) + pd.Timedelta(days=1)
+    except ValueError:
+        sys.exit("Dates must be YYYY-MM-DD")
+    plan = SalesAnalytics(args.folder).bake_plan(store.sales.sizes(), day, ProductionPlanner(store).orders(day, day),
+                                                 args.method, store.get(INVENTORY_FILE)['Product'], args.weeks)
+    print(reports.write_bake_plan(args.out or f"Bake_Plan_{day:%Y-%m-%d}.txt", reports.BAKERY_NAME, day, plan, args.method))
+    return 0
+
+
+def sales_series(args):
+    """Per-product units (or revenue) per hour/day/week as CSV, for a spreadsheet or charting."""
+    store, _ = _open(args.folder)
+    try:
+        start = pd.Timestamp(args.start) if args.start else None
+        end = pd.Timestamp(args.end) + pd.Timedelta(days=1) if args.end else None
+    except ValueError:
+        sys.exit("Dates must be YYYY-MM-DD")
+    series = SalesAnalytics(args.folder).refresh(store.sales.sizes()).series(args.freq, start, end, args.product, args.value)
+    if args.out is None:
+        print(series.to_csv(), end="")
+    else:
+        series.to_csv(args.out)
+        print(args.out)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bakery", description="Bakery Pro without the GUI")
+    parser.add_argument("--folder", default=".", help="data folder (default: current)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("import-sales", help="record every line of a CSV (Date, Product, Qty, Total) as a sale")
+    p.add_argument("file")
+    p.add_argument("--partial", action="store_true", help="import the good lines even if some fail")
+    p.set_defaults(run=import_sales)
+
+    p = sub.add_parser("ledger", help="official ledger for a date range (default: this month)")
+    p.add_argument("--start"); p.add_argument("--end"); p.add_argument("--out")
+    p.set_defaults(run=ledger)
+
+    p = sub.add_parser("costing", help="costing table, or a report file with --out")
+    p.add_argument("--what-if", default="", help="e.g. 'Flour +15%%, Sugar -5%%'")
+    p.add_argument("--out")
+    p.set_defaults(run=costing)
+
+    p = sub.add_parser("production-sheet", help="pre-orders, bake plan and material shortages for a date range (default: today)")
+    p.add_argument("--start"); p.add_argument("--end"); p.add_argument("--out")
+    p.set_defaults(run=production_sheet)
+
+    p = sub.add_parser("bake-plan", help="forecast demand plus pending pre-orders: units to bake on a day (default: tomorrow)")
+    p.add_argument("--date"); p.add_argument("--out")
+    p.add_argument("--method", choices=METHODS, default="ewm", help="ewm: exponential smoothing, ma: moving average")
+    p.add_argument("--weeks", type=int, default=HISTORY_WEEKS, help="weeks of history to forecast from")
+    p.set_defaults(run=bake_plan)
+
+    p = sub.add_parser("sales-series", help="units per product per hour/day/week as CSV (stdout unless --out)")
+    p.add_argument("--freq", choices=list(FREQUENCIES), default="D")
+    p.add_argument("--value", choices=["Qty", "Total"], default="Qty", help="units or revenue")
+    p.add_argument("--product", action="append", help="only this product (repeatable)")
+    p.add_argument("--start"); p.add_argument("--end"); p.add_argument("--out")
+    p.set_defaults(run=sales_series)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
@@ -0,0 +1,90 @@
+"""Vectorized product costing.
+
+Flattened recipes (:meth:`DataStore.flat_recipes`, sub-recipes already
+expanded) are compiled once into a sparse product x ingredient matrix, stored
+as coordinate arrays (``rows``, ``cols``, ``amounts``). The unit cost of
+every product is then a single sparse matrix-vector product,
+``bincount(rows, amounts * unit_cost[cols])``, so re-costing thousands of
+SKUs after a what-if price change ("flour +15%") takes milliseconds.
+
+The costing report and the in-app costing view are both rendered from the
+frame returned by :meth:`CostingEngine.evaluate`.
+
+Unit costs are read straight from the ``Unit Cost`` column of
+``ingredients.csv``, the FIFO value of the stock on hand (see
+:mod:`bakery.stock`), not recomputed as ``Cost / Qty``.
+"""
+import re
+import numpy as np
+import pandas as pd
+
+from bakery.recipes import compile_recipes
+from bakery.metrics import metrics
+
+HEALTHY_MARGIN = 30.0  # percent
+
+_WHAT_IF = re.compile(r"\s*([^,]+?)\s*([+-]\s*\d+(?:\.\d+)?)\s*%?\s*(?:,|$)")
+
+
+def parse_what_if(text):
+    """Parses ``"flour +15%, sugar -5%"`` into ``{"flour": 0.15, "sugar": -0.05}``.
+
+    ``all`` applies to every ingredient. Raises ValueError on anything else.
+    """
+    text = text.strip()
+    if not text:
+        return {}
+    changes, pos = {}, 0
+    for m in _WHAT_IF.finditer(text):
+        if m.start() != pos:
+            break
+        changes[m.group(1).strip()] = float(m.group(2).replace(" ", "")) / 100
+        pos = m.end()
+    if pos != len(text):
+        raise ValueError(f"Can't read what-if '{text}' (use e.g. 'Flour +15%, Sugar -5%')")
+    return changes
+
+
+class CostingEngine:
+    def __init__(self, recipes, df_i, df_p):
+        """``recipes`` are flat; only those of products on the menu are costed (not sub-recipes)."""
+        prices = dict(zip(df_p['Product'].astype(str), df_p['Price'].astype(float)))
+        self.products = [p for p in recipes if p in prices]
+        names = [str(n) for n in df_i['Ingredient']]
+        self.ingredients = {}
+        for i, n in enumerate(names):
+            self.ingredients.setdefault(n, i)
+        self._lower = {n.lower(): i for n, i in self.ingredients.items()}
+
+        # Unknown materials cost nothing, as before
+        self.rows, self.cols, self.amounts = compile_recipes(recipes, self.products, self.ingredients)
+
+        # Kept current by every purchase and sale (FIFO layers, see bakery.stock)
+        self.unit_cost = df_i['Unit Cost'].to_numpy(dtype=float)
+        self.price = np.array([prices[p] for p in self.products], dtype=float)
+
+    def _adjusted_unit_cost(self, changes):
+        unit_cost = self.unit_cost.copy()
+        for name, pct in (changes or {}).items():
+            if name.lower() == "all":
+                unit_cost *= 1 + pct
+                continue
+            c = self._lower.get(name.lower())
+            if c is None:
+                raise ValueError(f"Unknown ingredient in what-if: {name}")
+            unit_cost[c] *= 1 + pct
+        return unit_cost
+
+    def evaluate(self, changes=None):
+        """Costs every product at once; ``changes`` is a what-if ``{ingredient: +pct}``."""
+        unit_cost = self._adjusted_unit_cost(changes)
+        with metrics.span("costing evaluate", "compute"):
+            cost = np.bincount(self.rows, weights=self.amounts * unit_cost[self.cols], minlength=len(self.products))
+        profit = self.price - cost
+        with np.errstate(divide="ignore", invalid="ignore"):
+            margin = np.where(self.price > 0, profit / self.price * 100, 0.0)
+        return pd.DataFrame({
+            "Product": self.products, "Cost": cost, "Price": self.price,
+            "Profit": profit, "Margin": margin,
+            "Status": np.where(margin >= HEALTHY_MARGIN, "[✓] HEALTHY", "[!] LOW MARGIN"),
+        })
@@ -0,0 +1,390 @@
+"""In-memory copy of the bakery's CSV/JSON database files.
+
+Every file is parsed once and then served from memory. A cached copy is
+dropped and re-read only when the file on disk changes underneath us
+(mtime/size), so edits made in Excel are still picked up, while writes that
+go through the store update the cache directly (write-through).
+
+Sales are the exception to "one file": the ``SALES_FILE`` table is stored
+month-partitioned by :class:`~bakery.partitions.SalesPartitions`
+(``store.sales``), and range queries should go there instead of loading the
+whole history with ``get(SALES_FILE)``. The ingredient movement ledger is
+partitioned the same way (``store.movements``, see :mod:`bakery.stock`).
+
+Several processes (two counters on one PC, or PCs sharing the folder over
+the LAN) may use the same folder. Every write takes the folder lock
+(:mod:`bakery.locking`), and :meth:`DataStore.sync` catches up with what the
+others did: journaled changes arrive as after-images from the shared
+transaction journal, other files are re-read only if their stamp moved.
+Read-modify-write of a whole table goes through :meth:`DataStore.edit`, which
+reads inside the lock; a plain :meth:`DataStore.write` based on a copy that
+another process has changed since raises :class:`ConflictError`.
+"""
+import os
+import re
+import json
+import pandas as pd
+
+from bakery.files import INVENTORY_FILE, SALES_FILE, INGREDIENTS_FILE, PREORDER_FILE, RECIPE_FILE  # re-exported
+from bakery.events import EventBus, RowsChanged, RowsAppended
+from bakery.partitions import SalesPartitions, SALES_COLUMNS
+from bakery.stock import MOVEMENTS_DIR, MOVEMENT_COLUMNS
+from bakery.recipes import flatten, merge
+from bakery.locking import FolderLock, LOCK_FILE
+from bakery.metrics import metrics
+
+SCHEMAS = {
+    INVENTORY_FILE: ["Product", "Price", "Stock"],
+    SALES_FILE: SALES_COLUMNS,  # logical table; stored under sales/ by month
+    # Qty on hand, Cost = its value, Layers = FIFO cost layers (JSON); see bakery.stock
+    INGREDIENTS_FILE: ["Ingredient", "Qty", "Cost", "Unit Cost", "Layers"],
+    # Ledger Format: Date, Item, Qty, Total; Customer/Product/Date are what planning reads
+    PREORDER_FILE: ["Date", "Item", "Qty", "Total", "Customer", "Product"],
+}
+
+# Numeric columns, coerced once on load so nobody re-parses strings later
+NUMERIC_COLUMNS = {
+    INVENTORY_FILE: {"Price": float, "Stock": int},
+    INGREDIENTS_FILE: {"Qty": float, "Cost": float, "Unit Cost": float},
+    PREORDER_FILE: {"Qty": int},
+}
+
+# Name column of each keyed table, indexed by DataStore.index()
+KEY_COLUMNS = {INVENTORY_FILE: "Product", INGREDIENTS_FILE: "Ingredient"}
+
+# Files whose sale-time changes are recorded in the transaction journal
+JOURNALED_FILES = (INVENTORY_FILE, INGREDIENTS_FILE)
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_GROUPING = re.compile(r"(?<=\d)[,'_\u00a0\u202f](?=\d)")  # thousands separators: '1,200g'
+_RESERVATION = re.compile(r"^\s*RESERVE:\s*(.*?)\s*\((.*)\)\s*$")
+
+
+class ConflictError(RuntimeError):
+    """A write was based on data another process has changed since."""
+
+
+def parse_number(val, default=0.0):
+    """Pulls the number out of legacy cells like '25kg', '1,200g' or ' -4.5 '."""
+    if isinstance(val, (int, float)) and not pd.isna(val):
+        return float(val)
+    m = _NUMBER.search(_GROUPING.sub("", str(val)))
+    return float(m.group()) if m else default
+
+
+def structure_preorders(df):
+    """Fills Customer/Product of pre-orders saved as free text ('RESERVE: Ana (Pandesal)')."""
+    df = df.reindex(columns=SCHEMAS[PREORDER_FILE])
+    items = df['Item'].fillna("").astype(str)
+    parts = items.str.extract(_RESERVATION)
+    missing = df['Product'].isna() | (df['Product'].astype(str).str.strip() == "")
+    df['Customer'] = df['Customer'].astype(object).mask(missing, parts[0].fillna("")).fillna("").astype(str)
+    df['Product'] = df['Product'].astype(object).mask(missing, parts[1].fillna(items)).astype(str)
+    return df
+
+
+def value_ingredients(df):
+    """Fills ``Unit Cost`` of rows saved before cost layers with the old ``Cost / Qty``.
+
+    Their ``Layers`` stay blank, so :func:`bakery.stock.layers_of` starts them
+    from one layer holding the current stock at that cost.
+    """
+    df = df.reindex(columns=SCHEMAS[INGREDIENTS_FILE])
+    qty, cost = df['Qty'].map(parse_number), df['Cost'].map(parse_number)
+    missing = df['Unit Cost'].isna()
+    if missing.any():
+        df['Unit Cost'] = df['Unit Cost'].astype(object).mask(missing, (cost / qty.where(qty > 0)).fillna(0.0))
+    df['Layers'] = df['Layers'].fillna("").astype(str)
+    return df
+
+
+class DataStore:
+    """Loads each database file once and keeps it in memory.
+
+    Frames returned by :meth:`get` are shared with the cache, so callers must
+    treat them as read-only and ``.copy()`` before mutating. Writes made
+    through the store are announced on ``self.events``.
+    """
+
+    def __init__(self, folder="."):
+        self.folder = folder
+        self._frames = {}
+        self._stamps = {}
+        self._recipes = None
+        self._flat = None  # (recipes it was flattened from, flat recipes)
+        self._indexes = {}  # name -> (frame the index was built from, {key: row label})
+        self.journal = None  # set by SalesJournal.open()
+        self.events = EventBus()
+        self.sales = SalesPartitions(folder)
+        self.movements = SalesPartitions(folder, MOVEMENTS_DIR, MOVEMENT_COLUMNS, legacy=None)
+        self.reads = 0  # number of actual disk parses, handy when profiling
+        self.lock = FolderLock(self.path(LOCK_FILE))
+        self._versions = {}  # name -> number of changes seen, local or from other processes
+        self.events.subscribe(RowsChanged, self._bump)
+        self.events.subscribe(RowsAppended, self._bump)
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def _stamp(self, name):
+        if name == SALES_FILE:
+            return self.sales.stamp()
+        try:
+            st = os.stat(self.path(name))
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def init_files(self):
+        """Creates any missing database file with its header row."""
+        with self.lock:  # another counter may be creating them too
+            self.sales.open()  # also migrates an old single-file sales_records.csv
+            self.movements.open()
+            for name, cols in SCHEMAS.items():
+                if name != SALES_FILE and not os.path.exists(self.path(name)):
+                    pd.DataFrame(columns=cols).to_csv(self.path(name), index=False)
+            if not os.path.exists(self.path(RECIPE_FILE)):
+                with open(self.path(RECIPE_FILE), 'w') as f: json.dump({}, f)
+            if list(pd.read_csv(self.path(PREORDER_FILE), nrows=0).columns) != SCHEMAS[PREORDER_FILE]:
+                self.write(PREORDER_FILE, self.get(PREORDER_FILE))  # one-time upgrade to structured columns
+            if list(pd.read_csv(self.path(INGREDIENTS_FILE), nrows=0).columns) != SCHEMAS[INGREDIENTS_FILE]:
+                self.write(INGREDIENTS_FILE, self.get(INGREDIENTS_FILE))  # one-time upgrade to cost layers
+
+    # ------------------------------------------
+    # READS
+    # ------------------------------------------
+    def _load(self, name):
+        self.reads += 1
+        metrics.count("file_reads")
+        if name == SALES_FILE:
+            return self.sales.read()  # whole history, 'Date' parsed once
+        if not os.path.exists(self.path(name)):
+            return pd.DataFrame(columns=SCHEMAS.get(name, []))
+        df = pd.read_csv(self.path(name))
+        if name == PREORDER_FILE:
+            df = structure_preorders(df)
+        elif name == INGREDIENTS_FILE:
+            df = value_ingredients(df)
+        for col, kind in NUMERIC_COLUMNS.get(name, {}).items():
+            df[col] = df[col].map(parse_number).astype(kind)
+        if self.journal is not None and name in JOURNALED_FILES:
+            self.journal.overlay(name, df)
+        return df
+
+    def get(self, name):
+        stamp = self._stamp(name)
+        if name not in self._frames or self._stamps.get(name) != stamp:
+            with metrics.span(f"load {name}", "load"):
+                self._frames[name] = self._load(name)
+            self._stamps[name] = stamp
+        return self._frames[name]
+
+    def cached(self, name):
+        """``(frame, stamp)`` if ``name`` is in memory, else ``(None, None)``."""
+        if name not in self._frames:
+            return None, None
+        return self._frames[name], self._stamps.get(name)
+
+    def is_current(self, name, stamp):
+        return self._stamp(name) == stamp
+
+    def prime(self, name, df, stamp):
+        """Seeds the cache with a frame known to match the file at ``stamp`` (e.g. a snapshot)."""
+        if self.journal is not None and name in JOURNALED_FILES:
+            self.journal.overlay(name, df)
+        self._frames[name] = df
+        self._stamps[name] = stamp
+
+    def index(self, name):
+        """Hash index ``{product/ingredient name: row label}`` over a keyed table.
+
+        Rebuilt lazily whenever the cached frame is replaced, so lookups on
+        the sale path are O(1) instead of a column scan. First match wins,
+        like the old ``df.index[df[col] == key][0]``.
+        """
+        df = self.get(name)
+        cached = self._indexes.get(name)
+        if cached is None or cached[0] is not df:
+            labels = {}
+            for label, key in zip(df.index, df[KEY_COLUMNS[name]]):
+                labels.setdefault(key, label)
+            self._indexes[name] = cached = (df, labels)
+        return cached[1]
+
+    def recipes(self):
+        stamp = self._stamp(RECIPE_FILE)
+        if self._recipes is None or self._stamps.get(RECIPE_FILE) != stamp:
+            self.reads += 1
+            metrics.count("file_reads")
+            try:
+                with metrics.span(f"load {RECIPE_FILE}", "load"), open(self.path(RECIPE_FILE), 'r') as f:
+                    self._recipes = json.load(f)
+            except (OSError, ValueError):
+                self._recipes = {}
+            self._stamps[RECIPE_FILE] = stamp
+        return self._recipes
+
+    def flat_recipes(self):
+        """Recipes with sub-recipes expanded to bought ingredients (see :mod:`bakery.recipes`).
+
+        Flattened once per change of ``recipes.json``; treat as read-only.
+        """
+        recipes = self.recipes()
+        if self._flat is None or self._flat[0] is not recipes:
+            with metrics.span("flatten recipes", "compute"):
+                self._flat = (recipes, flatten(recipes))
+        return self._flat[1]
+
+    def version(self, name):
+        return self._versions.get(name, 0)
+
+    def _bump(self, event):
+        self._versions[event.table] = self.version(event.table) + 1
+
+    # ------------------------------------------
+    # SHARING THE FOLDER
+    # ------------------------------------------
+    def _stale(self):
+        names = [name for name in self._frames if self._stamps.get(name) != self._stamp(name)]
+        if self._recipes is not None and self._stamps.get(RECIPE_FILE) != self._stamp(RECIPE_FILE):
+            names.append(RECIPE_FILE)
+        return names
+
+    def sync(self):
+        """Catches up with changes other processes made; returns True if there were any.
+
+        Journaled transactions are applied to the cached frames as after-images
+        (no CSV is re-read); any other cached file whose stamp moved is dropped
+        and re-read on next use. Both announce themselves with the usual
+        events. When nothing changed this costs a few ``stat`` calls.
+        """
+        if not (self.journal is not None and self.journal.behind()) and not self._stale():
+            return False
+        with self.lock, metrics.span("sync with other counters", "load"):
+            if self.journal is not None:
+                self.journal.catch_up()
+            for name in self._stale():
+                self.invalidate(name)
+                self.events.emit(RowsChanged(name, None))
+        return True
+
+    def external_append(self, name, rows):
+        """``rows`` were appended to ``name`` by another process: drops the cached copy and announces them."""
+        self.invalidate(name)
+        self.events.emit(RowsAppended(name, rows))
+
+    def edit(self, name, fn):
+        """Read-modify-write of a whole table: ``fn(current frame)`` returns the new one.
+
+        The read happens inside the folder lock, after catching up, so another
+        counter's change can't slip in between (use this, not get() + write()).
+        """
+        with self.lock:
+            self.sync()
+            self.write(name, fn(self.get(name)))
+
+    def delete_row(self, name, key):
+        """Removes the row keyed ``key`` from a keyed table (a no-op if it is already gone)."""
+        def drop(df):
+            label = self.index(name).get(key)
+            return df if label is None else df.drop(index=label)
+        self.edit(name, drop)
+
+    # ------------------------------------------
+    # WRITE-THROUGH
+    # ------------------------------------------
+    def _replace_file(self, name, df):
+        """Writes to a temp file and swaps it in, so a crash never leaves half a CSV."""
+        metrics.count("file_writes")
+        with metrics.span(f"write {name}", "write"):
+            tmp = self.path(name) + ".tmp"
+            df.to_csv(tmp, index=False)
+            os.replace(tmp, self.path(name))
+
+    def write(self, name, df):
+        """Replaces a whole file and the cached frame with ``df``.
+
+        Raises ConflictError (writing nothing) if another process changed the
+        table and this process hadn't caught up yet: ``df`` is based on old data.
+        """
+        with self.lock:
+            seen = self.version(name)
+            self.sync()
+            if self.version(name) != seen:
+                raise ConflictError(f"{name} was just changed on another counter; please try again")
+            df = df.reset_index(drop=True)
+            if name == SALES_FILE:
+                self.sales.rewrite(df)
+            else:
+                self._replace_file(name, df)
+            self._frames[name] = df
+            self._stamps[name] = self._stamp(name)
+            if self.journal is not None and name in JOURNALED_FILES:
+                # The journal's after-images are now older than this file
+                self.journal.compact(skip=name)
+            self.events.emit(RowsChanged(name, None))
+
+    def flush(self, name):
+        """Rewrites a file from its cached frame, without any side effects."""
+        self._replace_file(name, self.get(name))
+        self._stamps[name] = self._stamp(name)
+
+    def append(self, name, rows):
+        """Appends ``rows`` (list of dicts) to the file and to the cached frame."""
+        with self.lock:
+            if name == SALES_FILE:
+                return self._append_sales(rows)
+            new = pd.DataFrame(rows, columns=SCHEMAS[name])
+            exists = os.path.exists(self.path(name))
+            cached = self.get(name) if exists else None  # before the append, or we'd re-read it
+            metrics.count("file_writes")
+            with metrics.span(f"append {name}", "write"):
+                new.to_csv(self.path(name), mode='a', index=False, header=not exists)
+            self._frames[name] = new if cached is None or cached.empty else pd.concat([cached, new], ignore_index=True)
+            self._stamps[name] = self._stamp(name)
+        self.events.emit(RowsAppended(name, rows))
+
+    def _append_sales(self, rows):
+        # Only keep the in-memory history current if someone already loaded it;
+        # a sale must never trigger a full-history read.
+        cached = self._frames.get(SALES_FILE) if self._stamps.get(SALES_FILE) == self._stamp(SALES_FILE) else None
+        metrics.count("file_writes")
+        with metrics.span(f"append {SALES_FILE}", "write"):
+            self.sales.append(rows)
+        if cached is not None:
+            new = pd.DataFrame(rows, columns=SALES_COLUMNS)
+            new['Date'] = pd.to_datetime(new['Date'], errors='coerce')
+            self._frames[SALES_FILE] = new if cached.empty else pd.concat([cached, new], ignore_index=True)
+            self._stamps[SALES_FILE] = self._stamp(SALES_FILE)
+        else:
+            self.invalidate(SALES_FILE)
+        self.events.emit(RowsAppended(SALES_FILE, rows))
+
+    def write_recipes(self, recipes):
+        """Replaces ``recipes.json`` atomically; raises ValueError (writing nothing) on a recipe loop."""
+        flat = flatten(recipes)
+        metrics.count("file_writes")
+        with self.lock, metrics.span(f"write {RECIPE_FILE}", "write"):
+            tmp = self.path(RECIPE_FILE) + ".tmp"
+            with open(tmp, 'w') as f: json.dump(recipes, f, indent=1)
+            os.replace(tmp, self.path(RECIPE_FILE))
+            self._recipes, self._flat = recipes, (recipes, flat)
+            self._stamps[RECIPE_FILE] = self._stamp(RECIPE_FILE)
+        self.events.emit(RowsChanged(RECIPE_FILE, None))
+
+    def update_recipes(self, changes):
+        """Applies a batch of ``{name: {component: amount}}`` edits in one write (see :func:`bakery.recipes.merge`).
+
+        Merged into the current file under the lock, so links saved on another counter are kept.
+        """
+        with self.lock:
+            self.sync()
+            self.write_recipes(merge(self.recipes(), changes))
+
+    def invalidate(self, name=None):
+        """Forgets one cached file (or all of them) so the next read hits disk."""
+        if name is None:
+            self._frames.clear(); self._stamps.clear(); self._recipes = None
+        else:
+            self._frames.pop(name, None); self._stamps.pop(name, None)
+            if name == RECIPE_FILE: self._recipes = None
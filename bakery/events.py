@@ -0,0 +1,35 @@
+"""Change notifications emitted by the data layer.
+
+Every mutation that goes through the :class:`~bakery.datastore.DataStore`
+(or the journal/rollups built on it) publishes a small typed event, so the
+UI can re-render only the panels and rows that were touched instead of
+calling ``refresh_all_data()`` after each action.
+"""
+from collections import namedtuple
+
+# Rows of ``table`` were modified in place. ``keys`` is the set of
+# product/ingredient names touched, or None when the whole table was replaced
+# (rows added, deleted or reordered).
+RowsChanged = namedtuple("RowsChanged", "table keys")
+
+# ``rows`` (list of dicts) were appended to ``table``.
+RowsAppended = namedtuple("RowsAppended", "table rows")
+
+# The dashboard rollups changed (a sale or an expense was booked).
+StatsChanged = namedtuple("StatsChanged", "")
+
+# ``amount`` was spent on materials or admin costs at ``when`` (journaled, so
+# every process sharing the folder books it).
+ExpenseLogged = namedtuple("ExpenseLogged", "amount when")
+
+
+class EventBus:
+    def __init__(self):
+        self._handlers = {}
+
+    def subscribe(self, event_type, handler):
+        self._handlers.setdefault(event_type, []).append(handler)
+
+    def emit(self, event):
+        for handler in self._handlers.get(type(event), ()):
+            handler(event)
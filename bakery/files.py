@@ -0,0 +1,11 @@
+"""Names of the database files in the data folder.
+
+Kept apart from :mod:`bakery.datastore` (which re-exports them) because
+they import nothing: the window can use them before pandas has loaded.
+"""
+
+INVENTORY_FILE = "bakery_inventory.csv"
+SALES_FILE = "sales_records.csv"
+INGREDIENTS_FILE = "ingredients.csv"
+PREORDER_FILE = "pre_orders.csv"
+RECIPE_FILE = "recipes.json"
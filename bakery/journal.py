@@ -0,0 +1,482 @@
+"""Append-only transaction journal for sales and stock movements.
+
+A sale used to rewrite ``bakery_inventory.csv`` and ``ingredients.csv`` in
+full, and a crash between those two writes left stock half-updated. Now a
+sale is one JSON line appended (and fsync'd) to ``transactions.journal``:
+
+    {"seq": 12, "ts": "...", "products": {"Pandesal": {"Stock": 88}},
+     "ingredients": {"Flour": {"Qty": 24.4, "Cost": ..., "Layers": ...}},
+     "sales": [{...}], "movements": [{...}],
+     "at": {"sales": {"2026-10": 48210}, "movements": {"2026-10": 9120}}}
+
+The line holds *after-images* (the new values, not deltas), so replaying it
+twice is harmless. Sales and ingredient movements (:mod:`bakery.stock`) are
+appended to their partitions after the line is durable; ``at`` records the
+size of each partition just before, so a transaction whose rows never got
+there (the process died in between) is found and its rows re-appended by
+whoever reads the journal next. A torn last line is simply ignored. Every
+``compact_every`` transactions, and on shutdown, the journal is folded back
+into the CSVs and restarted.
+
+The journal is also the change feed between processes sharing the data
+folder (see :meth:`~bakery.datastore.DataStore.sync`). A transaction is
+appended under the folder lock after catching up with every line already
+in the file, so ``seq`` is one global order and a sale is checked against
+the latest stock. The other processes read the lines they haven't seen yet
+(tracked by byte offset) and apply the after-images to their cached frames.
+Compaction starts a new *epoch*: the journal restarts with a header line
+``{"epoch": ..., "seq": ...}`` and the old file is kept as
+``transactions.journal.prev``, so a process that was a little behind can
+still read its tail.
+"""
+import os
+import json
+import uuid
+from datetime import datetime
+import pandas as pd
+
+from bakery.datastore import (INVENTORY_FILE, INGREDIENTS_FILE, SALES_FILE,
+                              JOURNALED_FILES, KEY_COLUMNS, parse_number)
+from bakery.events import RowsChanged, ExpenseLogged
+from bakery.partitions import month_key
+from bakery.stock import PURCHASE, USE, ADMIN, layers_of, receive, consume, materialize, ingredient_row
+from bakery.metrics import metrics
+
+JOURNAL_FILE = "transactions.journal"
+PREVIOUS_JOURNAL_FILE = JOURNAL_FILE + ".prev"  # the epoch before the last compaction
+_KEYS = {INVENTORY_FILE: "products", INGREDIENTS_FILE: "ingredients"}
+
+
+def _blank(val):
+    return val is None or (isinstance(val, float) and pd.isna(val)) or str(val).strip() == ""
+
+
+def import_legacy_csvs(store):
+    """One-time cleanup of hand-edited CSVs before the journal takes over.
+
+    The store already coerces numeric cells on load; this trims names and
+    drops blank or duplicate rows (a sale only ever touches the first match),
+    then writes the clean files back so every later transaction starts from
+    typed, unambiguous data. ``[ADMIN]`` rows are expense history, one per
+    expense logged ("[ADMIN] Rent" every month), so repeats of those are kept.
+    """
+    for name, col in KEY_COLUMNS.items():
+        df = store.get(name).copy()
+        df[col] = df[col].fillna("").astype(str).str.strip()
+        df = df[df[col].ne("") & df[col].ne("nan")]
+        df = df[~df.duplicated(subset=col, keep="first") | df[col].str.startswith("[ADMIN]")]
+        store.write(name, df)
+
+
+def _by_month(rows):
+    months = {}
+    for r in rows:
+        months.setdefault(month_key(r["Date"]), []).append(r)
+    return months
+
+
+class SalesJournal:
+    def __init__(self, store, compact_every=200):
+        self.store = store
+        self.path = store.path(JOURNAL_FILE)
+        self.prev_path = store.path(PREVIOUS_JOURNAL_FILE)
+        self.compact_every = compact_every
+        self.seq = 0
+        self.count = 0  # transactions since the last compaction
+        self._pending = {f: {} for f in JOURNALED_FILES}  # latest after-image per row
+        self.epoch = None  # header of the journal we are reading (None: pre-epoch journal)
+        self.offset = 0  # bytes of it already applied here
+        self._seen = None  # (mtime, size) of the journal after our last read or write
+        self.on_compact = []  # callables run after each checkpoint
+        self.on_resync = []  # callables run after catching up across a gap in the feed
+
+    # ------------------------------------------
+    # STARTUP / RECOVERY
+    # ------------------------------------------
+    def open(self):
+        """Attaches to the store and replays whatever is left in the journal."""
+        with self.store.lock:
+            if not os.path.exists(self.path):
+                if not os.path.exists(self.prev_path):  # else: compaction stopped between its two renames
+                    import_legacy_csvs(self.store)  # first run on existing data
+                self._new_epoch()
+            txns, good_bytes = self._read(self.path, 0)
+            for txn in txns:
+                self._remember(txn)
+            if good_bytes != os.path.getsize(self.path):
+                with open(self.path, "r+b") as f: f.truncate(good_bytes)  # torn write from a crash
+            self.offset, self._seen = good_bytes, self._stamp()
+            self.store.journal = self
+            for name in JOURNALED_FILES:
+                df, _ = self.store.cached(name)
+                if df is not None:  # already loaded (or primed from a snapshot): catch it up
+                    self.overlay(name, df)
+            self._settle(txns)
+        return self
+
+    def _read(self, path, start):
+        """Complete transactions after byte ``start`` of ``path``, and the offset just past them.
+
+        An epoch header sets ``self.epoch``/``self.seq`` instead of being returned.
+        """
+        txns, end = [], start
+        with open(path, "rb") as f:
+            f.seek(start)
+            for raw in f:
+                try:
+                    txn = json.loads(raw) if raw.endswith(b"\n") else None
+                except ValueError:
+                    txn = None
+                if txn is None:
+                    break  # torn write from a crash; nothing after it counts
+                end += len(raw)
+                if "epoch" in txn:
+                    self.epoch, self.seq = txn["epoch"], max(self.seq, txn.get("seq", 0))
+                else:
+                    txns.append(txn)
+        return txns, end
+
+    def _epoch_of(self, path):
+        try:
+            with open(path, "rb") as f: head = json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
+        return head.get("epoch")
+
+    def _stamp(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _new_epoch(self):
+        """Starts an empty journal under a fresh epoch; the old file is kept for processes still reading it."""
+        epoch = uuid.uuid4().hex
+        header = (json.dumps({"epoch": epoch, "seq": self.seq}) + "\n").encode("utf-8")
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.flush(); os.fsync(f.fileno())
+        if os.path.exists(self.path):
+            os.replace(self.path, self.prev_path)
+        os.replace(tmp, self.path)
+        self.epoch, self.offset, self._seen = epoch, len(header), self._stamp()
+
+    # ------------------------------------------
+    # CHANGE FEED
+    # ------------------------------------------
+    def behind(self):
+        """True if the journal changed since this process last read or wrote it (one ``stat``)."""
+        return self._stamp() != self._seen
+
+    def catch_up(self):
+        """Applies the transactions other processes recorded since we last looked; returns how many.
+
+        If another process compacted meanwhile, the rest of our epoch is read
+        from the kept previous journal. If even that is gone (we slept through
+        two compactions, or a backup was restored), the journaled tables are
+        re-read from the CSVs and the ``on_resync`` hooks run.
+        """
+        with self.store.lock:
+            if not self.behind():
+                return 0
+            txns, gap, repaired = [], False, []
+            epoch = self._epoch_of(self.path)
+            if epoch != self.epoch:
+                if os.path.exists(self.prev_path) and self._epoch_of(self.prev_path) == self.epoch:
+                    txns, _ = self._read(self.prev_path, self.offset)
+                    for txn in txns:
+                        self._apply(txn)
+                else:
+                    gap = True
+                self._pending = {f: {} for f in JOURNALED_FILES}  # the CSVs hold all of it now
+                self.count = 0
+                for name in JOURNALED_FILES:
+                    if gap: self.store.invalidate(name)
+                    self.store.events.emit(RowsChanged(name, None))  # the compaction may have added rows
+                self.offset = 0
+            current, self.offset = self._read(self.path, self.offset)
+            for txn in current:
+                self._apply(txn)
+            txns += current
+            if not gap:
+                repaired = self._settle(txns)  # rows of a counter that died mid-commit
+            self._seen = self._stamp()
+            metrics.count("feed_transactions", len(txns))
+            if gap:
+                self.store.invalidate(SALES_FILE)
+                for hook in self.on_resync:
+                    hook()
+            else:
+                # The sales are already in the partitions (written by the process that committed
+                # them). Announced as one batch, so listeners never see half a catch-up.
+                skip = {id(row) for row in repaired}  # appended (and announced) by _settle
+                sales = [row for txn in txns for row in txn.get("sales", []) if id(row) not in skip]
+                if sales:
+                    self.store.external_append(SALES_FILE, sales)
+                for txn in txns:
+                    self._announce_expense(txn)
+            return len(txns)
+
+    def _apply(self, txn):
+        """Applies one transaction's after-images to the cached frames and announces the rows it touched."""
+        for name in JOURNALED_FILES:
+            self.overlay(name, self.store.get(name), txn.get(_KEYS[name], {}), self.store.index(name))
+        self._remember(txn)
+        for name in JOURNALED_FILES:
+            if txn.get(_KEYS[name]):
+                self.store.events.emit(RowsChanged(name, set(txn[_KEYS[name]])))
+
+    def _announce_expense(self, txn):
+        if txn.get("expense"):
+            self.store.events.emit(ExpenseLogged(txn["expense"], datetime.fromisoformat(txn["ts"])))
+
+    def _remember(self, txn):
+        self.seq = max(self.seq, txn.get("seq", 0))
+        self.count += 1
+        for name, key in _KEYS.items():
+            for row, fields in txn.get(key, {}).items():
+                self._pending[name].setdefault(row, {}).update(fields)
+
+    def _settle(self, txns):
+        """Re-appends the sales and movements of ``txns`` that never reached their partitions; returns those sales.
+
+        A transaction's rows are missing from a month if the next transaction
+        appending to that month (or the partition as it is now) still found
+        the size recorded in the transaction's ``at``. Run under the lock
+        before anything new is committed, so a repair always lands before the
+        next ``at`` is taken.
+        """
+        sales = self._unwritten(self.store.sales, txns, "sales", "Product")
+        if sales:
+            self.store.append(SALES_FILE, sales)
+        movements = self._unwritten(self.store.movements, txns, "movements", "Ingredient")
+        if movements:
+            self.store.movements.append(movements)
+        return sales
+
+    def _unwritten(self, parts, txns, field, key):
+        waiting, missing = {}, []  # month -> (size before, rows) of the last transaction appending to it
+        for txn in txns:
+            at = txn.get("at", {}).get(field, {})
+            for month, size in at.items():
+                if month in waiting and waiting[month][0] == size:
+                    missing.extend(waiting.pop(month)[1])
+            for month, rows in _by_month(txn.get(field, [])).items():
+                waiting[month] = (at.get(month), rows)
+        if waiting:
+            sizes = parts.sizes()
+            for month, (size, rows) in waiting.items():
+                if size is not None and sizes.get(month, 0) == size:
+                    missing.extend(rows)
+        if txns and "at" not in txns[-1]:  # journal from before "at": check the last transaction's tail
+            missing.extend(self._missing(parts, txns[-1].get(field, []), key))
+        return missing
+
+    def _missing(self, parts, rows, key):
+        """``rows`` that aren't at the end of their month's partition (a batch can span several months)."""
+        missing = []
+        for month, group in _by_month(rows).items():
+            tail = parts.tail(month, len(group))
+            stamps = [pd.Timestamp(r["Date"]) for r in group]
+            if len(tail) != len(group) or list(tail['Date']) != stamps or list(tail[key]) != [r[key] for r in group]:
+                missing.extend(group)
+        return missing
+
+    def overlay(self, name, df, rows=None, index=None):
+        """Applies after-images (default: everything pending) to a frame."""
+        rows = self._pending.get(name) if rows is None else rows
+        if not rows:
+            return
+        if index is None:  # frame fresh from disk, not indexed by the store yet
+            index = {}
+            for label, key in zip(df.index, df[KEY_COLUMNS[name]]):
+                index.setdefault(key, label)
+        for row, fields in rows.items():
+            if row in index:  # rows deleted since are skipped
+                for field, val in fields.items():
+                    df.at[index[row], field] = val
+
+    # ------------------------------------------
+    # TRANSACTIONS
+    # ------------------------------------------
+    def commit(self, products=None, ingredients=None, sales=None, expense=0.0, movements=None):
+        """Durably records one transaction, then applies it to the cached frames.
+
+        ``products``/``ingredients`` map a row name to its new field values;
+        ``sales`` is a list of rows for the sales table; ``expense`` is money
+        spent (restock or admin cost) for the dashboard; ``movements`` are
+        rows for the ingredient movement ledger.
+        """
+        with self.store.lock:
+            self.catch_up()  # after-images must be computed from, and ordered after, everything already in
+            self.seq += 1
+            txn = {"seq": self.seq, "ts": datetime.now().isoformat(timespec="seconds"),
+                   "products": products or {}, "ingredients": ingredients or {}, "sales": sales or []}
+            if expense:
+                txn["expense"] = float(expense)
+            if movements:
+                txn["movements"] = movements
+            if sales or movements:  # where their rows will start (see _settle)
+                txn["at"] = {field: {m: parts.size(m) for m in _by_month(rows)}
+                             for field, parts, rows in (("sales", self.store.sales, sales), ("movements", self.store.movements, movements))
+                             if rows}
+            line = (json.dumps(txn) + "\n").encode("utf-8")
+            metrics.count("journal_commits")
+            with metrics.span("journal commit (fsync)", "write"), open(self.path, "ab") as f:
+                f.write(line)
+                f.flush(); os.fsync(f.fileno())
+            self.offset += len(line)
+            self._seen = self._stamp()
+            # Committed. Everything below can be rebuilt from the journal line.
+            self._apply(txn)
+            if sales:
+                self.store.append(SALES_FILE, sales)
+            if movements:
+                self.store.movements.append(movements)
+            self._announce_expense(txn)
+            if self.count >= self.compact_every:
+                self.compact()
+
+    def restock(self, name, qty, cost):
+        """Buys ``qty`` of an ingredient for ``cost`` in total: a new cost layer, a purchase movement and an expense.
+
+        Computed under the lock from the latest layers, so two counters
+        restocking at once both count. Returns False (recording nothing) if
+        there is no such ingredient; raises ValueError if ``qty`` isn't above 0.
+        """
+        with self.store.lock:
+            self.catch_up()
+            label = self.store.index(INGREDIENTS_FILE).get(name)
+            if label is None:
+                return False
+            df = self.store.get(INGREDIENTS_FILE)
+            unit_cost = float(df.at[label, 'Unit Cost'])
+            layers = receive(layers_of(float(df.at[label, 'Qty']), df.at[label, 'Layers'], unit_cost), qty, cost)
+            when = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.commit(ingredients={name: materialize(layers, unit_cost)}, expense=cost,
+                        movements=[{"Date": when, "Ingredient": name, "Kind": PURCHASE, "Qty": qty, "Cost": round(cost, 2)}])
+            return True
+
+    def log_expense(self, name, amount):
+        """Logs an admin expense: an ``[ADMIN]`` row named ``name``, an ``admin`` movement and the expense.
+
+        The movement dates it, so the dashboard can rebuild each month's expenses.
+        """
+        with self.store.lock:
+            row = pd.DataFrame([ingredient_row(name, 1.0, amount)])
+            self.store.edit(INGREDIENTS_FILE, lambda df: pd.concat([df, row]))
+            when = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.commit(expense=amount,  # every counter's dashboard books it
+                        movements=[{"Date": when, "Ingredient": name, "Kind": ADMIN, "Qty": 1.0, "Cost": round(amount, 2)}])
+
+    def _consume(self, df_i, ing_index, uses):
+        """After-images and ``use`` movements for taking ``{when: {ingredient: qty}}`` out of stock, FIFO.
+
+        Each movement is dated ``when``, the time of the sales it was used
+        for, so a backdated import books its materials to the sales' month.
+        """
+        layers, after, movements = {}, {}, []
+        for when, used in uses.items():
+            for ing, qty in used.items():
+                label = ing_index[ing]
+                unit_cost = float(df_i.at[label, 'Unit Cost'])
+                if ing not in layers:
+                    layers[ing] = layers_of(float(df_i.at[label, 'Qty']), df_i.at[label, 'Layers'], unit_cost)
+                layers[ing], cost = consume(layers[ing], qty, unit_cost)
+                after[ing] = materialize(layers[ing], unit_cost)
+                movements.append({"Date": when, "Ingredient": ing, "Kind": USE, "Qty": -round(qty, 3), "Cost": -round(cost, 2)})
+        return after, movements
+
+    def sell(self, prod, qty):
+        """Sells ``qty`` of ``prod`` and deducts its recipe.
+
+        Returns the sales row that was recorded, or None if out of stock.
+        """
+        sales, _ = self.sell_many([{"Product": prod, "Qty": qty}])
+        return sales[0] if sales else None
+
+    def sell_many(self, lines, strict=True, check_ingredients=False):
+        """Sells a batch of lines as one transaction (one journal write).
+
+        ``lines`` are dicts with ``Product`` and ``Qty`` and optionally
+        ``Date`` and ``Total`` (default: now, and price x qty). Stock and
+        recipe deductions accumulate across lines, so the batch is checked as
+        a whole. With ``check_ingredients`` a line also fails if it would take
+        a recipe ingredient below zero. With ``strict`` nothing is recorded if
+        any line fails; otherwise failing lines are skipped. Returns
+        ``(sales rows recorded, [(line number, problem), ...])``.
+
+        Checked and recorded under the folder lock, against stock that
+        includes every other counter's sales.
+        """
+        with self.store.lock:
+            self.catch_up()
+            return self._sell_many(lines, strict, check_ingredients)
+
+    def _sell_many(self, lines, strict, check_ingredients):
+        df_p = self.store.get(INVENTORY_FILE); df_i = self.store.get(INGREDIENTS_FILE)
+        prod_index = self.store.index(INVENTORY_FILE); ing_index = self.store.index(INGREDIENTS_FILE)
+        recipes = self.store.flat_recipes()
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        stock, ing_qty, uses, sales, problems = {}, {}, {}, [], []
+        for n, line in enumerate(lines, 1):
+            prod = str(line.get("Product", "")).strip()
+            if prod not in prod_index:
+                problems.append((n, f"unknown product '{prod}'")); continue
+            try:
+                qty = parse_number(line.get("Qty"), default=None)
+                when = now if _blank(line.get("Date")) else pd.Timestamp(line["Date"]).strftime("%Y-%m-%d %H:%M:%S")
+                total = None if _blank(line.get("Total")) else float(line["Total"])
+            except (TypeError, ValueError):
+                problems.append((n, "bad quantity, date or total")); continue
+            if qty is None or qty <= 0 or qty != int(qty):
+                problems.append((n, "quantity must be a whole number above 0")); continue
+            qty = int(qty)
+            left = stock.get(prod, int(df_p.at[prod_index[prod], 'Stock']))
+            if left < qty:
+                problems.append((n, f"only {left} {prod} left")); continue
+            needs = {ing: ing_qty.get(ing, float(df_i.at[ing_index[ing], 'Qty'])) - amt * qty
+                     for ing, amt in recipes.get(prod, {}).items() if ing in ing_index}
+            short = [ing for ing, after in needs.items() if round(after, 6) < 0] if check_ingredients else []  # using it all up is fine
+            if short:
+                problems.append((n, f"not enough {', '.join(short)} for {qty} {prod}")); continue
+            stock[prod] = left - qty
+            ing_qty.update(needs)
+            used = uses.setdefault(when, {})  # lines sold at the same time share their movements
+            for ing, amt in recipes.get(prod, {}).items():
+                if ing in ing_index and amt * qty > 0:
+                    used[ing] = used.get(ing, 0.0) + amt * qty
+            sales.append({"Date": when, "Product": prod, "Qty": qty,
+                          "Total": float(df_p.at[prod_index[prod], 'Price']) * qty if total is None else total})
+        if not sales or (strict and problems):
+            return [], problems
+        # Each sale time's use of each ingredient, taken out oldest layer first
+        ingredients, movements = self._consume(df_i, ing_index, {w: u for w, u in uses.items() if u})
+        self.commit(products={p: {"Stock": s} for p, s in stock.items()},
+                    ingredients=ingredients, sales=sales, movements=movements)
+        return sales, problems
+
+    # ------------------------------------------
+    # COMPACTION
+    # ------------------------------------------
+    def compact(self, skip=None):
+        """Folds the journal into the CSVs and starts a new epoch.
+
+        Safe to interrupt: the journal is set aside last, and replaying
+        after-images over already-compacted files changes nothing.
+        """
+        with self.store.lock:
+            self.catch_up()  # the CSVs must include the other counters' transactions too
+            if self.count == 0:
+                return
+            with metrics.span("journal compact", "write"):
+                for name in JOURNALED_FILES:
+                    if name != skip:
+                        self.store.flush(name)
+                self._new_epoch()
+            self._pending = {f: {} for f in JOURNALED_FILES}
+            self.count = 0
+            for hook in self.on_compact:
+                hook()
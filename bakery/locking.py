@@ -0,0 +1,87 @@
+"""Cross-process lock on the data folder.
+
+Two counters (two app windows on one PC, or PCs sharing the folder over the
+LAN) write the same files. Every change takes ``bakery.lock`` in the data
+folder first, so a read-modify-write (catch up with the other counter, check
+stock, record the sale) runs in one process at a time. It is an OS file
+lock (``msvcrt`` on Windows, ``flock`` elsewhere) that the OS drops if the
+process dies, so a crash never leaves the folder locked.
+
+The lock is re-entrant within a process, so nested ``with store.lock:``
+blocks are fine, and it also serializes threads of the same process.
+"""
+import time
+import threading
+
+try:
+    import msvcrt
+except ImportError:  # not Windows
+    msvcrt = None
+    import fcntl
+
+from bakery.metrics import metrics
+
+LOCK_FILE = "bakery.lock"
+
+
+class LockTimeout(TimeoutError):
+    pass
+
+
+class FolderLock:
+    def __init__(self, path, timeout=10.0, poll=0.02):
+        self.path = path
+        self.timeout = timeout
+        self.poll = poll
+        self._local = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def _try_lock(self):
+        try:
+            if msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(self):
+        if msvcrt is not None:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def acquire(self):
+        """Blocks until this process holds the lock; raises LockTimeout after ``timeout`` seconds."""
+        if not self._local.acquire(timeout=self.timeout):
+            raise LockTimeout(f"{self.path} is busy in this process")
+        if self._depth == 0:
+            if self._file is None:
+                self._file = open(self.path, "a+b")
+            if not self._try_lock():
+                metrics.count("lock_waits")
+                deadline = time.monotonic() + self.timeout
+                with metrics.span("wait for folder lock", "write"):
+                    while not self._try_lock():
+                        if time.monotonic() >= deadline:
+                            self._local.release()
+                            raise LockTimeout(f"{self.path} is held by another counter")
+                        time.sleep(self.poll)
+        self._depth += 1
+        return self
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self._unlock()
+        self._local.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
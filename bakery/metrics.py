@@ -0,0 +1,95 @@
+"""Timing spans and counters for finding where the time goes.
+
+Code wraps a stage in ``with metrics.span("load bakery_inventory.csv", "load")``
+and bumps counters with ``metrics.count("file_reads")``. Spans land in a
+bounded ring buffer (the most recent ``capacity``), so recording is cheap
+enough to leave on in production. The app's performance panel shows
+:meth:`Metrics.summary` and can export the raw trace as JSON or CSV to attach
+to a ticket.
+
+Categories in use: ``load`` (parsing files), ``compute`` (costing, planning,
+rollups), ``render`` (panel refreshes), ``write`` (anything that touches
+disk), ``startup``.
+"""
+import csv
+import json
+import time
+import threading
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+
+# start: wall-clock epoch seconds; ms: duration
+SpanRecord = namedtuple("SpanRecord", "name category start ms thread")
+
+
+class Metrics:
+    def __init__(self, capacity=5000):
+        self.spans = deque(maxlen=capacity)
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, category="compute"):
+        start, t0 = time.time(), time.perf_counter()
+        try:
+            yield
+        finally:
+            record = SpanRecord(name, category, start, (time.perf_counter() - t0) * 1000,
+                                threading.current_thread().name)
+            with self._lock:
+                self.spans.append(record)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear(); self.counters.clear()
+
+    def records(self, since=None):
+        """Spans recorded so far (only those started after ``since`` epoch seconds)."""
+        with self._lock:
+            spans = list(self.spans)
+        return spans if since is None else [s for s in spans if s.start >= since]
+
+    def summary(self, since=None):
+        """Per-span-name count, total, mean, p50, p95 and max in ms, slowest total first."""
+        import pandas as pd  # not at module level: the app times its startup before pandas is loaded
+        df = pd.DataFrame(self.records(since), columns=SpanRecord._fields)
+        if df.empty:
+            return pd.DataFrame(columns=["name", "category", "count", "total", "mean", "p50", "p95", "max"])
+        grouped = df.groupby(["name", "category"])['ms']
+        out = grouped.agg(count="count", total="sum", mean="mean", max="max")
+        out["p50"] = grouped.quantile(0.5)
+        out["p95"] = grouped.quantile(0.95)
+        return out.reset_index().sort_values("total", ascending=False)[["name", "category", "count", "total", "mean", "p50", "p95", "max"]]
+
+    def format_summary(self, since=None):
+        """Fixed-width table for the performance panel."""
+        lines = [f"{'Stage':<34} {'Cat':<8} {'N':>6} {'Total':>9} {'Mean':>8} {'p95':>8} {'Max':>8}", "-"*86]
+        for name, cat, n, total, mean, _, p95, mx in self.summary(since).itertuples(index=False):
+            lines.append(f"{str(name)[:34]:<34} {cat:<8} {n:>6} {total:>9.1f} {mean:>8.2f} {p95:>8.2f} {mx:>8.2f}")
+        with self._lock:
+            counters = dict(self.counters)
+        lines += ["", "COUNTERS"] + [f"{k:<34} {v:>10,}" for k, v in sorted(counters.items())]
+        return "\n".join(lines)
+
+    def export_json(self, path):
+        with self._lock:
+            counters = dict(self.counters)
+        data = {"exported": datetime.now().isoformat(timespec="seconds"), "counters": counters,
+                "spans": [s._asdict() for s in self.records()]}
+        with open(path, "w", encoding="utf-8") as f: json.dump(data, f, indent=1)
+        return path
+
+    def export_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            out = csv.writer(f)
+            out.writerow(SpanRecord._fields)
+            out.writerows(self.records())
+        return path
+
+
+metrics = Metrics()  # process-wide default; everything in the package records here
@@ -0,0 +1,261 @@
+"""Month-partitioned sales storage with a small time-range manifest.
+
+Sales live in ``sales/YYYY-MM.csv`` (same columns as the old
+``sales_records.csv``) instead of one ever-growing file. ``sales/manifest.json``
+records rows, bytes and first/last sale per partition, so "today", "this
+month" or any date range opens only the partitions that overlap it. Rows
+whose date can't be parsed go to ``sales/undated.csv``.
+
+The manifest is only a cache: on open, any partition whose size on disk
+differs from its manifest entry (crash mid-append, hand edit) is rescanned.
+When another process sharing the folder rewrites the manifest, it is re-read
+on next use (one ``stat`` per call), so appends never drop each other's entries.
+
+The ingredient movement ledger (:mod:`bakery.stock`) is stored the same way,
+under ``movements/`` with its own columns.
+"""
+import os
+import csv
+import glob
+import json
+import shutil
+import pandas as pd
+
+SALES_COLUMNS = ["Date", "Product", "Qty", "Total"]
+SALES_DIR = "sales"
+MANIFEST_FILE = "manifest.json"
+LEGACY_SALES_FILE = "sales_records.csv"
+UNDATED = "undated"
+
+
+def month_key(when):
+    return pd.Timestamp(when).strftime("%Y-%m")
+
+
+class SalesPartitions:
+    def __init__(self, folder=".", dirname=SALES_DIR, columns=SALES_COLUMNS, legacy=LEGACY_SALES_FILE):
+        self.folder = folder
+        self.dir = os.path.join(folder, dirname)
+        self.columns = columns
+        self.legacy = legacy  # single file to split into partitions on first open, if any
+        self.manifest_path = os.path.join(self.dir, MANIFEST_FILE)
+        self.manifest = None  # loaded lazily by _ensure()
+        self._manifest_stamp = None  # manifest.json as we last read or wrote it
+
+    def path(self, key):
+        return os.path.join(self.dir, f"{key}.csv")
+
+    # ------------------------------------------
+    # OPEN / MIGRATE / RECONCILE
+    # ------------------------------------------
+    def open(self):
+        """Migrates a legacy sales file and reconciles the manifest (idempotent)."""
+        self._ensure()
+        return self
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.manifest_path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _ensure(self):
+        if self.manifest is not None:
+            if self._file_stamp() != self._manifest_stamp:  # another process appended
+                try:
+                    stamp = self._file_stamp()
+                    with open(self.manifest_path, "r") as f: self.manifest = json.load(f)
+                    self._manifest_stamp = stamp
+                except (OSError, ValueError):
+                    pass  # caught mid-replace; keep ours and retry on the next call
+            return
+        legacy = os.path.join(self.folder, self.legacy) if self.legacy else None
+        if legacy is not None and os.path.exists(legacy):
+            if glob.glob(os.path.join(self.dir, "*.csv")):
+                os.replace(legacy, legacy + ".migrated")  # crashed right after migrating
+            else:
+                self.migrate(legacy)
+        os.makedirs(self.dir, exist_ok=True)
+        try:
+            with open(self.manifest_path, "r") as f: self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        on_disk = {os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(self.dir, "*.csv"))}
+        stale = [k for k in on_disk if self.manifest.get(k, {}).get("bytes") != os.path.getsize(self.path(k))]
+        for key in stale:
+            self._rescan(key)
+        for key in set(self.manifest) - on_disk:
+            del self.manifest[key]
+        if stale or set(self.manifest) != on_disk:
+            self._save_manifest()
+        self._manifest_stamp = self._file_stamp()
+
+    def migrate(self, legacy_path):
+        """One-time split of ``sales_records.csv`` into monthly partitions.
+
+        Partitions are built in a staging folder and swapped in whole, so a
+        crash mid-migration just restarts it. The old file is kept as
+        ``sales_records.csv.migrated`` rather than deleted, and is not read
+        again.
+        """
+        staging = SalesPartitions(self.folder, os.path.basename(self.dir) + ".migrating", self.columns, legacy=None)
+        shutil.rmtree(staging.dir, ignore_errors=True)
+        os.makedirs(staging.dir)
+        staging.manifest = {}
+        for chunk in pd.read_csv(legacy_path, chunksize=100_000):
+            staging._append_frame(chunk.reindex(columns=self.columns), save=False)
+        staging._save_manifest()
+        shutil.rmtree(self.dir, ignore_errors=True)
+        os.replace(staging.dir, self.dir)
+        os.replace(legacy_path, legacy_path + ".migrated")
+
+    def _rescan(self, key):
+        df = self._read_partition(key)
+        dates = df['Date'].dropna()
+        self.manifest[key] = {
+            "rows": len(df), "bytes": os.path.getsize(self.path(key)),
+            "first": str(dates.min()) if len(dates) else None,
+            "last": str(dates.max()) if len(dates) else None,
+        }
+
+    def _save_manifest(self):
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f: json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+        self._manifest_stamp = self._file_stamp()
+
+    # ------------------------------------------
+    # WRITES
+    # ------------------------------------------
+    def append(self, rows):
+        """Appends rows (list of dicts), each to its month's partition.
+
+        The per-sale path: a few rows, written with the csv module (same
+        output as ``to_csv``) rather than through a DataFrame.
+        """
+        self._ensure()
+        groups = {}
+        for row in rows:
+            try:
+                when = pd.Timestamp(row["Date"])
+            except (TypeError, ValueError):
+                when = pd.NaT
+            key = UNDATED if pd.isna(when) else when.strftime("%Y-%m")
+            groups.setdefault(key, []).append((when, row))
+        for key, part in groups.items():
+            path = self.path(key)
+            exists = os.path.exists(path)
+            with open(path, "a", newline="", encoding="utf-8") as f:
+                out = csv.writer(f, lineterminator=os.linesep)
+                if not exists:
+                    out.writerow(self.columns)
+                out.writerows([row.get(c) for c in self.columns] for _, row in part)
+            dates = [str(when) for when, _ in part if not pd.isna(when)]
+            entry = self.manifest.setdefault(key, {"rows": 0, "first": None, "last": None})
+            entry["rows"] += len(part)
+            entry["bytes"] = os.path.getsize(path)
+            if dates:
+                entry["first"] = min(dates) if entry["first"] is None else min(entry["first"], min(dates))
+                entry["last"] = max(dates) if entry["last"] is None else max(entry["last"], max(dates))
+        self._save_manifest()
+
+    def _append_frame(self, df, save=True):
+        dates = pd.to_datetime(df['Date'], errors='coerce')
+        keys = dates.dt.strftime("%Y-%m").fillna(UNDATED)
+        for key, part in df.groupby(keys, sort=False):
+            path = self.path(key)
+            exists = os.path.exists(path)
+            part.to_csv(path, mode='a', index=False, header=not exists)
+            d = dates[part.index].dropna()
+            entry = self.manifest.setdefault(key, {"rows": 0, "first": None, "last": None})
+            entry["rows"] += len(part)
+            entry["bytes"] = os.path.getsize(path)
+            if len(d):
+                lo, hi = str(d.min()), str(d.max())
+                entry["first"] = lo if entry["first"] is None else min(entry["first"], lo)
+                entry["last"] = hi if entry["last"] is None else max(entry["last"], hi)
+        if save:
+            self._save_manifest()
+
+    def rewrite(self, df):
+        """Replaces all partitions with ``df`` (Date column parsed or not)."""
+        self._ensure()
+        for key in list(self.manifest):
+            os.remove(self.path(key))
+        self.manifest = {}
+        out = df.copy()
+        if pd.api.types.is_datetime64_any_dtype(out['Date']):
+            out['Date'] = out['Date'].dt.strftime("%Y-%m-%d %H:%M:%S")
+        self._append_frame(out[self.columns])
+
+    # ------------------------------------------
+    # READS
+    # ------------------------------------------
+    def keys(self, start=None, end=None):
+        """Partition keys overlapping ``[start, end)``, oldest first (undated only when unbounded)."""
+        self._ensure()
+        dated = sorted(k for k in self.manifest if k != UNDATED)
+        if start is None and end is None:
+            return dated + ([UNDATED] if UNDATED in self.manifest else [])
+        lo = month_key(start) if start is not None else ""
+        hi = month_key(pd.Timestamp(end) - pd.Timedelta(microseconds=1)) if end is not None else "9999-99"
+        return [k for k in dated if lo <= k <= hi]
+
+    def paths(self, start=None, end=None):
+        return [self.path(k) for k in self.keys(start, end)]
+
+    def _read_partition(self, key):
+        df = pd.read_csv(self.path(key))
+        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+        return df
+
+    def read(self, start=None, end=None):
+        """Sales in ``[start, end)`` with 'Date' parsed, touching only overlapping partitions."""
+        frames = [self._read_partition(k) for k in self.keys(start, end)]
+        if not frames:
+            df = pd.DataFrame(columns=self.columns)
+            df['Date'] = pd.to_datetime(df['Date'])
+            return df
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        if start is not None:
+            df = df[df['Date'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['Date'] < pd.Timestamp(end)]
+        return df.reset_index(drop=True)
+
+    def iter_partitions(self):
+        """Yields ``(key, frame)`` one partition at a time, for full passes in flat memory."""
+        for key in self.keys():
+            yield key, self._read_partition(key)
+
+    def tail(self, key, n):
+        """Last ``n`` rows of one partition (the journal's crash-recovery check)."""
+        self._ensure()
+        if key not in self.manifest:
+            return pd.DataFrame(columns=self.columns)
+        return self._read_partition(key).tail(n)
+
+    def size(self, key):
+        """Bytes in one partition (0 if it doesn't exist yet)."""
+        try:
+            return os.path.getsize(self.path(key))
+        except OSError:
+            return 0
+
+    def sizes(self):
+        """``{key: bytes}`` per partition, for readers that track how far they got."""
+        self._ensure()
+        return {k: os.path.getsize(self.path(k)) for k in self.manifest}
+
+    def stamp(self):
+        """Changes whenever any partition changes on disk."""
+        self._ensure()
+        stamp = []
+        for key in sorted(self.manifest):
+            try:
+                st = os.stat(self.path(key))
+                stamp.append((key, st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append((key, None, None))
+        return tuple(stamp)
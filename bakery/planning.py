@@ -0,0 +1,69 @@
+"""Production planning over the pre-order book.
+
+Pre-orders carry structured ``Customer``, ``Product``, ``Qty`` and pickup
+``Date`` fields (older free-text rows are split on load, see
+:func:`bakery.datastore.structure_preorders`). :class:`ProductionPlanner`
+keeps a sorted pickup-date index over them, so any window is two binary
+searches instead of a scan with string compares.
+
+A plan for a window is computed in one vectorized pass: units per product
+(``groupby``), then raw materials as a sparse matrix-vector product over the
+flattened recipes (``bincount(cols, amounts * units[rows])``), compared with
+stock in ``ingredients.csv``.
+"""
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+from bakery.datastore import PREORDER_FILE, INGREDIENTS_FILE
+from bakery.recipes import compile_recipes
+from bakery.metrics import metrics
+
+# orders: the pre-orders in the window; bake: Product/Units;
+# materials: Ingredient/Needed/In Stock/Short, biggest shortage first
+Plan = namedtuple("Plan", "start end orders bake materials")
+
+
+class ProductionPlanner:
+    def __init__(self, store):
+        self.store = store
+        self._index = None  # (frame it was built from, sorted pickup days, row positions)
+
+    def _pickup_index(self):
+        df = self.store.get(PREORDER_FILE)
+        if self._index is None or self._index[0] is not df:
+            days = pd.to_datetime(df['Date'], errors='coerce').to_numpy(dtype="datetime64[D]")
+            order = np.argsort(days, kind="stable")  # NaT (bad dates) sort last
+            self._index = (df, days[order], order)
+        return self._index
+
+    def orders(self, start, end):
+        """Pre-orders picked up ``start``..``end`` (inclusive days), by pickup date."""
+        df, days, order = self._pickup_index()
+        lo = np.searchsorted(days, np.datetime64(pd.Timestamp(start).date(), "D"), side="left")
+        hi = np.searchsorted(days, np.datetime64(pd.Timestamp(end).date(), "D"), side="right")
+        return df.iloc[order[lo:hi]]
+
+    def plan(self, start, end):
+        with metrics.span("production plan", "compute"):
+            return self._plan(start, end)
+
+    def _plan(self, start, end):
+        orders = self.orders(start, end)
+        units = orders.groupby('Product', sort=False)['Qty'].sum()
+        units = units[units > 0].sort_values(ascending=False, kind="stable")
+        bake = pd.DataFrame({"Product": units.index.astype(str), "Units": units.to_numpy(dtype=int)})
+
+        df_i = self.store.get(INGREDIENTS_FILE)
+        stocked = df_i[~df_i['Ingredient'].astype(str).str.contains(r"\[ADMIN\]", regex=True)]
+        stocked = stocked.drop_duplicates(subset='Ingredient')
+        columns = {str(n): i for i, n in enumerate(stocked['Ingredient'])}
+        # Components with no ingredients.csv row are still needed; they just have no stock
+        rows, cols, amounts = compile_recipes(self.store.flat_recipes(), list(bake['Product']), columns, add_missing=True)
+        needed = np.bincount(cols, weights=amounts * bake['Units'].to_numpy(dtype=float)[rows], minlength=len(columns))
+        stock = np.zeros(len(columns))
+        stock[:len(stocked)] = stocked['Qty'].to_numpy(dtype=float)
+        materials = pd.DataFrame({"Ingredient": list(columns), "Needed": needed, "In Stock": stock,
+                                  "Short": np.clip(needed - np.maximum(stock, 0), 0, None)})
+        materials = materials[materials['Needed'] > 0].sort_values(["Short", "Needed"], ascending=False, kind="stable")
+        return Plan(pd.Timestamp(start).date(), pd.Timestamp(end).date(), orders, bake, materials.reset_index(drop=True))
@@ -0,0 +1,83 @@
+"""Recipe flattening: sub-recipes resolved ahead of time.
+
+``recipes.json`` maps a name to ``{component: amount per piece}``. A
+component that has a recipe of its own (``"Dough"``, say) is a sub-recipe,
+and its amount is counted in units of that sub-recipe:
+
+    {"Dough": {"Flour": 0.5, "Yeast": 0.01},
+     "Pandesal": {"Dough": 0.1, "Sugar": 0.01}}
+
+:func:`flatten` expands every recipe down to bought ingredients once
+(``Pandesal`` -> Flour 0.05, Yeast 0.001, Sugar 0.01), so selling or costing
+a product is a lookup, however deep the tiers go. The store caches the
+result next to the parsed file (see :meth:`DataStore.flat_recipes`).
+:func:`compile_recipes` turns flat recipes into the coordinate arrays of a
+sparse product x ingredient matrix for costing and planning.
+"""
+import numpy as np
+
+
+def flatten(recipes):
+    """``{name: {ingredient: amount}}`` with every sub-recipe expanded.
+
+    Raises ValueError if a recipe (indirectly) contains itself.
+    """
+    flat = {}
+
+    def expand(name, path):
+        if name in flat:
+            return flat[name]
+        if name in path:
+            raise ValueError("Recipe loop: " + " -> ".join(path[path.index(name):] + (name,)))
+        out = {}
+        for comp, amt in recipes[name].items():
+            amt = float(amt)
+            if comp in recipes:
+                for ing, sub in expand(comp, path + (name,)).items():
+                    out[ing] = out.get(ing, 0.0) + amt * sub
+            else:
+                out[comp] = out.get(comp, 0.0) + amt
+        flat[name] = out
+        return out
+
+    for name in recipes:
+        expand(name, ())
+    return flat
+
+
+def merge(recipes, changes):
+    """A copy of ``recipes`` with ``changes`` applied.
+
+    ``changes`` is ``{name: {component: amount}}``; an amount of ``None`` or
+    0 unlinks the component, and a recipe left empty is removed.
+    """
+    out = {name: dict(parts) for name, parts in recipes.items()}
+    for name, parts in changes.items():
+        recipe = out.setdefault(name, {})
+        for comp, amt in parts.items():
+            if amt:
+                recipe[comp] = float(amt)
+            else:
+                recipe.pop(comp, None)
+        if not recipe:
+            del out[name]
+    return out
+
+
+def compile_recipes(recipes, products, columns, add_missing=False):
+    """Coordinate arrays ``(rows, cols, amounts)`` of ``products`` x ingredients.
+
+    ``columns`` maps an ingredient name to its column. Components it doesn't
+    know are skipped, or with ``add_missing`` given the next free column
+    (``columns`` is updated in place).
+    """
+    rows, cols, amounts = [], [], []
+    for r, prod in enumerate(products):
+        for ing, amt in recipes.get(prod, {}).items():
+            c = columns.get(ing)
+            if c is None and add_missing:
+                c = columns[ing] = len(columns)
+            if c is not None:
+                rows.append(r); cols.append(c); amounts.append(float(amt))
+    return (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp),
+            np.asarray(amounts, dtype=float))
@@ -0,0 +1,165 @@
+"""Text reports: costing analysis, monthly ledger, production sheet and bake plan.
+
+Plain functions over data frames with no Tk, so they can run on a worker
+thread (see :mod:`bakery.tasks`). Each takes an optional ``task`` for
+progress reporting and cancellation, writes its file and returns the path.
+Callers should pass frames that nobody mutates meanwhile (a ``.copy()`` of
+the small tables is enough; the store replaces the sales frame on append
+rather than editing it).
+"""
+import os
+from datetime import datetime
+import pandas as pd
+
+from bakery import BAKERY_NAME  # re-exported: reports.BAKERY_NAME is the report header
+from bakery.stock import USE, ADMIN
+
+PROGRESS_EVERY = 500  # rows between progress reports
+LEDGER_CHUNK_ROWS = 50_000
+
+
+def _tick(task, done, total):
+    if task is not None and (done % PROGRESS_EVERY == 0 or done == total):
+        task.progress(done, total)
+
+
+def write_costing_report(path, bakery_name, costs, what_if="", task=None):
+    """``costs`` is the frame from :meth:`bakery.costing.CostingEngine.evaluate`."""
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(f"{bakery_name.upper()} - COSTING ANALYSIS\nDate: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
+                  + (f"WHAT-IF: {what_if}\n" if what_if else "") + "="*60 + "\n\n")
+        total = len(costs)
+        for done, (prod, unit_total, sell, profit, margin, status) in enumerate(costs[["Product", "Cost", "Price", "Profit", "Margin", "Status"]].itertuples(index=False), 1):
+            out.write(f"PRODUCT: {prod.upper()}\n" + "-"*30)
+            out.write(f"\nPROD COST: ₱{unit_total:>8.2f} | SELL PRICE: ₱{sell:>8.2f}\nPROFIT:    ₱{profit:>8.2f} | MARGIN:      {margin:>8.2f}%\nSTATUS: {status}\n\n" + "="*60 + "\n\n")
+            _tick(task, done, total)
+    return path
+
+
+def format_costing_table(costs):
+    """One line per product, for the in-app costing view."""
+    lines = [f"{'Product':<22} {'Cost':>10} {'Price':>10} {'Profit':>10} {'Margin':>8}  Status", "-"*78]
+    for prod, unit_total, sell, profit, margin, status in costs[["Product", "Cost", "Price", "Profit", "Margin", "Status"]].itertuples(index=False):
+        lines.append(f"{str(prod)[:22]:<22} {unit_total:>10.2f} {sell:>10.2f} {profit:>10.2f} {margin:>7.1f}%  {status}")
+    return "\n".join(lines)
+
+
+def format_bake_plan(plan):
+    """One line per product, for the in-app bake plan and the report."""
+    lines = [f"{'Product':<22} {'Forecast':>10} {'Pre-orders':>11} {'Bake':>8}", "-"*54]
+    for prod, fc, booked, bake in plan[["Product", "Forecast", "Pre-orders", "Bake"]].itertuples(index=False):
+        lines.append(f"{str(prod)[:22]:<22} {fc:>10.1f} {booked:>11} {bake:>8}")
+    lines.append("-"*54 + f"\n{'TOTAL':<22} {plan['Forecast'].sum():>10.1f} {plan['Pre-orders'].sum():>11} {plan['Bake'].sum():>8}")
+    return "\n".join(lines)
+
+
+def write_bake_plan(path, bakery_name, day, plan, method, task=None):
+    """``plan`` is from :meth:`bakery.analytics.SalesAnalytics.recommend`."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"{bakery_name.upper()} - BAKE PLAN FOR {pd.Timestamp(day):%A %Y-%m-%d}\n"
+                f"Forecast: {'exponential smoothing' if method == 'ewm' else 'moving average'} of the same weekday, plus pending pre-orders\n"
+                f"Made: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n" + "="*54 + "\n")
+        f.write(format_bake_plan(plan) + "\n")
+    return path
+
+
+def month_range(when):
+    """First and last day of ``when``'s calendar month, as dates."""
+    first = pd.Timestamp(when).normalize().replace(day=1)
+    return first.date(), (first + pd.offsets.MonthEnd(0)).date()
+
+
+def ledger_title(start, end):
+    """'October 2026' for a whole calendar month, else '2026-10-01 to 2026-10-15'."""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    if start.day == 1 and end == start + pd.offsets.MonthEnd(0):
+        return start.strftime('%B %Y')
+    return f"{start:%Y-%m-%d} to {end:%Y-%m-%d}"
+
+
+def _chunks(paths, chunksize):
+    """Yields ``(chunk, bytes consumed so far)`` across several CSV files."""
+    base = 0
+    for p in paths:
+        with open(p, "rb") as src:
+            for chunk in pd.read_csv(src, chunksize=chunksize):
+                yield chunk, base + src.tell()
+        base += os.path.getsize(p)
+
+
+def _costs(movement_paths, lo, hi, chunksize):
+    """``(FIFO cost of the ingredients used, admin expenses)`` in ``[lo, hi)``, from the movement ledger."""
+    materials = admin = 0.0
+    for chunk, _ in _chunks(movement_paths, chunksize):
+        dates = pd.to_datetime(chunk['Date'], errors='coerce')
+        cost = pd.to_numeric(chunk['Cost'], errors='coerce')
+        inside = (dates >= lo) & (dates < hi)
+        materials -= cost[inside & chunk['Kind'].eq(USE)].sum()  # stored negative
+        admin += cost[inside & chunk['Kind'].eq(ADMIN)].sum()
+    return materials, admin
+
+
+def write_ledger(path, bakery_name, sales_paths, start, end, movement_paths=(), task=None, chunksize=LEDGER_CHUNK_ROWS):
+    """Streams ``sales_paths`` in chunks and writes sales dated ``start``..``end`` (inclusive).
+
+    ``sales_paths`` and ``movement_paths`` are the month partitions covering
+    the range, oldest first (``store.sales.paths(start, end)``, same for
+    ``store.movements``). Material costs are what the ingredients used in the
+    range cost (FIFO), not everything ever bought; admin expenses are those
+    logged in the range.
+
+    Only one chunk is in memory at a time and each chunk is written with a
+    single ``write()``, so memory stays flat however long the history gets.
+    The filter is a real date range (the old ``.dt.month ==`` check also
+    matched the same month of every earlier year).
+    """
+    lo = pd.Timestamp(start).normalize()
+    hi = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+    total_mat, total_adm = _costs(movement_paths, lo, hi, chunksize)
+    total_rev = 0.0
+    size = sum(os.path.getsize(p) for p in sales_paths) or 1
+
+    with open(path, "w", encoding="utf-8") as report:
+        report.write(f"{bakery_name.upper()}\nOFFICIAL LEDGER - {ledger_title(start, end)}\n" + "="*60 + "\n")
+        report.write(f"{'Date':<12} | {'Item':<20} | {'Qty':<6} | {'Total':<12}\n" + "-"*60 + "\n")
+        for chunk, pos in _chunks(sales_paths, chunksize):
+            dates = pd.to_datetime(chunk['Date'], errors='coerce')
+            keep = (dates >= lo) & (dates < hi)
+            if keep.any():
+                cur = chunk[keep]
+                totals = pd.to_numeric(cur['Total'], errors='coerce').fillna(0)
+                total_rev += totals.sum()
+                # This fallback looks for 'Item' or 'Product' to prevent crashes
+                items = cur['Item'] if 'Item' in cur else cur['Product'] if 'Product' in cur else pd.Series("Unknown", index=cur.index)
+                report.write("".join(f"{d:<12} | {str(i)[:19]:<20} | {q:<6} | ₱{t:<12,.2f}\n"
+                                     for d, i, q, t in zip(dates[keep].dt.strftime('%Y-%m-%d'), items, cur['Qty'], totals)))
+            if task is not None:
+                task.progress(pos, size)
+        report.write("\n" + "="*60 + "\nSUMMARY:\n" + "-"*30 + "\n")
+        report.write(f"Total Revenue:         ₱{total_rev:>15,.2f}\nTotal Material Costs: (₱{total_mat:>14,.2f})\nTotal Admin Expenses: (₱{total_adm:>14,.2f})\n" + "-"*30 + f"\nNET PROFIT:            ₱{(total_rev - total_mat - total_adm):>15,.2f}\n")
+    return path
+
+
+def write_production_sheet(path, plan, task=None):
+    """``plan`` is from :meth:`bakery.planning.ProductionPlanner.plan`.
+
+    Lists the orders, the bake plan per product and the raw materials needed
+    against stock. Returns None (and writes nothing) when no pre-order falls
+    in the range.
+    """
+    if plan.orders.empty:
+        return None
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"PRODUCTION LIST: {plan.start} to {plan.end}\n" + "="*60 + "\n")
+        total = len(plan.orders)
+        for done, (d, cust, item, q) in enumerate(zip(plan.orders['Date'], plan.orders['Customer'], plan.orders['Product'], plan.orders['Qty']), 1):
+            f.write(f"{d} | {str(cust)[:16]:<16} | {str(item)[:20]:<20} | x{q}\n")
+            _tick(task, done, total)
+        f.write("\nBAKE PLAN\n" + "-"*30 + "\n")
+        f.write("".join(f"{str(prod)[:22]:<22} x{units}\n" for prod, units in zip(plan.bake['Product'], plan.bake['Units'])))
+        f.write(f"\nMATERIALS\n{'Ingredient':<22} {'Needed':>10} {'In Stock':>10} {'Short':>10}\n" + "-"*55 + "\n")
+        f.write("".join(f"{str(ing)[:22]:<22} {need:>10.2f} {have:>10.2f} {short:>10.2f}\n"
+                        for ing, need, have, short in plan.materials[["Ingredient", "Needed", "In Stock", "Short"]].itertuples(index=False)))
+        short = plan.materials[plan.materials['Short'] > 0]
+        f.write("\nSHORTAGES: " + (", ".join(f"{ing} ({amt:.2f})" for ing, amt in zip(short['Ingredient'], short['Short'])) if len(short) else "none") + "\n")
+    return path
@@ -0,0 +1,166 @@
+"""Running per-day / per-month totals behind the dashboard stat cards.
+
+``refresh_top_stats`` used to parse every row of the sales history on each
+refresh. Instead we keep revenue per day and per month, plus expenses per
+month, update them as sales and expenses are logged, and persist them to
+``dashboard_rollup.json`` together with the byte offset of each sales
+partition they cover. On the next launch only the rows appended after those
+offsets are parsed.
+
+A rebuild books material purchases and admin expenses to their month from
+the movement ledger (:mod:`bakery.stock`). ``[ADMIN]`` rows logged before
+the ledger had no date and are left out of the monthly totals. From then
+on every restock and admin expense is booked to the month it was logged in.
+
+Sales and expenses recorded by other processes sharing the folder arrive
+through the journal's change feed as the same events, so every counter's
+cards agree; the rollup file is written under the folder lock.
+"""
+import os
+import io
+import json
+from datetime import datetime
+import pandas as pd
+
+from bakery.datastore import SALES_FILE, SCHEMAS
+from bakery.events import StatsChanged, RowsAppended, ExpenseLogged
+from bakery.stock import PURCHASE, ADMIN
+
+ROLLUP_FILE = "dashboard_rollup.json"
+
+
+def day_key(when):
+    return when.strftime("%Y-%m-%d")
+
+
+def month_key(when):
+    return when.strftime("%Y-%m")
+
+
+class Rollups:
+    def __init__(self, store, save_every=20):
+        self.store = store
+        self.path = store.path(ROLLUP_FILE)
+        self.save_every = save_every
+        self.daily = {}           # "YYYY-MM-DD" -> revenue
+        self.monthly = {}         # "YYYY-MM" -> revenue
+        self.expenses = {}        # "YYYY-MM" -> materials + admin spend
+        self.offsets = {}         # sales partition -> bytes already counted
+        self._dirty = 0
+
+    # ------------------------------------------
+    # LOAD / CATCH UP
+    # ------------------------------------------
+    def load(self):
+        """Restores the rollup file and replays only the sales appended since.
+
+        From then on every sale appended through the store is booked as it
+        happens.
+        """
+        self.store.events.subscribe(RowsAppended, self._on_append)
+        self.store.events.subscribe(ExpenseLogged, lambda e: self.add_expense(e.amount, e.when))
+        return self._restore()
+
+    def resync(self):
+        """Starts over from the rollup file the other processes keep saving, plus the sales after it.
+
+        For when this process missed part of the change feed (see
+        :meth:`~bakery.journal.SalesJournal.catch_up`).
+        """
+        return self._restore()
+
+    def _restore(self):
+        sizes = self.store.sales.sizes()
+        try:
+            with open(self.path, "r") as f: data = json.load(f)
+            self.daily, self.monthly = data["daily"], data["monthly"]
+            self.expenses, self.offsets = data["expenses"], data["offsets"]
+        except (OSError, ValueError, KeyError):
+            return self.rebuild()
+        if any(self.offsets.get(k, 0) > size for k, size in sizes.items()) or set(self.offsets) - set(sizes):
+            return self.rebuild()  # a partition was replaced or restored
+        caught_up = False
+        for key, size in sizes.items():
+            done = self.offsets.get(key, 0)
+            if done < size:
+                with open(self.store.sales.path(key), "rb") as f:
+                    f.seek(done); tail = f.read()
+                # A partition we never saw starts with its header row
+                rows = pd.read_csv(io.BytesIO(tail), header=0 if done == 0 else None, names=SCHEMAS[SALES_FILE])
+                rows['Date'] = pd.to_datetime(rows['Date'], errors='coerce')
+                self._add_frame(rows)
+                caught_up = True
+        if caught_up:
+            self.save()
+        return self
+
+    def rebuild(self):
+        """Full pass over the sales history; only needed when there's no usable rollup."""
+        self.daily, self.monthly, self.expenses = {}, {}, {}
+        for _, part in self.store.sales.iter_partitions():  # one month in memory at a time
+            self._add_frame(part)
+        for key, part in self.store.movements.iter_partitions():
+            spent = pd.to_numeric(part.loc[part['Kind'].isin([PURCHASE, ADMIN]), 'Cost'], errors='coerce').sum()
+            if spent:
+                self.expenses[key] = float(spent)
+        self.save()
+        return self
+
+    def _add_frame(self, df):
+        df = df.dropna(subset=['Date'])
+        if df.empty:
+            return
+        totals = pd.to_numeric(df['Total'], errors='coerce').fillna(0)
+        for key, val in totals.groupby(df['Date'].dt.strftime("%Y-%m-%d")).sum().items():
+            self.daily[key] = self.daily.get(key, 0.0) + float(val)
+        for key, val in totals.groupby(df['Date'].dt.strftime("%Y-%m")).sum().items():
+            self.monthly[key] = self.monthly.get(key, 0.0) + float(val)
+
+    # ------------------------------------------
+    # O(1) UPDATES
+    # ------------------------------------------
+    def _on_append(self, event):
+        if event.table == SALES_FILE:
+            for row in event.rows:
+                self._book(pd.Timestamp(row["Date"]), float(row["Total"]))
+            self._booked(len(event.rows))
+
+    def _book(self, when, total):
+        self.daily[day_key(when)] = self.daily.get(day_key(when), 0.0) + total
+        self.monthly[month_key(when)] = self.monthly.get(month_key(when), 0.0) + total
+
+    def _booked(self, n):
+        # Saved only after a whole batch is booked, so the offsets saved never run ahead of the totals
+        self._dirty += n
+        if self._dirty >= self.save_every:
+            self.save()
+        self.store.events.emit(StatsChanged())
+
+    def add_expense(self, amount, when=None):
+        key = month_key(when or datetime.now())
+        self.expenses[key] = self.expenses.get(key, 0.0) + amount
+        self.save()  # expenses can't be replayed from the sales file, so persist now
+        self.store.events.emit(StatsChanged())
+
+    def save(self):
+        """Writes totals and the partition offsets they cover, atomically."""
+        with self.store.lock:
+            self.offsets = self.store.sales.sizes()
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"daily": self.daily, "monthly": self.monthly,
+                           "expenses": self.expenses, "offsets": self.offsets}, f)
+            os.replace(tmp, self.path)
+        self._dirty = 0
+
+    # ------------------------------------------
+    # QUERIES
+    # ------------------------------------------
+    def day_sales(self, when):
+        return self.daily.get(day_key(when), 0.0)
+
+    def month_sales(self, when):
+        return self.monthly.get(month_key(when), 0.0)
+
+    def month_expenses(self, when):
+        return self.expenses.get(month_key(when), 0.0)
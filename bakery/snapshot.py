@@ -0,0 +1,108 @@
+"""Binary snapshot of the working tables for a fast cold start.
+
+On shutdown and at every journal checkpoint the in-memory inventory,
+ingredients and pre-order frames are written to ``snapshot/`` in a columnar
+binary format: Feather when pyarrow is installed, otherwise one NumPy
+``.npz`` bundle per table. ``snapshot/meta.json`` records the mtime/size of
+each source CSV at that moment.
+
+On launch a table is taken from the snapshot only if its CSV still has
+exactly that mtime/size; anything edited since (say, in Excel) is parsed
+from CSV as usual. Pending journal entries are overlaid either way.
+"""
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from bakery.datastore import INVENTORY_FILE, INGREDIENTS_FILE, PREORDER_FILE
+
+SNAPSHOT_DIR = "snapshot"
+META_FILE = "meta.json"
+SNAPSHOT_TABLES = (INVENTORY_FILE, INGREDIENTS_FILE, PREORDER_FILE)
+
+try:
+    import pyarrow.feather  # noqa: F401  (only probing for Feather support)
+    FORMAT = "feather"
+except ImportError:
+    FORMAT = "npz"
+
+
+def _file(store, name, fmt):
+    return os.path.join(store.path(SNAPSHOT_DIR), f"{os.path.splitext(name)[0]}.{fmt}")
+
+
+def _write_npz(df, path):
+    arrays = {}
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        if s.dtype.kind in "biufM":
+            arrays[f"c{i}"] = s.to_numpy()
+        else:  # text: store as a fixed-width unicode array plus a null mask
+            arrays[f"c{i}"] = s.fillna("").astype(str).to_numpy(dtype=str)
+            arrays[f"n{i}"] = s.isna().to_numpy()
+    arrays["columns"] = np.array([str(c) for c in df.columns], dtype=str)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def _read_npz(path):
+    with np.load(path, allow_pickle=False) as z:
+        cols = {}
+        for i, col in enumerate(z["columns"]):
+            values = z[f"c{i}"]
+            cols[str(col)] = pd.Series(values).where(~z[f"n{i}"]) if f"n{i}" in z else values
+        return pd.DataFrame(cols)
+
+
+def save_snapshot(store, tables=SNAPSHOT_TABLES):
+    """Writes the cached frames of ``tables`` (only those already loaded).
+
+    Runs under the folder lock: another counter may be saving the same files.
+    """
+    with store.lock:
+        os.makedirs(store.path(SNAPSHOT_DIR), exist_ok=True)
+        meta_path = os.path.join(store.path(SNAPSHOT_DIR), META_FILE)
+        try:
+            with open(meta_path, "r") as f: meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+        for name in tables:
+            df, stamp = store.cached(name)
+            if df is None or stamp is None:
+                continue
+            path = _file(store, name, FORMAT)
+            if FORMAT == "feather":
+                tmp = path + ".tmp"
+                df.reset_index(drop=True).to_feather(tmp)
+                os.replace(tmp, path)
+            else:
+                _write_npz(df.reset_index(drop=True), path)
+            meta[name] = {"stamp": list(stamp), "format": FORMAT}
+        tmp = meta_path + ".tmp"
+        with open(tmp, "w") as f: json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+
+def load_snapshot(store, tables=SNAPSHOT_TABLES):
+    """Primes the store from the snapshot; returns the tables that were fresh."""
+    try:
+        with open(os.path.join(store.path(SNAPSHOT_DIR), META_FILE), "r") as f: meta = json.load(f)
+    except (OSError, ValueError):
+        return []
+    loaded = []
+    for name in tables:
+        entry = meta.get(name)
+        if not entry or entry.get("format") not in ("feather", FORMAT):
+            continue
+        path = _file(store, name, entry["format"])
+        if not store.is_current(name, tuple(entry["stamp"])) or not os.path.exists(path):
+            continue  # CSV changed since the snapshot: let the store parse it
+        try:
+            df = pd.read_feather(path) if entry["format"] == "feather" else _read_npz(path)
+        except Exception:
+            continue  # damaged snapshot is never fatal; CSV is the source of truth
+        store.prime(name, df, tuple(entry["stamp"]))
+        loaded.append(name)
+    return loaded
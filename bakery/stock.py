@@ -0,0 +1,105 @@
+"""Raw-material stock valued with FIFO cost layers.
+
+``ingredients.csv`` used to carry a running ``Qty`` and a cumulative
+``Cost``: a restock added to both, a sale lowered ``Qty`` only, so
+``Cost / Qty`` crept upward with every bake. Now each row keeps the
+purchases still on hand as *layers*, oldest first, ``[[qty, unit cost],
+...]`` (the ``Layers`` column, JSON). A purchase adds a layer; a sale
+consumes the oldest layers first and is charged what they cost. The row's
+``Qty`` (stock on hand), ``Cost`` (value of that stock) and ``Unit Cost``
+are materialized from the layers on every movement, so costing and stock
+checks are plain reads.
+
+Every purchase and consumption is also appended to the movement ledger,
+``movements/YYYY-MM.csv`` (Date, Ingredient, Kind, Qty, Cost; ``Qty`` and
+``Cost`` are negative for what went out). Both are written by one journal
+transaction (see :meth:`bakery.journal.SalesJournal.restock`). Admin
+expenses are logged there too (kind ``admin``), so every expense has a date.
+
+Selling more than is on hand (recipes are not always checked) leaves a
+single negative layer costed at the last known unit cost; the next purchase
+settles it first. Whatever that purchase doesn't cover stays owed at the
+purchase's unit cost, the latest price known for what will replace it (the
+sales were already charged; this only values the shortfall).
+"""
+import json
+
+MOVEMENTS_DIR = "movements"
+MOVEMENT_COLUMNS = ["Date", "Ingredient", "Kind", "Qty", "Cost"]
+PURCHASE, USE, ADMIN = "purchase", "use", "admin"
+
+_TOLERANCE = 0.001  # Qty is kept to 3 decimals
+
+
+def layers_of(qty, text, unit_cost):
+    """The cost layers of a row, or one layer holding all of ``qty`` if they don't add up.
+
+    Rows from before cost layers (blank ``Layers``) and rows whose ``Qty``
+    was edited by hand start over from their current ``Qty`` at ``unit_cost``.
+    """
+    try:
+        layers = json.loads(text) if isinstance(text, str) and text else []
+    except ValueError:
+        layers = []
+    if abs(sum(q for q, _ in layers) - qty) > _TOLERANCE:
+        layers = [[qty, unit_cost]] if qty else []
+    return layers
+
+
+def receive(layers, qty, cost):
+    """Adds a purchase of ``qty`` for ``cost`` in total; returns the new layers.
+
+    Settling a negative layer leaves one layer at the purchase's unit cost:
+    the stock left over, or (on purpose) what is still owed, revalued at
+    that latest price.
+    """
+    if qty <= 0:
+        raise ValueError("A purchase needs a quantity above 0")
+    unit = cost / qty
+    if layers and layers[0][0] < 0:  # used before it was bought: settle that first
+        left = round(layers[0][0] + qty, 6)
+        return [[left, unit]] if left else []
+    if layers and layers[-1][1] == unit:  # same price as the last delivery: one layer
+        return layers[:-1] + [[round(layers[-1][0] + qty, 6), unit]]
+    return layers + [[qty, unit]]
+
+
+def consume(layers, qty, unit_cost):
+    """Takes ``qty`` out, oldest layer first; returns ``(layers left, cost of what was taken)``.
+
+    Whatever is not on hand is charged at ``unit_cost`` and carried as a negative layer.
+    """
+    left, cost, kept = qty, 0.0, []
+    for q, u in layers:
+        if left > 0 and q > 0:
+            take = min(q, left)
+            cost += take * u
+            left = round(left - take, 6)
+            q = round(q - take, 6)
+        if q:
+            kept.append([q, u])
+    if left > 0:
+        owed = sum(q for q, _ in kept)  # only a negative layer can be left here
+        kept = [[round(owed - left, 6), unit_cost]]
+        cost += left * unit_cost
+    return kept, cost
+
+
+def materialize(layers, unit_cost):
+    """The ``Qty``/``Cost``/``Unit Cost``/``Layers`` fields for a row holding ``layers``.
+
+    An empty row keeps ``unit_cost`` (its last one), so products using it can still be costed.
+    """
+    qty = sum(q for q, _ in layers)
+    value = sum(q * u for q, u in layers)
+    if qty > 0:
+        unit_cost = value / qty
+    elif layers:
+        unit_cost = layers[-1][1]
+    return {"Qty": round(qty, 3), "Cost": round(value, 2), "Unit Cost": round(unit_cost, 6),
+            "Layers": json.dumps(layers, separators=(",", ":"))}
+
+
+def ingredient_row(name, qty=0.0, cost=0.0):
+    """A complete ``ingredients.csv`` row for a new entry holding ``qty`` bought for ``cost``."""
+    return {"Ingredient": name, **materialize(receive([], qty, cost) if qty > 0 else [], 0.0)}
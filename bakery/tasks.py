@@ -0,0 +1,108 @@
+"""Background worker pool for reports and other slow jobs.
+
+Tk widgets may only be touched from the main thread, so workers never call
+back into the UI directly: they post progress/completion messages to a
+queue that the main thread drains with ``after()``. Jobs receive their
+:class:`Task` as the ``task`` keyword and should call ``task.progress()``
+now and then; ``progress()`` is also the cancellation point.
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class Task:
+    def __init__(self, name, runner=None):
+        self.name = name
+        self.runner = runner
+        self.future = None
+        self.done = 0
+        self.total = 0
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None:
+            self.future.cancel()  # still queued: never starts
+
+    def progress(self, done, total):
+        """Reports progress and raises TaskCancelled if the user gave up."""
+        if self.cancelled:
+            raise TaskCancelled(self.name)
+        self.done, self.total = done, total
+        if self.runner is not None:
+            self.runner._post(self, "progress", (done, total))
+
+
+class TaskRunner:
+    def __init__(self, root, workers=2, poll_ms=100):
+        """``root`` is anything with Tk's ``after(ms, fn)``."""
+        self.root = root
+        self.poll_ms = poll_ms
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bakery-task")
+        self.active = []  # queued or running, oldest first
+        self._queue = queue.Queue()
+        self._callbacks = {}
+        self.root.after(self.poll_ms, self._pump)
+
+    def submit(self, name, fn, *args, on_done=None, on_error=None, on_progress=None, on_cancel=None):
+        """Queues ``fn(*args, task=task)``; callbacks run on the Tk thread."""
+        task = Task(name, self)
+        self._callbacks[task] = (on_done, on_error, on_progress, on_cancel)
+        self.active.append(task)
+        task.future = self.pool.submit(self._run, task, fn, args)
+        return task
+
+    def _run(self, task, fn, args):
+        try:
+            if task.cancelled:
+                raise TaskCancelled(task.name)
+            self._post(task, "done", fn(*args, task=task))
+        except TaskCancelled:
+            self._post(task, "cancelled", None)
+        except Exception as e:
+            self._post(task, "error", e)
+
+    def _post(self, task, kind, payload):
+        self._queue.put((task, kind, payload))
+
+    def _pump(self):
+        while True:
+            try:
+                task, kind, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            on_done, on_error, on_progress, on_cancel = self._callbacks.get(task, (None,) * 4)
+            if kind == "progress":
+                if on_progress: on_progress(task, *payload)
+                continue
+            self._finish(task)
+            if kind == "done" and on_done: on_done(payload)
+            elif kind == "error" and on_error: on_error(payload)
+            elif kind == "cancelled" and on_cancel: on_cancel(task)
+        # Tasks cancelled while still queued never run, so nothing gets posted for them
+        for task in [t for t in self.active if t.future is not None and t.future.cancelled()]:
+            on_cancel = self._callbacks.get(task, (None,) * 4)[3]
+            self._finish(task)
+            if on_cancel: on_cancel(task)
+        self.root.after(self.poll_ms, self._pump)
+
+    def _finish(self, task):
+        if task in self.active: self.active.remove(task)
+        self._callbacks.pop(task, None)
+
+    def cancel_all(self):
+        for task in list(self.active):
+            task.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.pool.shutdown(wait=False, cancel_futures=True)
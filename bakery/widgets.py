@@ -0,0 +1,112 @@
+"""Recycled, lazily-materialized row lists for the app's scrollable columns.
+
+The only module in the package that imports Tk. The Menu, Raw Materials and
+Pre-Order columns used to destroy every row and rebuild a frame, label and
+button per record on each refresh. ``RecycledList`` keeps a pool of row
+widgets instead:
+
+* rows are created once and reused; a refresh only reconfigures the rows
+  whose data actually changed,
+* surplus rows are hidden (``pack_forget``), not destroyed,
+* inside a ``CTkScrollableFrame`` only the first page of rows is built, and
+  the next page is materialized as the user scrolls near the bottom.
+"""
+import customtkinter as ctk
+
+from bakery.metrics import metrics
+
+
+class RowSlot:
+    """One reusable row: its frame, named child widgets and the data it shows."""
+    __slots__ = ("frame", "widgets", "key", "data", "shown")
+
+    def __init__(self):
+        self.frame, self.widgets = None, {}
+        self.key, self.data, self.shown = None, None, False
+
+
+class RecycledList:
+    def __init__(self, master, build_row, update_row, pack_opts=None,
+                 page_size=40, empty_text=None, empty_opts=None):
+        """``build_row(slot)`` creates ``slot.frame``/``slot.widgets`` once;
+        ``update_row(slot, data)`` patches them for new data. ``data`` must be
+        comparable with ``==`` (a tuple works well)."""
+        self.master = master
+        self.build_row, self.update_row = build_row, update_row
+        self.pack_opts = pack_opts or {"fill": "x", "pady": 4, "padx": 5}
+        self.page_size = page_size
+        self.items, self.slots = [], []
+        self._pos = {}  # key -> position in self.items
+        self.created = 0  # row widgets built so far, handy when profiling
+        self._empty_text, self._empty_opts = empty_text, empty_opts or {}
+        self._empty = None
+        self.limit = page_size if self._hook_scroll() else None
+
+    def _hook_scroll(self):
+        """Grows the materialized window when the view nears the bottom.
+
+        CTkScrollableFrame wires its canvas straight to its scrollbar; we
+        tee that callback. Returns False (render everything) for plain frames.
+        """
+        canvas = getattr(self.master, "_parent_canvas", None)
+        scrollbar = getattr(self.master, "_scrollbar", None)
+        if canvas is None or scrollbar is None:
+            return False
+
+        def on_view(first, last):
+            scrollbar.set(first, last)
+            if float(last) > 0.9 and self.limit is not None and self.limit < len(self.items):
+                self.limit += self.page_size
+                self.master.after_idle(self._render)
+        canvas.configure(yscrollcommand=on_view)
+        return True
+
+    def set_items(self, items):
+        """``items`` is a list of ``(key, data)``; only changed rows are touched."""
+        self.items = list(items)
+        self._pos = {key: i for i, (key, _) in enumerate(self.items)}
+        self._render()
+
+    def update(self, key, data):
+        """Patches a single row by key; no-op for keys not in the list."""
+        i = self._pos.get(key)
+        if i is None:
+            return
+        self.items[i] = (key, data)
+        if i < len(self.slots) and self.slots[i].shown and self.slots[i].data != data:
+            self.update_row(self.slots[i], data)
+            self.slots[i].data = data
+
+    def _render(self):
+        n = len(self.items) if self.limit is None else min(len(self.items), self.limit)
+        for i in range(n):
+            key, data = self.items[i]
+            if i == len(self.slots):
+                slot = RowSlot()
+                self.build_row(slot)
+                self.slots.append(slot)
+                self.created += 1
+                metrics.count("row_widgets_created")
+            slot = self.slots[i]
+            slot.key = key
+            if slot.data != data:
+                self.update_row(slot, data)
+                slot.data = data
+            if not slot.shown:
+                slot.frame.pack(**self.pack_opts)
+                slot.shown = True
+        for slot in self.slots[n:]:
+            if slot.shown:
+                slot.frame.pack_forget()
+                slot.shown = False
+        self._toggle_empty(n == 0)
+
+    def _toggle_empty(self, show):
+        if self._empty_text is None:
+            return
+        if show and self._empty is None:
+            self._empty = ctk.CTkLabel(self.master, text=self._empty_text, **self._empty_opts)
+            self._empty.pack(pady=20)
+        elif not show and self._empty is not None:
+            self._empty.destroy()
+            self._empty = None
@@ -1,18 +1,29 @@
 import customtkinter as ctk
-import pandas as pd
 import os
-import json
-import shutil
+import importlib
 from datetime import datetime
 import tkinter.messagebox as mbox
-from PIL import Image
+from bakery import BAKERY_NAME
+from bakery.widgets import RecycledList
+from bakery.events import RowsChanged, RowsAppended, StatsChanged
+from bakery.tasks import TaskRunner
+from bakery.locking import LockTimeout
+from bakery.metrics import metrics
+from bakery.files import INVENTORY_FILE, INGREDIENTS_FILE, PREORDER_FILE
+
+# pandas and the data layer take longer to import than the window takes to draw: the
+# "data layer" startup stage imports them (see BakeryApp.run_startup), and the methods
+# that need them import them locally, which is free from then on
+DATA_MODULES = ("pandas", "bakery.datastore", "bakery.journal", "bakery.rollups", "bakery.snapshot", "bakery.reports",
+                "bakery.backup", "bakery.costing", "bakery.cart", "bakery.planning", "bakery.stock", "bakery.analytics")
+
 
 class BakeryApp(ctk.CTk):
     def __init__(self):
         super().__init__()
 
         # --- BRAND & THEME ---
-        self.bakery_name = "MayLauren's Artisan Bakeshop"
+        self.bakery_name = BAKERY_NAME
         self.version = "Enterprise v3.0 (Stable + Pre-Order)"
         self.header_blue = "#1565C0"    
         self.bg_light_blue = "#E3F2FD"  
@@ -24,63 +35,162 @@ class BakeryApp(ctk.CTk):
         self.font_header = ("Segoe UI", 20, "bold") 
         self.font_title = ("Segoe UI", 32, "bold")  
         
-        # --- IMAGE LOADING ---
         self.logo_path = "logo.png" 
         self.logo_img = None
+
+        self.title(f"{self.bakery_name} | {self.version}")
+        self.geometry("1400x900") 
+        self.configure(fg_color=self.bg_light_blue)
+
+        self.recipe_file = "recipes.json"
+        self.store = self.journal = None # Opened by the "open data" startup stage
+        self._popups = {}
+        self._sync_job = None
+        self._sync_failing = False # the change feed's last error has been reported
+        with metrics.span("startup: shell window", "startup"):
+            self.setup_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self._startup_job = self.after(1, self.run_startup)
+
+    def run_startup(self, stage=0):
+        """Staged startup: one stage per Tk callback, so the window paints (and columns fill in) between stages"""
+        stages = [ # (name, stage, can the app run without it?)
+            ("logo", self.load_logo, True),
+            ("import pandas + data layer", self.load_data_layer, False),
+            ("open data files", self.open_data, False),
+            ("dashboard stats", self.refresh_top_stats, True),
+            ("point of sale", self.populate_sales_column, False),
+            ("menu & stock", self.populate_inventory_column, True),
+            ("raw materials", self.populate_ingredients_column, True),
+            ("enable buttons", self.enable_actions, False),
+            ("backup", self.run_auto_backup, True), # Run backup on startup (capture needs the data open)
+        ]
+        name, fn, optional = stages[stage]
+        self._startup_job = None
+        try:
+            with metrics.span(f"startup: {name}", "startup"):
+                fn()
+        except LockTimeout: # another counter is holding the data folder: try the stage again, or give up
+            if mbox.askretrycancel("Busy", "Another counter is saving and the data folder is locked.\nTry again?"):
+                self._startup_job = self.after(1, self.run_startup, stage)
+            return
+        except Exception as e: # e.g. a corrupt snapshot or a hand-broken recipes.json
+            if not optional:
+                return mbox.showerror("Startup Error", f"Could not start ({name}):\n{e}\n\nFix the problem and restart the app.")
+            mbox.showwarning("Startup Warning", f"{name.capitalize()} failed:\n{e}")
+        if stage + 1 < len(stages): self._startup_job = self.after(1, self.run_startup, stage + 1)
+
+    def load_logo(self):
         try:
             if os.path.exists(self.logo_path):
+                from PIL import Image
                 raw_img = Image.open(self.logo_path)
                 self.logo_img = ctk.CTkImage(light_image=raw_img, dark_image=raw_img, size=(70, 70))
+                self.logo_label.configure(image=self.logo_img, text="")
         except: pass
 
-        self.title(f"{self.bakery_name} | {self.version}")
-        self.geometry("1400x900") 
-        self.configure(fg_color=self.bg_light_blue)
+    def load_data_layer(self):
+        for name in DATA_MODULES: importlib.import_module(name)
+
+    def open_data(self):
+        from bakery.datastore import DataStore
+        from bakery.journal import SalesJournal
+        from bakery.rollups import Rollups
+        from bakery.snapshot import load_snapshot, save_snapshot
+        from bakery.planning import ProductionPlanner
+        from bakery.analytics import SalesAnalytics
+        self.preorder_file = PREORDER_FILE
+        self.store = DataStore() # Single in-memory copy of every CSV/JSON file
+        # Under the folder lock, so another counter can't sell between the journal replay and the rollup catch-up
+        with self.store.lock:
+            self.init_csv_files()
+            load_snapshot(self.store) # Binary copies of unchanged tables; anything edited since is parsed from CSV
+            journal = SalesJournal(self.store).open() # Replays any sales not yet folded into the CSVs
+            journal.on_compact.append(lambda: save_snapshot(self.store))
+            self.rollups = Rollups(self.store).load() # Dashboard totals; only parses sales added since last run
+            journal.on_resync.append(self.rollups.resync)
+        self.journal = journal # Only once everything is open: on_close compacts through it
+        self.planner = ProductionPlanner(self.store)
+        self.analytics = SalesAnalytics(self.store.folder) # Hourly per-product rollups behind the bake forecast
+
+        # Data mutations announce themselves; only the touched panels/rows re-render
+        self._dirty, self._dirty_rows, self._flush_pending = set(), {INVENTORY_FILE: set(), INGREDIENTS_FILE: set()}, False
+        self.store.events.subscribe(RowsChanged, self.on_rows_changed)
+        self.store.events.subscribe(RowsAppended, self.on_rows_appended)
+        self.store.events.subscribe(StatsChanged, lambda e: self.mark_dirty("stats"))
+
+    def populate_sales_column(self):
+        self.loading.pop("sales").destroy()
+        self.setup_sales_section()
+        self.refresh_pos_products()
+        self.display_preorders()
 
-        self.recipe_file = "recipes.json"
-        self.preorder_file = "pre_orders.csv"
-        
-        self.init_csv_files()
-        self.run_auto_backup() # Run backup on startup
-        self.setup_ui()
+    def populate_inventory_column(self):
+        self.loading.pop("inv").destroy()
+        self.refresh_inventory_list()
 
-    def init_csv_files(self):
-        files = {
-            "bakery_inventory.csv": ["Product", "Price", "Stock"],
-            "sales_records.csv": ["Date", "Product", "Qty", "Total"],
-            "ingredients.csv": ["Ingredient", "Qty", "Cost"],
-            "pre_orders.csv": ["Date", "Item", "Qty", "Total"] # Ledger Format: Date, Item, Qty, Total
-        }
-        for file, cols in files.items():
-            if not os.path.exists(file):
-                pd.DataFrame(columns=cols).to_csv(file, index=False)
-        if not os.path.exists(self.recipe_file):
-            with open(self.recipe_file, 'w') as f: json.dump({}, f)
-
-    def run_auto_backup(self):
-        """Creates a timestamped backup of all database files"""
-        backup_dir = "backups"
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir)
-        
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
-        current_backup_path = os.path.join(backup_dir, timestamp)
-        os.makedirs(current_backup_path)
+    def populate_ingredients_column(self):
+        self.loading.pop("restock").destroy()
+        self.refresh_ingredients_list()
+
+    def enable_actions(self):
+        for btn in self.action_buttons: btn.configure(state="normal")
+        self.poll_changes()
 
-        files_to_back = ["bakery_inventory.csv", "sales_records.csv", "ingredients.csv", "pre_orders.csv", "recipes.json"]
-        for f in files_to_back:
-            if os.path.exists(f):
-                shutil.copy(f, os.path.join(current_backup_path, f))
+    def poll_changes(self):
+        """Picks up sales, restocks and edits made on other counters sharing the data folder (about 1 s behind)"""
+        try:
+            self.store.sync() # A few stat calls when nothing changed; the events redraw what did
+            self._sync_failing = False
+        except LockTimeout: pass # Another counter is mid-write; next tick
+        except Exception as e: # e.g. a CSV held open by Excel: say so once, keep trying
+            if not self._sync_failing:
+                self._sync_failing = True
+                mbox.showwarning("Sync", f"Could not read changes from the other counters:\n{e}\n\nStill retrying every second.")
+        finally:
+            self._sync_job = self.after(1000, self.poll_changes)
+
+    def show_busy(self):
+        """The folder lock timed out: another counter is writing"""
+        return mbox.showerror("Busy", "Another counter is saving, please try again")
+
+    def on_close(self):
+        from bakery.snapshot import save_snapshot
+        for job in (self._startup_job, self._sync_job):
+            if job: self.after_cancel(job)
+        if self.journal is not None:
+            try:
+                with self.store.lock:
+                    self.journal.compact() # Leave clean CSVs behind for Excel/backups
+                    save_snapshot(self.store) # Next launch skips CSV parsing for unchanged tables
+                    self.rollups.save()
+            except LockTimeout: pass # Another counter is mid-write; the journal is compacted on a later run
+        self.tasks.shutdown()
+        self.destroy()
+
+    def init_csv_files(self):
+        self.store.init_files()
+
+    def run_auto_backup(self, notify=False):
+        """Incremental backup on the worker pool: only changed files (or new sales tails) are stored"""
+        from bakery import backup
+        def done(name):
+            self.on_task_finished()
+            if notify: mbox.showinfo("Backup", f"Backup {name} created!\nRestore with: python -m bakery.backup restore {name}")
+        try:
+            with metrics.span("backup capture", "write"): items = backup.capture(self.store)
+        except LockTimeout: return self.show_busy()
+        self.run_report("Backup", backup.write_backup, items, self.store.folder, on_done=done)
 
     def setup_ui(self):
+        """The shell: header, buttons and empty columns. Data-bound parts are filled in by run_startup"""
         header = ctk.CTkFrame(self, fg_color=self.header_blue, height=100, corner_radius=0)
         header.pack(fill="x", side="top")
         h_center = ctk.CTkFrame(header, fg_color="transparent")
         h_center.pack(expand=True)
-        if self.logo_img:
-            ctk.CTkLabel(h_center, image=self.logo_img, text="").pack(side="left", padx=15)
-        else:
-            ctk.CTkLabel(h_center, text="🥖", font=("Segoe UI", 45)).pack(side="left", padx=15)
+        # Emoji until load_logo swaps the image in
+        self.logo_label = ctk.CTkLabel(h_center, text="🥖", font=("Segoe UI", 45))
+        self.logo_label.pack(side="left", padx=15)
         ctk.CTkLabel(h_center, text=self.bakery_name.upper(), font=self.font_title, text_color="white").pack(side="left")
 
         nav_bar = ctk.CTkFrame(self, fg_color="white", height=100, corner_radius=15)
@@ -96,11 +206,25 @@ class BakeryApp(ctk.CTk):
             ("💸 Admin", "#E57373", self.open_admin_expense),
             ("💹 Costing", "#4CAF50", self.calculate_product_costing),
             ("📜 Ledger", "#5D4037", self.generate_monthly_report),
-            ("💾 Backup", "#78909C", lambda: [self.run_auto_backup(), mbox.showinfo("Backup", "Manual Backup Created!")])
+            ("💾 Backup", "#78909C", lambda: self.run_auto_backup(notify=True))
         ]
+        # Disabled until the data is open (see enable_actions)
+        self.action_buttons = []
         for i, (t, c, cmd) in enumerate(btns):
-            ctk.CTkButton(btn_container, text=t, fg_color=c, text_color="white", 
-                          font=self.font_button, width=125, height=45, command=cmd).grid(row=0, column=i, padx=5)
+            btn = ctk.CTkButton(btn_container, text=t, fg_color=c, text_color="white", state="disabled",
+                                font=self.font_button, width=125, height=45, command=cmd)
+            btn.grid(row=0, column=i, padx=5)
+            self.action_buttons.append(btn)
+
+        # Background report status (reports run on a worker pool, see run_report)
+        self.tasks = TaskRunner(self)
+        task_bar = ctk.CTkFrame(self, fg_color="transparent")
+        task_bar.pack(side="bottom", fill="x", padx=30)
+        ctk.CTkButton(task_bar, text="✖ Cancel Reports", width=130, height=28, fg_color="#B0BEC5", command=self.cancel_reports).pack(side="right")
+        ctk.CTkButton(task_bar, text="📈 Performance", width=130, height=28, fg_color="#B0BEC5", command=self.open_performance_panel).pack(side="left")
+        self.bind("<F12>", lambda e: self.open_performance_panel())
+        self.task_label = ctk.CTkLabel(task_bar, text="", font=("Segoe UI", 12), text_color="gray")
+        self.task_label.pack(side="right", padx=10)
 
         self.top_frame = ctk.CTkFrame(self, fg_color="transparent")
         self.top_frame.pack(pady=20, fill="x", padx=20)
@@ -111,7 +235,31 @@ class BakeryApp(ctk.CTk):
         self.col_inv = self.create_column(self.main_grid, "MENU & STOCK", 0)
         self.col_sales = self.create_column(self.main_grid, "POINT OF SALE", 1)
         self.col_restock = self.create_column(self.main_grid, "RAW MATERIALS", 2)
-        self.refresh_all_data()
+        self.loading = {key: ctk.CTkLabel(col, text="Loading...", font=self.font_main, text_color="gray")
+                        for key, col in (("inv", self.col_inv), ("sales", self.col_sales), ("restock", self.col_restock))}
+        for label in self.loading.values(): label.pack(pady=20)
+        # Row widgets are pooled and patched in place instead of rebuilt per refresh
+        self.inv_list = RecycledList(self.col_inv, self.build_inventory_row, self.update_inventory_row)
+        self.ing_list = RecycledList(self.col_restock, self.build_ingredient_row, self.update_ingredient_row)
+        self.stat_cards = {}
+
+    def popup(self, title, geometry, build):
+        """Shows the ``title`` popup: built by ``build(pop)`` on first use, then hidden on close and reused.
+
+        ``build`` may return an ``on_show()`` that reloads data / resets the form each time it opens.
+        """
+        pop, on_show = self._popups.get(title, (None, None))
+        if pop is None or not pop.winfo_exists():
+            with metrics.span(f"build popup: {title}", "render"):
+                pop = ctk.CTkToplevel(self); pop.geometry(geometry); pop.attributes("-topmost", True)
+                pop.title(title)
+                pop.protocol("WM_DELETE_WINDOW", pop.withdraw)
+                on_show = build(pop)
+            self._popups[title] = (pop, on_show)
+        else:
+            pop.deiconify(); pop.lift()
+        if on_show: on_show()
+        return pop
 
     def create_column(self, master, title, col):
         frame = ctk.CTkFrame(master, fg_color="transparent")
@@ -127,173 +275,230 @@ class BakeryApp(ctk.CTk):
         card = ctk.CTkFrame(master, fg_color="white", corner_radius=20, border_width=2, border_color="#BBD6F2")
         card.grid(row=0, column=col_pos, padx=15, sticky="nsew")
         ctk.CTkLabel(card, text=title, font=("Segoe UI", 16), text_color="gray").pack(pady=(20, 0), padx=30)
-        ctk.CTkLabel(card, text=val, font=("Segoe UI", 38, "bold"), text_color=text_c).pack(pady=(5, 20), padx=30)
+        card.value = ctk.CTkLabel(card, text=val, font=("Segoe UI", 38, "bold"), text_color=text_c)
+        card.value.pack(pady=(5, 20), padx=30)
         return card
 
     # ==========================================
     # NEW FEATURE: PRE-ORDER LOGIC
     # ==========================================
     def open_pre_order_window(self):
-        pop = ctk.CTkToplevel(self); pop.geometry("400x500"); pop.attributes("-topmost", True)
-        pop.title("Add Pre-Order")
+        self.popup("Add Pre-Order", "400x500", self.build_pre_order_window)
+
+    def build_pre_order_window(self, pop):
+        import pandas as pd
         ctk.CTkLabel(pop, text="Log New Reservation", font=self.font_header).pack(pady=20)
         
         cust = ctk.CTkEntry(pop, placeholder_text="Customer Name", width=250); cust.pack(pady=10)
-        
-        df_p = pd.read_csv("bakery_inventory.csv")
-        prod_list = df_p["Product"].tolist() if not df_p.empty else ["No Products"]
-        item_opt = ctk.CTkOptionMenu(pop, values=prod_list, width=250, fg_color=self.header_blue); item_opt.pack(pady=10)
+        item_opt = ctk.CTkOptionMenu(pop, values=["No Products"], width=250, fg_color=self.header_blue); item_opt.pack(pady=10)
         
         qty = ctk.CTkEntry(pop, placeholder_text="Quantity", width=250); qty.pack(pady=10)
-        pickup_date = ctk.CTkEntry(pop, placeholder_text="Pickup Date (YYYY-MM-DD)", width=250)
-        pickup_date.insert(0, datetime.now().strftime("%Y-%m-%d")); pickup_date.pack(pady=10)
+        pickup_date = ctk.CTkEntry(pop, placeholder_text="Pickup Date (YYYY-MM-DD)", width=250); pickup_date.pack(pady=10)
+
+        def on_show():
+            df_p = self.store.get(INVENTORY_FILE)
+            prod_list = df_p["Product"].tolist() if not df_p.empty else ["No Products"]
+            item_opt.configure(values=prod_list)
+            if item_opt.get() not in prod_list: item_opt.set(prod_list[0])
+            for e in (cust, qty, pickup_date): e.delete(0, "end")
+            pickup_date.insert(0, datetime.now().strftime("%Y-%m-%d"))
 
         def save():
-            # Ledger Format: Date, Item, Qty, Total
-            new_entry = pd.DataFrame([{
-                "Date": pickup_date.get(),
-                "Item": f"RESERVE: {cust.get()} ({item_opt.get()})",
-                "Qty": qty.get(),
-                "Total": "PENDING"
-            }])
-            new_entry.to_csv(self.preorder_file, mode='a', index=False, header=not os.path.exists(self.preorder_file))
+            try: pickup, q = pd.Timestamp(pickup_date.get()).strftime("%Y-%m-%d"), int(qty.get())
+            except ValueError: return mbox.showerror("Error", "Pickup date must be YYYY-MM-DD and quantity a whole number")
+            # Ledger Format: Date, Item, Qty, Total (+ structured Customer/Product for planning)
+            try:
+                self.store.append(self.preorder_file, [{
+                    "Date": pickup,
+                    "Item": f"RESERVE: {cust.get()} ({item_opt.get()})",
+                    "Qty": q,
+                    "Total": "PENDING",
+                    "Customer": cust.get().strip(),
+                    "Product": item_opt.get(),
+                }])
+            except LockTimeout: return self.show_busy()
             mbox.showinfo("Success", "Pre-order added to Ledger!")
-            pop.destroy(); self.refresh_all_data()
+            pop.withdraw()
 
         ctk.CTkButton(pop, text="Confirm Reservation", fg_color=self.primary_pink, command=save, height=45).pack(pady=30)
+        return on_show
 
     # ==========================================
     # REFRESH LOGIC (INCLUDES PRE-ORDER DISPLAY)
     # ==========================================
-    def refresh_all_data(self):
-        self.refresh_top_stats()
-        self.refresh_inventory_list()
-        self.setup_sales_section()
-        self.refresh_ingredients_list()
-        self.display_preorders()
+    def on_rows_changed(self, event):
+        if event.table == self.preorder_file: self.mark_dirty("preorders") # re-read after another counter added some
+        elif event.table in self._dirty_rows:
+            if event.keys is None: # rows added/removed: redo the list (and the POS menu for products)
+                self.mark_dirty(event.table, *(["pos"] if event.table == INVENTORY_FILE else []))
+            else:
+                self._dirty_rows[event.table].update(event.keys); self.mark_dirty()
+
+    def on_rows_appended(self, event):
+        if event.table == self.preorder_file: self.mark_dirty("preorders")
+
+    def mark_dirty(self, *panels):
+        """Queues panels for one coalesced redraw once Tk is idle"""
+        self._dirty.update(panels)
+        if not self._flush_pending:
+            self._flush_pending = True
+            self.after_idle(self.flush_dirty)
+
+    def flush_dirty(self):
+        with metrics.span("refresh dirty panels", "render"):
+            self._flush_dirty()
+
+    def _flush_dirty(self):
+        dirty, self._dirty, self._flush_pending = self._dirty, set(), False
+        if "stats" in dirty: self.refresh_top_stats()
+        if "pos" in dirty: self.refresh_pos_products()
+        if "preorders" in dirty: self.display_preorders()
+        if INVENTORY_FILE in dirty: self.refresh_inventory_list()
+        else:
+            df, idx = self.store.get(INVENTORY_FILE), self.store.index(INVENTORY_FILE)
+            for p in self._dirty_rows[INVENTORY_FILE]:
+                if p in idx: self.inv_list.update(p, (p, df.at[idx[p], 'Price'], df.at[idx[p], 'Stock']))
+        if INGREDIENTS_FILE in dirty: self.refresh_ingredients_list()
+        else:
+            df, idx = self.store.get(INGREDIENTS_FILE), self.store.index(INGREDIENTS_FILE)
+            for n in self._dirty_rows[INGREDIENTS_FILE]:
+                if n in idx: self.ing_list.update(n, (n, df.at[idx[n], 'Qty']))
+        for keys in self._dirty_rows.values(): keys.clear()
 
-    def display_preorders(self):
-        """Displays recent pre-orders safely with fixed labels"""
-        if os.path.exists(self.preorder_file):
-            try:
-                df_pre = pd.read_csv(self.preorder_file)
-                if not df_pre.empty:
-                    # Show only the last 8 orders to keep it clean
-                    recent_pre = df_pre.tail(8) 
-                    for _, r in recent_pre.iterrows():
-                        row = ctk.CTkFrame(self.col_sales, fg_color="#FFF9C4", corner_radius=8)
-                        row.pack(fill="x", pady=2, padx=10)
-                        
-                        d = r.get('Date', 'N/A')
-                        i = r.get('Item', 'Unknown')
-                        q = r.get('Qty', '0')
-                        
-                        # Added a small 'Print' icon next to each one for visual style
-                        ctk.CTkLabel(row, text=f"📅 {d} | {i} (x{q})", font=("Segoe UI", 11, "bold")).pack(pady=5, padx=10, side="left")
-                else:
-                    ctk.CTkLabel(self.col_sales, text="(No pending orders)", font=self.font_main, text_color="gray").pack()
-            except Exception as e:
-                print(f"Pre-order error: {e}")
+    # ==========================================
+    # BACKGROUND REPORTS
+    # ==========================================
+    def run_report(self, name, fn, *args, on_done=None):
+        """Runs a report job on the worker pool; errors pop up under the report's name"""
+        self.task_label.configure(text=f"⏳ {name} queued...")
+        self.tasks.submit(name, fn, *args, on_done=on_done, on_progress=self.on_task_progress,
+                          on_error=lambda e: [mbox.showerror(f"{name} Error", f"Error: {e}"), self.on_task_finished()],
+                          on_cancel=lambda t: self.on_task_finished())
+
+    def on_task_progress(self, task, done, total):
+        self.task_label.configure(text=f"⏳ {task.name}: {done / (total or 1):.0%}" + (f" (+{len(self.tasks.active) - 1} queued)" if len(self.tasks.active) > 1 else ""))
+
+    def on_task_finished(self):
+        self.task_label.configure(text=(f"⏳ {self.tasks.active[0].name}..." if self.tasks.active else ""))
+
+    def cancel_reports(self):
+        self.tasks.cancel_all()
+
+    def open_performance_panel(self):
+        """Rolling timing/counter table (see bakery.metrics) with JSON/CSV trace export"""
+        self.popup("Performance", "820x560", self.build_performance_panel)
+
+    def build_performance_panel(self, pop):
+        windows = {"Last 1 min": 60, "Last 5 min": 300, "Last 15 min": 900, "Since launch": None}
+        bar = ctk.CTkFrame(pop, fg_color="transparent"); bar.pack(pady=10)
+        window = ctk.CTkOptionMenu(bar, values=list(windows), width=140, fg_color=self.header_blue); window.pack(side="left", padx=5)
+        window.set("Last 5 min")
+        box = ctk.CTkTextbox(pop, font=("Consolas", 12)); box.pack(fill="both", expand=True, padx=15, pady=(0, 15))
+
+        job = [None] # the pending 1 s refresh; it stops while the panel is hidden
+
+        def show():
+            if not pop.winfo_exists() or pop.state() == "withdrawn": return
+            secs = windows[window.get()]
+            table = metrics.format_summary(None if secs is None else datetime.now().timestamp() - secs)
+            lists = f"\nrows materialized now: menu {self.inv_list.created}, materials {self.ing_list.created}"
+            if hasattr(self, "cart_list"): lists += f", pre-orders {self.preorder_list.created}, cart {self.cart_list.created}"
+            box.delete("1.0", "end"); box.insert("end", table + lists)
+            job[0] = pop.after(1000, show)
+
+        def on_show():
+            if job[0]: pop.after_cancel(job[0])
+            show()
+
+        def export(kind):
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = metrics.export_json(f"perf_trace_{stamp}.json") if kind == "json" else metrics.export_csv(f"perf_trace_{stamp}.csv")
+            mbox.showinfo("Performance", f"Trace saved to {os.path.abspath(path)}")
+
+        ctk.CTkButton(bar, text="Export JSON", width=110, fg_color="#4CAF50", command=lambda: export("json")).pack(side="left", padx=5)
+        ctk.CTkButton(bar, text="Export CSV", width=110, fg_color="#4CAF50", command=lambda: export("csv")).pack(side="left", padx=5)
+        ctk.CTkButton(bar, text="Reset", width=80, fg_color="#E57373", command=metrics.reset).pack(side="left", padx=5)
+        return on_show
 
     # [REMAINING ORIGINAL STABLE LOGIC]
     def calculate_product_costing(self):
-        try:
-            df_i = pd.read_csv("ingredients.csv"); df_p = pd.read_csv("bakery_inventory.csv")
-            with open(self.recipe_file, 'r') as recipe_data: recs = json.load(recipe_data)
-            def get_num(val):
-                n = ''.join(c for c in str(val) if c.isdigit() or c == '.')
-                return float(n) if n and float(n) > 0 else 1.0
-            ing_map = {str(r['Ingredient']): float(r['Cost']) / get_num(r['Qty']) for _, r in df_i.iterrows()}
-            prod_price_map = {str(r['Product']): float(r['Price']) for _, r in df_p.iterrows()}
-            path = "Detailed_Costing_Analysis.txt"
-            with open(path, "w", encoding="utf-8") as out:
-                out.write(f"{self.bakery_name.upper()} - COSTING ANALYSIS\nDate: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n" + "="*60 + "\n\n")
-                for prod, ings in recs.items():
-                    out.write(f"PRODUCT: {prod.upper()}\n" + "-"*30)
-                    unit_total = sum(amt * ing_map.get(ing, 0) for ing, amt in ings.items())
-                    sell = prod_price_map.get(prod, 0); profit = sell - unit_total; margin = (profit / sell * 100) if sell > 0 else 0
-                    out.write(f"\nPROD COST: ₱{unit_total:>8.2f} | SELL PRICE: ₱{sell:>8.2f}\nPROFIT:    ₱{profit:>8.2f} | MARGIN:      {margin:>8.2f}%\nSTATUS: {'[✓] HEALTHY' if margin >= 30 else '[!] LOW MARGIN'}\n\n" + "="*60 + "\n\n")
-            os.startfile(path)
-        except Exception as e: mbox.showerror("Costing Error", f"Error: {e}")
+        """Costing view: all products costed in one pass, with what-if repricing and export"""
+        self.popup("Costing Analysis", "780x600", self.build_costing_window)
+
+    def build_costing_window(self, pop):
+        from bakery import reports
+        from bakery.costing import CostingEngine, parse_what_if
+        ctk.CTkLabel(pop, text="Costing Analysis", font=self.font_header).pack(pady=15)
+        bar = ctk.CTkFrame(pop, fg_color="transparent"); bar.pack(pady=5)
+        what = ctk.CTkEntry(bar, placeholder_text="What-if, e.g. Flour +15%, Sugar -5%", font=self.font_main, width=380)
+        what.pack(side="left", padx=5)
+        table = ctk.CTkTextbox(pop, font=("Consolas", 13), wrap="none")
+        table.pack(fill="both", expand=True, padx=15, pady=10)
+        # The view and the exported report are both rendered from this one result frame
+        state = {"engine": None, "costs": None, "what_if": ""}
+
+        def show():
+            table.configure(state="normal"); table.delete("1.0", "end")
+            table.insert("1.0", reports.format_costing_table(state["costs"])); table.configure(state="disabled")
+
+        def apply():
+            try:
+                state["costs"] = state["engine"].evaluate(parse_what_if(what.get()))
+                state["what_if"] = what.get().strip(); show()
+            except ValueError as e: mbox.showerror("What-If", str(e))
+
+        def export():
+            def done(path):
+                self.on_task_finished(); os.startfile(path)
+            self.run_report("Costing", reports.write_costing_report, "Detailed_Costing_Analysis.txt",
+                            self.bakery_name, state["costs"], state["what_if"], on_done=done)
+
+        ctk.CTkButton(bar, text="Apply", width=80, fg_color=self.header_blue, command=apply).pack(side="left", padx=5)
+        def on_show(): # recompiled on every open: prices and recipes may have changed since
+            try:
+                state["engine"] = CostingEngine(self.store.flat_recipes(), self.store.get(INGREDIENTS_FILE), self.store.get(INVENTORY_FILE))
+            except Exception as e:
+                pop.withdraw(); return mbox.showerror("Costing Error", f"Error: {e}")
+            state["costs"], state["what_if"] = state["engine"].evaluate(), ""
+            what.delete(0, "end"); show()
 
-    def generate_monthly_report(self):
-        """Generates Ledger using 'Item' column instead of 'Product' to fix the error"""
-        try:
-            df_s = pd.read_csv("sales_records.csv")
-            df_i = pd.read_csv("ingredients.csv")
-            df_s['Date'] = pd.to_datetime(df_s['Date'], errors='coerce')
-            now = datetime.now()
-            
-            sales_cur = df_s[df_s['Date'].dt.month == now.month]
-            total_rev = sales_cur['Total'].sum()
-            total_mat = pd.to_numeric(df_i[~df_i['Ingredient'].str.contains(r"\[ADMIN\]", na=False)]['Cost'], errors='coerce').sum()
-            total_adm = pd.to_numeric(df_i[df_i['Ingredient'].str.contains(r"\[ADMIN\]", na=False)]['Cost'], errors='coerce').sum()
-            
-            fname = f"Ledger_{now.strftime('%B_%Y')}.txt"
-            with open(fname, "w", encoding="utf-8") as report:
-                report.write(f"{self.bakery_name.upper()}\nOFFICIAL LEDGER - {now.strftime('%B %Y')}\n" + "="*60 + "\n")
-                report.write(f"{'Date':<12} | {'Item':<20} | {'Qty':<6} | {'Total':<12}\n" + "-"*60 + "\n")
-                
-                for _, r in sales_cur.iterrows():
-                    # This fallback looks for 'Item' or 'Product' to prevent crashes
-                    item_name = r.get('Item', r.get('Product', 'Unknown'))
-                    report.write(f"{r['Date'].strftime('%Y-%m-%d'):<12} | {str(item_name)[:19]:<20} | {r['Qty']:<6} | ₱{r['Total']:<12,.2f}\n")
-                
-                report.write("\n" + "="*60 + "\nSUMMARY:\n" + "-"*30 + "\n")
-                report.write(f"Total Revenue:         ₱{total_rev:>15,.2f}\nTotal Material Costs: (₱{total_mat:>14,.2f})\nTotal Admin Expenses: (₱{total_adm:>14,.2f})\n" + "-"*30 + f"\nNET PROFIT:            ₱{(total_rev - total_mat - total_adm):>15,.2f}\n")
-            
-            os.startfile(fname)
-        except Exception as e: 
-            mbox.showerror("Ledger Error", f"Problem with column names or data: {e}")
+        ctk.CTkButton(pop, text="Export Report", font=self.font_button, fg_color="#4CAF50", height=40, command=export).pack(pady=(0, 15))
+        return on_show
 
-    def setup_sales_section(self):
-        """POS Section - Clears and rebuilds the middle column with Print and List features"""
-        # 1. Clear the column to prevent double-headers
-        for widget in self.col_sales.winfo_children(): 
-            widget.destroy()
-            
-        # 2. NEW ORDER BOX (Point of Sale)
-        box = ctk.CTkFrame(self.col_sales, fg_color="white", corner_radius=15)
-        box.pack(pady=15, padx=15, fill="x")
-        ctk.CTkLabel(box, text="New Order", font=self.font_header).pack(pady=10)
-        
-        # Load inventory for dropdown
-        df_p = pd.read_csv("bakery_inventory.csv")
-        prod_list = df_p["Product"].tolist() if not df_p.empty else ["No Items"]
-        
-        self.sale_opt = ctk.CTkOptionMenu(box, values=prod_list, font=self.font_main, fg_color=self.header_blue)
-        self.sale_opt.pack(pady=5)
-        
-        self.sale_qty = ctk.CTkEntry(box, placeholder_text="Enter Quantity", font=self.font_main, height=35)
-        self.sale_qty.pack(pady=5, padx=20)
-        
-        ctk.CTkButton(box, text="FINALIZE SALE", fg_color=self.primary_pink, font=self.font_button, height=40, command=self.process_order).pack(pady=15)
-
-        # 3. PRODUCTION PRINT BUTTON (New Addition)
-        # This button triggers the date-range filter we created
-        print_btn = ctk.CTkButton(self.col_sales, 
-                                 text="🖨️ PRINT PRODUCTION SHEET", 
-                                 fg_color="#4CAF50", 
-                                 text_color="white",
-                                 font=self.font_button, 
-                                 height=45,
-                                 command=self.print_preorders_range)
-        print_btn.pack(pady=10, padx=20, fill="x")
-
-        # 4. PRE-ORDER LIST SECTION
-        ctk.CTkLabel(self.col_sales, text="PENDING PRE-ORDERS", font=self.font_header, text_color=self.accent_navy).pack(pady=(15, 5))
-        
-        # Internal scroll frame for the list to keep it neat
-        self.preorder_list_frame = ctk.CTkFrame(self.col_sales, fg_color="transparent")
-        self.preorder_list_frame.pack(fill="both", expand=True)
-        
-        self.display_preorders()
+    def generate_monthly_report(self):
+        """Ledger for any date range (defaults to this month), streamed from the sales partitions"""
+        self.popup("Official Ledger", "400x350", self.build_ledger_window)
+
+    def build_ledger_window(self, pop):
+        import pandas as pd
+        from bakery import reports
+        ctk.CTkLabel(pop, text="Ledger Period", font=self.font_header).pack(pady=20)
+        s_ent = ctk.CTkEntry(pop, placeholder_text="Start (YYYY-MM-DD)", width=250); s_ent.pack(pady=5)
+        e_ent = ctk.CTkEntry(pop, placeholder_text="End (YYYY-MM-DD)", width=250); e_ent.pack(pady=5)
+
+        def on_show():
+            first, last = reports.month_range(datetime.now())
+            for ent, day in ((s_ent, first), (e_ent, last)):
+                ent.delete(0, "end"); ent.insert(0, day.strftime("%Y-%m-%d"))
+
+        def execute():
+            try: sd, ed = pd.Timestamp(s_ent.get()), pd.Timestamp(e_ent.get())
+            except ValueError: return mbox.showerror("Ledger Error", "Dates must be YYYY-MM-DD")
+            if pd.isna(sd) or pd.isna(ed): return mbox.showerror("Ledger Error", "Dates must be YYYY-MM-DD") # blank entry
+            title = reports.ledger_title(sd, ed)
+            fname = f"Ledger_{title.replace(' to ', '_to_').replace(' ', '_')}.txt"
+            def done(path):
+                self.on_task_finished(); os.startfile(path)
+            self.run_report("Ledger", reports.write_ledger, fname, self.bakery_name, self.store.sales.paths(sd, ed + pd.Timedelta(days=1)),
+                            sd, ed, self.store.movements.paths(sd, ed + pd.Timedelta(days=1)), on_done=done)
+            pop.withdraw()
+
+        ctk.CTkButton(pop, text="GENERATE LEDGER", command=execute, fg_color="#5D4037").pack(pady=20)
+        return on_show
 
     def setup_sales_section(self):
-        """POS Section with Welcome Msg, Customer Name, and Print Feature"""
-        for widget in self.col_sales.winfo_children(): 
-            widget.destroy()
-            
+        """POS Section with Welcome Msg, Customer Name, and Print Feature (built once)"""
+        from bakery.cart import Cart
         # 1. WELCOME HEADER
         welcome_frame = ctk.CTkFrame(self.col_sales, fg_color="transparent")
         welcome_frame.pack(pady=(10, 0))
@@ -312,18 +517,23 @@ class BakeryApp(ctk.CTk):
                                           font=self.font_main, height=35)
         self.cust_name_ent.pack(pady=5, padx=20, fill="x")
         
-        # Product Dropdown
-        try:
-            df_p = pd.read_csv("bakery_inventory.csv")
-            prod_list = df_p["Product"].tolist() if not df_p.empty else ["No Items"]
-        except:
-            prod_list = ["No Items"]
-        
-        self.sale_opt = ctk.CTkOptionMenu(box, values=prod_list, font=self.font_main, fg_color=self.header_blue)
+        # Product Dropdown (values filled by refresh_pos_products)
+        self.sale_opt = ctk.CTkOptionMenu(box, values=["No Items"], font=self.font_main, fg_color=self.header_blue)
         self.sale_opt.pack(pady=5)
         
         self.sale_qty = ctk.CTkEntry(box, placeholder_text="Quantity", font=self.font_main, height=35)
         self.sale_qty.pack(pady=5, padx=20)
+        ctk.CTkButton(box, text="+ ADD TO CART", fg_color=self.header_blue,
+                      font=self.font_button, height=35, command=self.add_to_cart).pack(pady=5)
+
+        # Basket: every line is sold together by FINALIZE SALE
+        self.cart = Cart()
+        self.cart_frame = ctk.CTkFrame(box, fg_color="transparent")
+        self.cart_frame.pack(fill="x", padx=15)
+        self.cart_list = RecycledList(self.cart_frame, self.build_cart_row, self.update_cart_row,
+                                      pack_opts={"fill": "x", "pady": 1, "padx": 5})
+        self.cart_total = ctk.CTkLabel(box, text="", font=self.font_main, text_color=self.accent_navy)
+        self.cart_total.pack()
         
         ctk.CTkButton(box, text="FINALIZE SALE", fg_color=self.primary_pink, 
                       font=self.font_button, height=45, command=self.process_order).pack(pady=15)
@@ -332,180 +542,267 @@ class BakeryApp(ctk.CTk):
         ctk.CTkButton(self.col_sales, text="🖨️ PRINT PRODUCTION SHEET", 
                       fg_color="#4CAF50", text_color="white", font=self.font_button, 
                       height=45, command=self.print_preorders_range).pack(pady=10, padx=20, fill="x")
+        ctk.CTkButton(self.col_sales, text="🥐 BAKE PLAN (FORECAST)", 
+                      fg_color="#8D6E63", text_color="white", font=self.font_button, 
+                      height=45, command=self.open_bake_plan).pack(pady=(0, 10), padx=20, fill="x")
 
         # 4. PRE-ORDER LIST
         ctk.CTkLabel(self.col_sales, text="PENDING PRE-ORDERS", font=self.font_header, text_color=self.accent_navy).pack(pady=(15, 5))
         self.preorder_list_frame = ctk.CTkFrame(self.col_sales, fg_color="transparent")
         self.preorder_list_frame.pack(fill="both", expand=True)
-        self.display_preorders()
+        self.preorder_list = RecycledList(self.preorder_list_frame, self.build_preorder_row, self.update_preorder_row,
+                                          pack_opts={"fill": "x", "pady": 2, "padx": 10}, empty_text="(No pending orders)",
+                                          empty_opts={"font": self.font_main, "text_color": "gray"})
+
+    def refresh_pos_products(self):
+        """Updates the POS dropdown in place instead of rebuilding the order box"""
+        try:
+            df_p = self.store.get(INVENTORY_FILE)
+            prod_list = df_p["Product"].tolist() if not df_p.empty else ["No Items"]
+        except:
+            prod_list = ["No Items"]
+        self.sale_opt.configure(values=prod_list)
+        if self.sale_opt.get() not in prod_list: self.sale_opt.set(prod_list[0])
 
     def display_preorders(self):
         """Displays the list of pre-orders safely"""
-        for widget in self.preorder_list_frame.winfo_children():
-            widget.destroy()
-        if os.path.exists(self.preorder_file):
-            try:
-                df_pre = pd.read_csv(self.preorder_file)
-                if not df_pre.empty:
-                    for _, r in df_pre.tail(10).iterrows():
-                        row = ctk.CTkFrame(self.preorder_list_frame, fg_color="#FFF9C4", corner_radius=8)
-                        row.pack(fill="x", pady=2, padx=10)
-                        d, i, q = r.get('Date', 'N/A'), r.get('Item', 'Unknown'), r.get('Qty', '0')
-                        ctk.CTkLabel(row, text=f"📅 {d} | {i} (x{q})", font=("Segoe UI", 11, "bold"), text_color="#5D4037").pack(pady=8, padx=10, side="left")
-                else:
-                    ctk.CTkLabel(self.preorder_list_frame, text="(No pending orders)", font=self.font_main, text_color="gray").pack(pady=20)
-            except: pass
+        try:
+            df_pre = self.store.get(self.preorder_file).tail(10)
+            self.preorder_list.set_items((i, (d, c, prod, q)) for i, d, c, prod, q in zip(df_pre.index, df_pre['Date'], df_pre['Customer'], df_pre['Product'], df_pre['Qty']))
+        except: pass
+
+    def build_preorder_row(self, slot):
+        slot.frame = ctk.CTkFrame(self.preorder_list_frame, fg_color="#FFF9C4", corner_radius=8)
+        slot.widgets["label"] = ctk.CTkLabel(slot.frame, text="", font=("Segoe UI", 11, "bold"), text_color="#5D4037")
+        slot.widgets["label"].pack(pady=8, padx=10, side="left")
+
+    def update_preorder_row(self, slot, data):
+        d, c, prod, q = data
+        slot.widgets["label"].configure(text=f"📅 {d} | {c}: {prod} (x{q})" if c else f"📅 {d} | {prod} (x{q})")
 
     def print_preorders_range(self):
         """Pop-up window for Date Range printing"""
-        pop = ctk.CTkToplevel(self)
-        pop.geometry("400x400")
-        pop.title("Print Production Sheet")
-        pop.attributes("-topmost", True)
+        self.popup("Print Production Sheet", "400x400", self.build_print_window)
+
+    def build_print_window(self, pop):
+        import pandas as pd
+        from bakery import reports
         ctk.CTkLabel(pop, text="Filter Production Date", font=self.font_header).pack(pady=20)
         
-        s_ent = ctk.CTkEntry(pop, placeholder_text="Start (YYYY-MM-DD)", width=250)
-        s_ent.pack(pady=5); s_ent.insert(0, datetime.now().strftime("%Y-%m-%d"))
-        e_ent = ctk.CTkEntry(pop, placeholder_text="End (YYYY-MM-DD)", width=250)
-        e_ent.pack(pady=5); e_ent.insert(0, datetime.now().strftime("%Y-%m-%d"))
+        s_ent = ctk.CTkEntry(pop, placeholder_text="Start (YYYY-MM-DD)", width=250); s_ent.pack(pady=5)
+        e_ent = ctk.CTkEntry(pop, placeholder_text="End (YYYY-MM-DD)", width=250); e_ent.pack(pady=5)
+
+        def on_show():
+            for ent in (s_ent, e_ent):
+                ent.delete(0, "end"); ent.insert(0, datetime.now().strftime("%Y-%m-%d"))
 
         def execute_print():
-            try:
-                sd, ed = s_ent.get(), e_ent.get()
-                df = pd.read_csv(self.preorder_file)
-                df['Date'] = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d')
-                filt = df.loc[(df['Date'] >= sd) & (df['Date'] <= ed)]
-                if filt.empty: return mbox.showwarning("Empty", "No orders in range")
-                
-                fname = f"Production_{sd}.txt"
-                with open(fname, "w", encoding="utf-8") as f:
-                    f.write(f"PRODUCTION LIST: {sd} to {ed}\n" + "="*40 + "\n")
-                    for _, r in filt.iterrows():
-                        f.write(f"{r['Date']} | {str(r.get('Item'))[:20]:<20} | x{r.get('Qty')}\n")
+            try: sd, ed = pd.Timestamp(s_ent.get()), pd.Timestamp(e_ent.get())
+            except ValueError: return mbox.showerror("Print Error", "Dates must be YYYY-MM-DD")
+            if pd.isna(sd) or pd.isna(ed): return mbox.showerror("Print Error", "Dates must be YYYY-MM-DD") # blank entry
+            plan = self.planner.plan(sd, ed) # One vectorized pass: units per product -> materials vs stock
+            def done(fname):
+                self.on_task_finished()
+                if fname is None: return mbox.showwarning("Empty", "No orders in range")
                 os.startfile(fname, "print")
-                pop.destroy()
-            except Exception as ex: mbox.showerror("Error", str(ex))
+                if pop.winfo_exists(): pop.withdraw()
+            self.run_report("Production Sheet", reports.write_production_sheet, f"Production_{sd:%Y-%m-%d}.txt", plan, on_done=done)
 
         ctk.CTkButton(pop, text="CONFIRM PRINT", command=execute_print, fg_color=self.header_blue).pack(pady=20)
+        return on_show
+
+    def open_bake_plan(self):
+        """Tomorrow's bake quantities: same-weekday demand forecast plus pending pre-orders"""
+        self.popup("Bake Plan", "560x600", self.build_bake_plan)
+
+    def build_bake_plan(self, pop):
+        import pandas as pd
+        from bakery import reports
+        ctk.CTkLabel(pop, text="Bake Plan", font=self.font_header).pack(pady=15)
+        bar = ctk.CTkFrame(pop, fg_color="transparent"); bar.pack(pady=5)
+        day_ent = ctk.CTkEntry(bar, placeholder_text="Bake day (YYYY-MM-DD)", width=140); day_ent.pack(side="left", padx=5)
+        methods = {"Smoothed": "ewm", "Moving avg": "ma"}
+        method = ctk.CTkOptionMenu(bar, values=list(methods), width=120, fg_color=self.header_blue); method.pack(side="left", padx=5)
+        table = ctk.CTkTextbox(pop, font=("Consolas", 13), wrap="none")
+        table.pack(fill="both", expand=True, padx=15, pady=10)
+        state = {"plan": None, "day": None, "method": None}
+
+        def forecast():
+            try: day = pd.Timestamp(day_ent.get())
+            except ValueError: return mbox.showerror("Bake Plan", "Bake day must be YYYY-MM-DD")
+            if pd.isna(day): return mbox.showerror("Bake Plan", "Bake day must be YYYY-MM-DD") # blank entry
+            day = day.normalize()
+            def done(plan):
+                self.on_task_finished()
+                state.update(plan=plan, day=day, method=methods[method.get()])
+                if not pop.winfo_exists(): return
+                table.configure(state="normal"); table.delete("1.0", "end")
+                table.insert("1.0", f"{day:%A %Y-%m-%d}\n\n" + reports.format_bake_plan(plan)); table.configure(state="disabled")
+            # Only the sales added since the last plan are rolled up, on the worker pool
+            self.run_report("Bake Plan", self.analytics.bake_plan, self.store.sales.sizes(), day, self.planner.orders(day, day),
+                            methods[method.get()], list(self.store.get(INVENTORY_FILE)['Product']), on_done=done)
+
+        def export():
+            if state["plan"] is None: return mbox.showwarning("Bake Plan", "Run a forecast first")
+            def done(path):
+                self.on_task_finished(); os.startfile(path)
+            self.run_report("Bake Plan", reports.write_bake_plan, f"Bake_Plan_{state['day']:%Y-%m-%d}.txt",
+                            self.bakery_name, state["day"], state["plan"], state["method"], on_done=done)
+
+        ctk.CTkButton(bar, text="Forecast", width=90, fg_color=self.header_blue, command=forecast).pack(side="left", padx=5)
+        ctk.CTkButton(bar, text="Export", width=80, fg_color="#4CAF50", command=export).pack(side="left", padx=5)
+        def on_show():
+            day_ent.delete(0, "end"); day_ent.insert(0, (pd.Timestamp.now() + pd.Timedelta(days=1)).strftime("%Y-%m-%d"))
+            forecast()
+        return on_show
 
     def refresh_top_stats(self):
-        for widget in self.top_frame.winfo_children(): 
-            if isinstance(widget, ctk.CTkFrame): widget.destroy()
         try:
             # Load Data
-            df_s = pd.read_csv("sales_records.csv")
-            df_i = pd.read_csv("ingredients.csv")
-            
-            # Convert Dates
-            df_s['Date'] = pd.to_datetime(df_s['Date'], errors='coerce')
             now = datetime.now()
             
-            # Calculations
-            today_sales = df_s[df_s['Date'].dt.date == now.date()]['Total'].sum()
-            month_sales = df_s[df_s['Date'].dt.month == now.month]['Total'].sum()
+            # Running totals (kept up to date by each sale/expense, keyed by year-month)
+            today_sales = self.rollups.day_sales(now)
+            month_sales = self.rollups.month_sales(now)
             
             # Total Expenses (Materials + Admin)
-            month_exp = pd.to_numeric(df_i['Cost'], errors='coerce').sum()
+            month_exp = self.rollups.month_expenses(now)
             
             # Profit
             month_profit = month_sales - month_exp
 
-            # Display Cards
-            self.create_stat_card(self.top_frame, "Today's Sales", f"₱{today_sales:,.2f}", "#2E7D32", 0)
-            self.create_stat_card(self.top_frame, "Month's Sales", f"₱{month_sales:,.2f}", self.header_blue, 1)
-            self.create_stat_card(self.top_frame, "Month's Expenses", f"₱{month_exp:,.2f}", "#C62828", 2)
-            self.create_stat_card(self.top_frame, "Month's Profit", f"₱{month_profit:,.2f}", "#D47088", 3)
+            # Display Cards (built on first refresh, then only their values change)
+            cards = [("Today's Sales", today_sales, "#2E7D32"), ("Month's Sales", month_sales, self.header_blue),
+                     ("Month's Expenses", month_exp, "#C62828"), ("Month's Profit", month_profit, "#D47088")]
+            for i, (title, val, color) in enumerate(cards):
+                if title in self.stat_cards: self.stat_cards[title].value.configure(text=f"₱{val:,.2f}")
+                else: self.stat_cards[title] = self.create_stat_card(self.top_frame, title, f"₱{val:,.2f}", color, i)
             
         except Exception as e:
             print(f"Stats Error: {e}")
 
     def refresh_inventory_list(self):
-        for widget in self.col_inv.winfo_children(): widget.destroy()
-        df = pd.read_csv("bakery_inventory.csv")
-        for _, r in df.iterrows():
-            # --- RESTORED LOW STOCK LOGIC ---
-            is_low = int(r['Stock']) < 10
-            row = ctk.CTkFrame(self.col_inv, fg_color=("#FFF5F5" if is_low else "white"), corner_radius=10, border_width=(1 if is_low else 0), border_color="red")
-            row.pack(fill="x", pady=4, padx=5)
-            ctk.CTkLabel(row, text=f"{r['Product']} | ₱{r['Price']} (Stock: {r['Stock']})" + (" ⚠️" if is_low else ""), font=("Segoe UI", 14, ("bold" if is_low else "normal")), text_color=("#C62828" if is_low else "black")).pack(side="left", padx=15, pady=8)
-            # --------------------------------
-            ctk.CTkButton(row, text="🗑️", width=35, height=30, fg_color="#FFEBEE", text_color="red", command=lambda n=r['Product']: self.delete_product(n)).pack(side="right", padx=10)
+        df = self.store.get(INVENTORY_FILE)
+        self.inv_list.set_items((p, (p, price, stock)) for p, price, stock in zip(df['Product'], df['Price'], df['Stock']))
+
+    def build_inventory_row(self, slot):
+        slot.frame = ctk.CTkFrame(self.col_inv, corner_radius=10, border_color="red")
+        slot.widgets["label"] = ctk.CTkLabel(slot.frame, text="")
+        slot.widgets["label"].pack(side="left", padx=15, pady=8)
+        ctk.CTkButton(slot.frame, text="🗑️", width=35, height=30, fg_color="#FFEBEE", text_color="red", command=lambda: self.delete_product(slot.key)).pack(side="right", padx=10)
+
+    def update_inventory_row(self, slot, data):
+        prod, price, stock = data
+        # --- RESTORED LOW STOCK LOGIC ---
+        is_low = int(stock) < 10
+        slot.frame.configure(fg_color=("#FFF5F5" if is_low else "white"), border_width=(1 if is_low else 0))
+        slot.widgets["label"].configure(text=f"{prod} | ₱{price} (Stock: {stock})" + (" ⚠️" if is_low else ""), font=("Segoe UI", 14, ("bold" if is_low else "normal")), text_color=("#C62828" if is_low else "black"))
 
     def refresh_ingredients_list(self):
         """Refreshes the Raw Materials column with Qty and Low Stock Alerts"""
-        for widget in self.col_restock.winfo_children(): 
-            widget.destroy()
-            
-        df = pd.read_csv("ingredients.csv")
-        for _, r in df.iterrows():
-            if "[ADMIN]" in str(r['Ingredient']): continue
-            
-            # --- STOCK LOGIC ---
-            try: 
-                val_str = ''.join(c for c in str(r['Qty']) if c.isdigit() or c == '-')
-                val = float(val_str) if val_str else 0
-            except: val = 0
-                
-            is_low = val < 10 
-            
-            # --- UI ROW ---
-            row = ctk.CTkFrame(self.col_restock, fg_color=("#FFF5F5" if is_low else "white"), corner_radius=10)
-            row.pack(fill="x", pady=4, padx=5)
-            
-            # Labels Name and Qty (Fixed the missing Qty section)
-            ctk.CTkLabel(row, text=f"{r['Ingredient']}: {r['Qty']}" + (" 🚨" if is_low else ""), 
-                         font=("Segoe UI", 14, ("bold" if is_low else "normal")), 
-                         text_color=("#C62828" if is_low else "black")).pack(side="left", padx=15, pady=8)
-            
-            ctk.CTkButton(row, text="🗑️", width=35, height=30, fg_color="#FFEBEE", text_color="red", 
-                          command=lambda n=r['Ingredient']: self.delete_ing(n)).pack(side="right", padx=10)
+        df = self.store.get(INGREDIENTS_FILE)
+        self.ing_list.set_items((n, (n, q)) for n, q in zip(df['Ingredient'], df['Qty']) if "[ADMIN]" not in str(n))
+
+    def build_ingredient_row(self, slot):
+        slot.frame = ctk.CTkFrame(self.col_restock, corner_radius=10)
+        slot.widgets["label"] = ctk.CTkLabel(slot.frame, text="")
+        slot.widgets["label"].pack(side="left", padx=15, pady=8)
+        ctk.CTkButton(slot.frame, text="🗑️", width=35, height=30, fg_color="#FFEBEE", text_color="red", 
+                      command=lambda: self.delete_ing(slot.key)).pack(side="right", padx=10)
+
+    def update_ingredient_row(self, slot, data):
+        name, qty = data
+        # --- STOCK LOGIC --- (Qty is already numeric in the store)
+        is_low = qty < 10
+        slot.frame.configure(fg_color=("#FFF5F5" if is_low else "white"))
+        # Labels Name and Qty (Fixed the missing Qty section)
+        slot.widgets["label"].configure(text=f"{name}: {qty}" + (" 🚨" if is_low else ""), 
+                                        font=("Segoe UI", 14, ("bold" if is_low else "normal")), 
+                                        text_color=("#C62828" if is_low else "black"))
+
+    def add_to_cart(self):
+        try: self.cart.add(self.sale_opt.get(), int(self.sale_qty.get()))
+        except ValueError:
+            mbox.showerror("Error", "Invalid entry!"); return False
+        self.sale_qty.delete(0, 'end')
+        self.refresh_cart()
+        return True
+
+    def remove_from_cart(self, prod):
+        self.cart.remove(prod)
+        self.refresh_cart()
+
+    def refresh_cart(self):
+        self.cart_list.set_items((p, (p, q)) for p, q in self.cart.lines.items())
+        self.cart_total.configure(text=f"{len(self.cart)} item(s) | Total: ₱{self.cart.total(self.store):,.2f}" if len(self.cart) else "")
+
+    def build_cart_row(self, slot):
+        slot.frame = ctk.CTkFrame(self.cart_frame, fg_color="#F5F5F5", corner_radius=8)
+        slot.widgets["label"] = ctk.CTkLabel(slot.frame, text="", font=("Segoe UI", 12))
+        slot.widgets["label"].pack(side="left", padx=10, pady=4)
+        ctk.CTkButton(slot.frame, text="✖", width=28, height=24, fg_color="#E57373",
+                      command=lambda: self.remove_from_cart(slot.key)).pack(side="right", padx=5)
+
+    def update_cart_row(self, slot, data):
+        prod, qty = data
+        slot.widgets["label"].configure(text=f"{prod} x{qty}")
 
     def process_order(self):
+        """Sells the whole cart (or just the entered line when the cart is empty) in one transaction"""
+        single = not len(self.cart) # a plain one-line sale, straight from the order box
+        if (single or self.sale_qty.get().strip()) and not self.add_to_cart(): # a line typed but not added yet goes in too
+            return
+        # One journal append covers every sale, stock decrement and recipe deduction in the basket
+        # Panels update themselves from the events it emits; ingredients are checked only for several products
+        sales = []
         try:
-            df_p = pd.read_csv("bakery_inventory.csv"); df_i = pd.read_csv("ingredients.csv")
-            prod, qty = self.sale_opt.get(), int(self.sale_qty.get()); idx = df_p.index[df_p['Product'] == prod][0]
-            if df_p.at[idx, 'Stock'] >= qty:
-                df_p.at[idx, 'Stock'] -= qty
-                with open(self.recipe_file, 'r') as f: recs = json.load(f)
-                if prod in recs:
-                    for ing, amt in recs[prod].items():
-                        if ing in df_i['Ingredient'].values:
-                            i_idx = df_i.index[df_i['Ingredient'] == ing][0]
-                            n_str = ''.join(c for c in str(df_i.at[i_idx, 'Qty']) if c.isdigit() or c == '.')
-                            df_i.at[i_idx, 'Qty'] = round(float(n_str or 0) - (amt * qty), 3)
-                df_p.to_csv("bakery_inventory.csv", index=False); df_i.to_csv("ingredients.csv", index=False)
-                pd.DataFrame([{"Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "Product": prod, "Qty": qty, "Total": (df_p.at[idx, 'Price'] * qty)}]).to_csv("sales_records.csv", mode="a", index=False, header=False)
-                self.refresh_all_data(); self.sale_qty.delete(0, 'end')
-            else: mbox.showwarning("Stock Alert", "Insufficient stock!")
-        except: mbox.showerror("Error", "Invalid entry!")
+            with metrics.span("checkout", "write"): sales, problems = self.cart.checkout(self.journal)
+        except ValueError as e: return mbox.showerror("Recipe Error", str(e)) # e.g. a loop hand-edited into recipes.json
+        except LockTimeout: return self.show_busy()
+        finally:
+            if single and not sales: # a failed plain sale leaves nothing behind, so a corrected retry starts clean
+                self.cart.clear(); self.refresh_cart()
+        if problems:
+            return mbox.showwarning("Stock Alert", "Nothing was sold:\n" + "\n".join(f"{prod}: {msg}" for prod, msg in problems))
+        self.refresh_cart()
 
     def open_add_product(self):
-        pop = ctk.CTkToplevel(self); pop.geometry("400x450"); pop.attributes("-topmost", True)
+        self.popup("Add Product", "400x450", self.build_add_product)
+
+    def build_add_product(self, pop):
+        import pandas as pd
         ctk.CTkLabel(pop, text="Add New Item", font=self.font_header).pack(pady=20)
         n = ctk.CTkEntry(pop, placeholder_text="Product Name", font=self.font_main); n.pack(pady=10)
         p = ctk.CTkEntry(pop, placeholder_text="Price (₱)", font=self.font_main); p.pack(pady=10)
         s = ctk.CTkEntry(pop, placeholder_text="Initial Stock", font=self.font_main); s.pack(pady=10)
         def save():
-            df = pd.read_csv("bakery_inventory.csv"); pd.concat([df, pd.DataFrame([{"Product": n.get(), "Price": float(p.get()), "Stock": int(s.get())}])]).to_csv("bakery_inventory.csv", index=False)
-            pop.destroy(); self.refresh_all_data()
+            row = pd.DataFrame([{"Product": n.get(), "Price": float(p.get()), "Stock": int(s.get())}])
+            try: self.store.edit(INVENTORY_FILE, lambda df: pd.concat([df, row]))
+            except LockTimeout: return self.show_busy()
+            pop.withdraw()
         ctk.CTkButton(pop, text="Add to Menu", font=self.font_button, command=save, fg_color=self.header_blue, height=45).pack(pady=30)
+        return lambda: [e.delete(0, "end") for e in (n, p, s)]
 
     def open_admin_expense(self):
-        pop = ctk.CTkToplevel(self); pop.geometry("400x350"); pop.attributes("-topmost", True)
+        self.popup("Admin Expense", "400x350", self.build_admin_expense)
+
+    def build_admin_expense(self, pop):
         ctk.CTkLabel(pop, text="Log Admin Expense", font=self.font_header).pack(pady=20)
         d = ctk.CTkEntry(pop, placeholder_text="Description", font=self.font_main); d.pack(pady=10)
         a = ctk.CTkEntry(pop, placeholder_text="Amount (₱)", font=self.font_main); a.pack(pady=10)
         def save():
-            df = pd.read_csv("ingredients.csv"); pd.concat([df, pd.DataFrame([{"Ingredient": f"[ADMIN] {d.get()}", "Qty": "1", "Cost": float(a.get())}])]).to_csv("ingredients.csv", index=False)
-            pop.destroy(); self.refresh_all_data()
+            try: self.journal.log_expense(f"[ADMIN] {d.get()}", float(a.get()))
+            except LockTimeout: return self.show_busy()
+            pop.withdraw()
         ctk.CTkButton(pop, text="Log Expense", font=self.font_button, command=save, fg_color="#E57373", height=45).pack(pady=30)
+        return lambda: [e.delete(0, "end") for e in (d, a)]
 
     def open_add_ingredient(self):
-        pop = ctk.CTkToplevel(self)
-        pop.geometry("400x500")
-        pop.attributes("-topmost", True)
-        pop.title("Material Manager")
-        
+        self.popup("Material Manager", "400x500", self.build_add_ingredient)
+
+    def build_add_ingredient(self, pop):
+        import pandas as pd
+        from bakery.stock import ingredient_row
         ctk.CTkLabel(pop, text="Register or Restock Material", font=self.font_header).pack(pady=20)
         
         n = ctk.CTkEntry(pop, placeholder_text="Ingredient Name", font=self.font_main, width=250)
@@ -518,45 +815,68 @@ class BakeryApp(ctk.CTk):
         def save():
             try:
                 name, add_qty, add_cost = n.get().strip(), float(q.get()), float(c.get())
-                df = pd.read_csv("ingredients.csv")
-                
-                if name in df['Ingredient'].values:
-                    idx = df.index[df['Ingredient'] == name][0]
-                    # Update existing stock (fixes negative values like your Flour: -4990)
-                    df.at[idx, 'Qty'] = float(df.at[idx, 'Qty']) + add_qty
-                    df.at[idx, 'Cost'] = float(df.at[idx, 'Cost']) + add_cost
-                else:
-                    # Create new entry
-                    df = pd.concat([df, pd.DataFrame([{"Ingredient": name, "Qty": add_qty, "Cost": add_cost}])])
-                
-                df.to_csv("ingredients.csv", index=False)
-                pop.destroy()
-                self.refresh_all_data()
+                if add_qty <= 0: raise ValueError("nothing to add")
+                with self.store.lock:
+                    # Restock is a journaled transaction: a new FIFO cost layer plus a purchase movement
+                    if not self.journal.restock(name, add_qty, add_cost):
+                        # Create new entry (empty), then buy into it like any restock
+                        row = pd.DataFrame([ingredient_row(name)])
+                        self.store.edit(INGREDIENTS_FILE, lambda df: pd.concat([df, row]))
+                        self.journal.restock(name, add_qty, add_cost)
+                pop.withdraw()
+            except LockTimeout:
+                self.show_busy()
             except:
                 mbox.showerror("Error", "Enter valid numbers for Qty and Cost")
 
         ctk.CTkButton(pop, text="Confirm Update", font=self.font_button, command=save, fg_color=self.header_blue, height=45).pack(pady=30)
+        return lambda: [e.delete(0, "end") for e in (n, q, c)]
 
     def open_recipe_manager(self):
-        pop = ctk.CTkToplevel(self); pop.geometry("450x450"); pop.attributes("-topmost", True)
+        """Stages recipe links (products or sub-recipes like 'Dough') and saves them in one write"""
+        self.popup("Recipe Linker", "450x560", self.build_recipe_manager)
+
+    def build_recipe_manager(self, pop):
         ctk.CTkLabel(pop, text="Recipe Linker", font=self.font_header).pack(pady=20)
-        df_p = pd.read_csv("bakery_inventory.csv"); df_i = pd.read_csv("ingredients.csv")
-        p_o = ctk.CTkOptionMenu(pop, values=df_p["Product"].tolist() if not df_p.empty else ["None"], font=self.font_main, fg_color=self.header_blue); p_o.pack(pady=10)
-        i_o = ctk.CTkOptionMenu(pop, values=[i for i in df_i["Ingredient"].tolist() if "[ADMIN]" not in i], font=self.font_main, fg_color=self.header_blue); i_o.pack(pady=10)
-        a_e = ctk.CTkEntry(pop, placeholder_text="Usage per piece", font=self.font_main); a_e.pack(pady=10)
+        # Type a new name here to start a sub-recipe
+        p_o = ctk.CTkComboBox(pop, values=["None"], font=self.font_main, width=250); p_o.pack(pady=10)
+        i_o = ctk.CTkOptionMenu(pop, values=["None"], font=self.font_main, fg_color=self.header_blue); i_o.pack(pady=10)
+        a_e = ctk.CTkEntry(pop, placeholder_text="Usage per piece (0 = unlink)", font=self.font_main); a_e.pack(pady=10)
+        staged = {}
+        staged_box = ctk.CTkTextbox(pop, height=120, font=("Consolas", 12)); staged_box.pack(pady=5, padx=20, fill="x")
+        def on_show():
+            df_p = self.store.get(INVENTORY_FILE); df_i = self.store.get(INGREDIENTS_FILE)
+            products = df_p["Product"].tolist()
+            subs = [r for r in self.store.recipes() if r not in products] # Sub-recipes: recipes that aren't on the menu
+            p_o.configure(values=(products + subs) or ["None"]); p_o.set(((products + subs) or ["None"])[0])
+            mats = [i for i in df_i["Ingredient"].tolist() if "[ADMIN]" not in i] + subs
+            i_o.configure(values=mats or ["None"]); i_o.set((mats or ["None"])[0])
+            staged.clear(); a_e.delete(0, "end"); staged_box.delete("1.0", "end")
+        def stage():
+            try: amt = float(a_e.get())
+            except ValueError: return mbox.showerror("Error", "Invalid entry!")
+            staged.setdefault(p_o.get().strip(), {})[i_o.get()] = amt
+            a_e.delete(0, 'end')
+            staged_box.delete("1.0", "end")
+            staged_box.insert("end", "\n".join(f"{prod} <- {ing}: {a:g}" for prod, parts in staged.items() for ing, a in parts.items()))
         def save():
-            with open(self.recipe_file, 'r') as f: r = json.load(f)
-            r.setdefault(p_o.get(), {})[i_o.get()] = float(a_e.get())
-            with open(self.recipe_file, 'w') as f: json.dump(r, f); pop.destroy()
-        ctk.CTkButton(pop, text="Link to Recipe", font=self.font_button, command=save, fg_color=self.header_blue, height=45).pack(pady=25)
+            try: self.store.update_recipes(staged)
+            except ValueError as e: return mbox.showerror("Recipe Error", str(e))
+            except LockTimeout: return self.show_busy()
+            pop.withdraw()
+        ctk.CTkButton(pop, text="+ Add Link", font=self.font_button, command=stage, fg_color="#5C6BC0", height=35).pack(pady=5)
+        ctk.CTkButton(pop, text="Save Recipes", font=self.font_button, command=save, fg_color=self.header_blue, height=45).pack(pady=15)
+        return on_show
 
     def delete_product(self, name):
         if mbox.askyesno("Delete", f"Remove {name}?"):
-            df = pd.read_csv("bakery_inventory.csv"); df[df['Product'] != name].to_csv("bakery_inventory.csv", index=False); self.refresh_all_data()
+            try: self.store.delete_row(INVENTORY_FILE, name)
+            except LockTimeout: self.show_busy()
 
     def delete_ing(self, name):
         if mbox.askyesno("Delete", f"Remove {name}?"):
-            df = pd.read_csv("ingredients.csv"); df[df['Ingredient'] != name].to_csv("ingredients.csv", index=False); self.refresh_all_data()
+            try: self.store.delete_row(INGREDIENTS_FILE, name)
+            except LockTimeout: self.show_busy()
 
 if __name__ == "__main__":
     app = BakeryApp(); app.mainloop()
@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from bakery.backup import BackupStore, BACKUP_DIR, capture, write_backup
+from bakery.datastore import DataStore, INVENTORY_FILE, INGREDIENTS_FILE, RECIPE_FILE
+from bakery.journal import SalesJournal
+from bakery.locking import LockTimeout
+
+
+@pytest.fixture
+def journal(tmp_path):
+    pd.DataFrame({"Product": ["Pandesal"], "Price": [5.0], "Stock": [100]}).to_csv(tmp_path / INVENTORY_FILE, index=False)
+    pd.DataFrame({"Ingredient": ["Flour"], "Qty": [10.0], "Cost": [500.0]}).to_csv(tmp_path / INGREDIENTS_FILE, index=False)
+    (tmp_path / RECIPE_FILE).write_text(json.dumps({"Pandesal": {"Flour": 0.1}}))
+    store = DataStore(str(tmp_path))
+    store.init_files()
+    return SalesJournal(store).open()
+
+
+def snapshot(folder, rels):
+    out = {}
+    for rel in rels:
+        with open(os.path.join(folder, *rel.split("/")), "rb") as f: out[rel] = f.read()
+    return out
+
+
+def test_backup_and_restore_round_trip(journal):
+    store, folder = journal.store, journal.store.folder
+    journal.sell("Pandesal", 2)
+    first = write_backup(capture(store), folder)
+    journal.sell("Pandesal", 3)  # grows the sales partition: the next backup stores only its tail
+    items = capture(store)
+    second = write_backup(items, folder)
+    saved = snapshot(folder, [rel for rel, _, _ in items])
+
+    backups = BackupStore(os.path.join(folder, BACKUP_DIR))
+    assert backups.names() == [first, second]
+    month = pd.Timestamp.now().strftime("%Y-%m")
+    before, after = (backups.load(n)["files"][f"sales/{month}.csv"] for n in (first, second))
+    assert after["chunks"][:1] == before["chunks"] and len(after["chunks"]) == 2
+
+    journal.sell("Pandesal", 4)
+    journal.compact()
+    os.remove(os.path.join(folder, "sales", f"{month}.csv"))
+    restored = backups.restore(second, folder)
+    assert sorted(saved) == restored
+    assert snapshot(folder, restored) == saved
+    again = SalesJournal(DataStore(folder)).open().store  # the journal came back too, and replays
+    assert list(again.sales.read()["Qty"]) == [2, 3]
+    assert int(again.get(INVENTORY_FILE).at[0, "Stock"]) == 95
+
+
+def test_restore_refuses_a_damaged_backup(journal):
+    folder = journal.store.folder
+    journal.sell("Pandesal", 1)
+    name = write_backup(capture(journal.store), folder)
+    backups = BackupStore(os.path.join(folder, BACKUP_DIR))
+    digest = backups.load(name)["files"][INVENTORY_FILE]["chunks"][0]
+    with open(backups._object_path(digest), "wb") as f: f.write(b"not gzip")
+    inventory = snapshot(folder, [INVENTORY_FILE])
+    with pytest.raises(Exception):
+        backups.restore(name, folder)
+    assert snapshot(folder, [INVENTORY_FILE]) == inventory  # nothing replaced
+
+
+def test_prune_waits_for_another_counter_s_backup(journal):
+    root = os.path.join(journal.store.folder, BACKUP_DIR)
+    theirs, ours = BackupStore(root), BackupStore(root, timeout=0.1)
+    stored, done = threading.Event(), threading.Event()
+
+    def backup_in_progress():  # another counter has stored an object but not yet its set file
+        with theirs._locked():
+            theirs.put(b"chunk of a backup being written")
+            stored.set(); done.wait(5)
+    t = threading.Thread(target=backup_in_progress)
+    t.start()
+    try:
+        stored.wait(5)
+        with pytest.raises(LockTimeout):
+            ours.prune()
+    finally:
+        done.set(); t.join()
+    assert len(os.listdir(os.path.join(root, "objects"))) == 1  # still there
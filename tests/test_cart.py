@@ -0,0 +1,46 @@
+import json
+
+import pandas as pd
+import pytest
+
+from bakery.cart import Cart
+from bakery.datastore import DataStore, INVENTORY_FILE, INGREDIENTS_FILE, RECIPE_FILE
+from bakery.journal import SalesJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    pd.DataFrame({"Product": ["Pandesal", "Ensaymada"], "Price": [5.0, 30.0], "Stock": [100, 20]}).to_csv(
+        tmp_path / INVENTORY_FILE, index=False)
+    pd.DataFrame({"Ingredient": ["Flour"], "Qty": [1.0], "Cost": [50.0]}).to_csv(tmp_path / INGREDIENTS_FILE, index=False)
+    (tmp_path / RECIPE_FILE).write_text(json.dumps({"Pandesal": {"Flour": 0.1}, "Ensaymada": {"Flour": 0.2}}))
+    store = DataStore(str(tmp_path))
+    store.init_files()
+    return SalesJournal(store).open()
+
+
+def test_lines_merge_by_product():
+    cart = Cart()
+    cart.add("Pandesal", 2); cart.add("Pandesal", 3)
+    assert cart.items() == [{"Product": "Pandesal", "Qty": 5}]
+    with pytest.raises(ValueError):
+        cart.add("Pandesal", 0)
+
+
+def test_one_product_basket_is_not_held_back_by_ingredients(journal):
+    cart = Cart()
+    cart.add("Pandesal", 20)  # needs 2.0 Flour, 1.0 on hand: sold, as a plain sale always was
+    sales, problems = cart.checkout(journal)
+    assert problems == [] and len(sales) == 1 and len(cart) == 0
+
+
+def test_several_products_are_checked_together(journal):
+    cart = Cart()
+    cart.add("Pandesal", 6); cart.add("Ensaymada", 3)  # 0.6 + 0.6 Flour > 1.0
+    sales, problems = cart.checkout(journal)
+    assert sales == [] and problems == [("Ensaymada", "not enough Flour for 3 Ensaymada")]
+    assert len(cart) == 2  # kept for the cashier to fix
+    cart.remove("Ensaymada")
+    cart.add("Ensaymada", 2)
+    sales, problems = cart.checkout(journal)
+    assert problems == [] and [s["Product"] for s in sales] == ["Pandesal", "Ensaymada"]
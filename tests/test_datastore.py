@@ -0,0 +1,26 @@
+import math
+
+import pytest
+
+from bakery.datastore import parse_number
+
+
+@pytest.mark.parametrize("cell, expected", [
+    ("25kg", 25.0),
+    (" -4.5 ", -4.5),
+    ("1,200g", 1200.0),
+    ("1,200,000", 1200000.0),
+    ("2'500 ml", 2500.0),
+    ("1,234.5", 1234.5),
+    (12, 12.0),
+    (0.25, 0.25),
+])
+def test_parse_number(cell, expected):
+    assert parse_number(cell) == expected
+
+
+def test_parse_number_default():
+    assert parse_number("n/a") == 0.0
+    assert parse_number("", default=None) is None
+    assert parse_number(float("nan")) == 0.0
+    assert math.isnan(parse_number("?", default=float("nan")))
@@ -0,0 +1,197 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from bakery.datastore import DataStore, INVENTORY_FILE, INGREDIENTS_FILE, RECIPE_FILE
+from bakery.events import RowsAppended
+from bakery.journal import SalesJournal, JOURNAL_FILE, PREVIOUS_JOURNAL_FILE
+from bakery.rollups import Rollups
+
+
+@pytest.fixture
+def folder(tmp_path):
+    pd.DataFrame({"Product": ["Pandesal", "Ensaymada"], "Price": [5.0, 30.0], "Stock": [100, 20]}).to_csv(
+        tmp_path / INVENTORY_FILE, index=False)
+    pd.DataFrame({"Ingredient": ["Flour", "Butter"], "Qty": [10.0, 2.0], "Cost": [500.0, 400.0]}).to_csv(
+        tmp_path / INGREDIENTS_FILE, index=False)
+    (tmp_path / RECIPE_FILE).write_text(json.dumps({"Pandesal": {"Flour": 0.1}, "Ensaymada": {"Flour": 0.2, "Butter": 0.1}}))
+    return str(tmp_path)
+
+
+def open_journal(folder, **kw):
+    store = DataStore(folder)
+    store.init_files()
+    return SalesJournal(store, **kw).open()
+
+
+def stock(store, prod):
+    return int(store.get(INVENTORY_FILE).set_index("Product").at[prod, "Stock"])
+
+
+def flour(store):
+    return float(store.get(INGREDIENTS_FILE).set_index("Ingredient").at["Flour", "Qty"])
+
+
+def test_sale_is_replayed_from_the_journal(folder):
+    journal = open_journal(folder)
+    assert journal.sell("Pandesal", 3)["Total"] == 15.0
+    assert stock(journal.store, "Pandesal") == 97
+
+    on_disk = pd.read_csv(os.path.join(folder, INVENTORY_FILE)).set_index("Product")
+    assert on_disk.at["Pandesal", "Stock"] == 100  # not compacted yet
+    again = open_journal(folder)
+    assert stock(again.store, "Pandesal") == 97
+    assert flour(again.store) == pytest.approx(9.7)
+    assert len(again.store.sales.read()) == 1  # replay doesn't append the sale twice
+
+
+def test_torn_last_line_is_dropped(folder):
+    journal = open_journal(folder)
+    journal.sell("Pandesal", 2)
+    path = os.path.join(folder, JOURNAL_FILE)
+    good = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b'{"seq": 99, "products": {"Pandesal": {"Sto')  # crash mid-write
+
+    again = open_journal(folder)
+    assert os.path.getsize(path) == good
+    assert stock(again.store, "Pandesal") == 98
+    again.sell("Pandesal", 1)  # the next line starts on a clean boundary
+    assert stock(open_journal(folder).store, "Pandesal") == 97
+
+
+def test_crash_before_partition_append_is_recovered(folder, monkeypatch):
+    journal = open_journal(folder)
+    journal.sell("Pandesal", 1)
+
+    def crash(*args, **kwargs):
+        raise SystemExit("power cut")
+    monkeypatch.setattr(journal.store, "append", crash)
+    with pytest.raises(SystemExit):
+        journal.sell("Ensaymada", 4)
+    assert len(journal.store.sales.read()) == 1
+    monkeypatch.undo()
+
+    again = open_journal(folder)
+    sales = again.store.sales.read()
+    assert list(sales["Product"]) == ["Pandesal", "Ensaymada"]
+    assert stock(again.store, "Ensaymada") == 16
+    assert list(again.store.movements.read()["Ingredient"]) == ["Flour", "Flour", "Butter"]  # nor were its movements
+    assert len(open_journal(folder).store.sales.read()) == 2  # recovered once only
+
+
+def test_compact_folds_the_journal_into_the_csvs(folder):
+    journal = open_journal(folder, compact_every=2)
+    journal.sell("Pandesal", 1)
+    journal.sell("Pandesal", 1)  # second transaction triggers compaction
+    on_disk = pd.read_csv(os.path.join(folder, INVENTORY_FILE)).set_index("Product")
+    assert on_disk.at["Pandesal", "Stock"] == 98
+    assert journal.count == 0
+    with open(os.path.join(folder, JOURNAL_FILE), "rb") as f:
+        assert "epoch" in json.loads(f.readline())
+        assert f.read() == b""
+    assert stock(open_journal(folder).store, "Pandesal") == 98
+
+
+def test_failed_line_records_nothing(folder):
+    journal = open_journal(folder)
+    sales, problems = journal.sell_many([{"Product": "Pandesal", "Qty": 2}, {"Product": "Croissant", "Qty": 1}])
+    assert sales == [] and problems == [(2, "unknown product 'Croissant'")]
+    assert stock(journal.store, "Pandesal") == 100
+    assert journal.seq == 0
+
+
+# ------------------------------------------
+# SEVERAL COUNTERS ON ONE FOLDER
+# ------------------------------------------
+def test_other_counter_catches_up_from_the_journal(folder):
+    a, b = open_journal(folder), open_journal(folder)
+    seen = []
+    b.store.events.subscribe(RowsAppended, lambda e: seen.extend(e.rows))
+    a.sell("Pandesal", 5)
+    assert b.store.sync()
+    assert stock(b.store, "Pandesal") == 95
+    assert flour(b.store) == pytest.approx(9.5)
+    assert [row["Product"] for row in seen] == ["Pandesal"]
+    b.sell("Pandesal", 1)  # checked against a's sale
+    a.store.sync()
+    assert stock(a.store, "Pandesal") == 94
+    assert not a.store.sync()  # nothing new
+
+
+def test_compaction_while_another_counter_is_behind(folder):
+    a, b = open_journal(folder), open_journal(folder)
+    a.sell("Pandesal", 2)
+    a.compact()  # b hasn't read that sale yet: it is only in transactions.journal.prev now
+    assert os.path.exists(os.path.join(folder, PREVIOUS_JOURNAL_FILE))
+    a.sell("Pandesal", 3)
+    assert b.catch_up() == 2
+    assert stock(b.store, "Pandesal") == 95
+    assert b.epoch == a.epoch
+
+
+def test_counter_that_slept_through_two_compactions_resyncs(folder):
+    a, b = open_journal(folder), open_journal(folder)
+    resynced = []
+    b.on_resync.append(lambda: resynced.append(True))
+    for qty in (1, 2):
+        a.sell("Pandesal", qty)
+        a.compact()
+    a.sell("Pandesal", 3)
+    b.catch_up()
+    assert resynced == [True]
+    assert stock(b.store, "Pandesal") == 94  # re-read from the CSVs, plus the new epoch
+    assert b.seq == a.seq
+
+
+def test_crash_before_partition_append_is_repaired_by_the_next_counter(folder, monkeypatch):
+    a, b = open_journal(folder), open_journal(folder)
+    rollups = Rollups(b.store).load()
+
+    def crash(*args, **kwargs):
+        raise SystemExit("power cut")
+    monkeypatch.setattr(a.store, "append", crash)
+    with pytest.raises(SystemExit):
+        a.sell("Ensaymada", 2)  # journaled, never reached sales/ or movements/
+    b.sell("Pandesal", 1)  # catches up first, and re-appends a's rows before its own
+
+    sales = b.store.sales.read()
+    assert list(sales["Product"]) == ["Ensaymada", "Pandesal"]
+    assert list(b.store.movements.read()["Ingredient"]) == ["Flour", "Butter", "Flour"]
+    assert rollups.day_sales(pd.Timestamp.now()) == 65.0  # each sale booked once
+    again = open_journal(folder)
+    assert len(again.store.sales.read()) == 2  # nothing appended twice on the next start
+    assert len(again.store.movements.read()) == 3
+
+
+def test_backdated_sales_book_their_materials_to_their_month(folder):
+    journal = open_journal(folder)
+    sales, _ = journal.sell_many([{"Product": "Pandesal", "Qty": 10, "Date": "2026-01-15 08:00"},
+                                  {"Product": "Ensaymada", "Qty": 1, "Date": "2026-01-15 08:00"},
+                                  {"Product": "Pandesal", "Qty": 5}])
+    assert len(sales) == 3
+    moves = journal.store.movements.read()
+    january = moves[moves["Date"] < "2026-02-01"]
+    assert list(january["Ingredient"]) == ["Flour", "Butter"]
+    assert january["Qty"].tolist() == pytest.approx([-1.2, -0.1])
+    assert list(moves.loc[moves["Date"] >= "2026-02-01", "Qty"]) == pytest.approx([-0.5])
+    assert flour(journal.store) == pytest.approx(8.3)
+    assert -moves["Cost"].sum() == pytest.approx(1.7 * 50 + 0.1 * 200)
+
+
+def test_legacy_import_keeps_repeated_admin_expenses(tmp_path):
+    pd.DataFrame({"Product": [" Pandesal", "Pandesal", ""], "Price": [5.0, 6.0, 1.0], "Stock": [100, 50, 1]}).to_csv(
+        tmp_path / INVENTORY_FILE, index=False)
+    pd.DataFrame({"Ingredient": ["Flour", "[ADMIN] Rent", "Flour ", "[ADMIN] Rent", "[ADMIN] Rent"],
+                  "Qty": ["10kg", 1, "5kg", 1, 1], "Cost": [500, 5000, 200, 5000, 5200]}).to_csv(
+        tmp_path / INGREDIENTS_FILE, index=False)
+    journal = open_journal(str(tmp_path))
+
+    products = pd.read_csv(tmp_path / INVENTORY_FILE)
+    assert list(products["Product"]) == ["Pandesal"] and products.at[0, "Price"] == 5.0
+    ingredients = pd.read_csv(tmp_path / INGREDIENTS_FILE)
+    assert list(ingredients["Ingredient"]) == ["Flour", "[ADMIN] Rent", "[ADMIN] Rent", "[ADMIN] Rent"]
+    assert ingredients.loc[ingredients["Ingredient"] == "[ADMIN] Rent", "Cost"].sum() == 15200
+    assert flour(journal.store) == 10.0
@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from bakery.locking import FolderLock, LockTimeout, LOCK_FILE
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / LOCK_FILE)
+
+
+def test_reentrant_within_a_process(path):
+    lock = FolderLock(path, timeout=0.2)
+    with lock:
+        with lock:  # nested blocks don't deadlock
+            assert lock._depth == 2
+        assert lock._depth == 1
+    assert lock._depth == 0
+
+
+def test_second_counter_waits_then_times_out(path):
+    ours, theirs = FolderLock(path, timeout=0.1), FolderLock(path, timeout=0.1)
+    with ours:
+        with pytest.raises(LockTimeout, match="another counter"):
+            theirs.acquire()
+    with theirs:  # free again once released
+        with pytest.raises(LockTimeout):
+            ours.acquire()
+
+
+def test_timeout_leaves_the_lock_usable(path):
+    ours, theirs = FolderLock(path, timeout=0.05), FolderLock(path, timeout=0.05)
+    with ours:
+        for _ in range(3):
+            with pytest.raises(LockTimeout):
+                theirs.acquire()
+    with theirs:
+        assert theirs._depth == 1
+
+
+def test_serializes_threads_of_one_process(path):
+    lock = FolderLock(path, timeout=0.1)
+    errors = []
+
+    def other_thread():
+        try:
+            lock.acquire()
+        except LockTimeout as e:
+            errors.append(e)
+    with lock:
+        t = threading.Thread(target=other_thread)
+        t.start(); t.join()
+    assert len(errors) == 1 and "this process" in str(errors[0])
+
+    t = threading.Thread(target=lambda: (lock.acquire(), lock.release()))
+    t.start(); t.join()
+    assert lock._depth == 0
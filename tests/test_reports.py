@@ -0,0 +1,26 @@
+import pandas as pd
+
+from bakery import reports
+from bakery.partitions import SalesPartitions, SALES_COLUMNS
+from bakery.stock import MOVEMENTS_DIR, MOVEMENT_COLUMNS, ADMIN, PURCHASE, USE
+
+
+def test_ledger_charges_only_the_range_s_costs(tmp_path):
+    sales = SalesPartitions(str(tmp_path), columns=SALES_COLUMNS, legacy=None).open()
+    sales.append([{"Date": "2026-09-10 09:00:00", "Product": "Pandesal", "Qty": 2, "Total": 10.0},
+                  {"Date": "2026-10-02 09:00:00", "Product": "Pandesal", "Qty": 4, "Total": 20.0}])
+    moves = SalesPartitions(str(tmp_path), MOVEMENTS_DIR, MOVEMENT_COLUMNS, legacy=None).open()
+    moves.append([{"Date": "2026-09-01 08:00:00", "Ingredient": "Flour", "Kind": PURCHASE, "Qty": 10, "Cost": 500.0},
+                  {"Date": "2026-09-10 09:00:00", "Ingredient": "Flour", "Kind": USE, "Qty": -0.2, "Cost": -1.0},
+                  {"Date": "2026-09-30 18:00:00", "Ingredient": "[ADMIN] Rent", "Kind": ADMIN, "Qty": 1, "Cost": 800.0},
+                  {"Date": "2026-10-01 08:00:00", "Ingredient": "[ADMIN] Rent", "Kind": ADMIN, "Qty": 1, "Cost": 1000.0}])
+
+    lo, hi = pd.Timestamp("2026-09-01"), pd.Timestamp("2026-09-30")
+    path = reports.write_ledger(str(tmp_path / "ledger.txt"), "Test Bakery", sales.paths(lo, hi + pd.Timedelta(days=1)),
+                                lo, hi, moves.paths(lo, hi + pd.Timedelta(days=1)))
+    text = open(path, encoding="utf-8").read()
+    assert "OFFICIAL LEDGER - September 2026" in text
+    assert "Total Revenue:         ₱          10.00" in text
+    assert "Total Material Costs: (₱          1.00)" in text
+    assert "Total Admin Expenses: (₱        800.00)" in text  # not October's rent
+    assert "NET PROFIT:            ₱        -791.00" in text
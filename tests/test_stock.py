@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from bakery.stock import layers_of, receive, consume, materialize, ingredient_row
+
+
+def test_layers_of_reads_the_stored_layers():
+    assert layers_of(15.0, "[[10,2.0],[5,3.0]]", 2.5) == [[10, 2.0], [5, 3.0]]
+
+
+@pytest.mark.parametrize("text", ["", None, float("nan"), "not json", "[[10,2.0]]"])
+def test_layers_of_starts_over_from_qty(text):
+    # Blank or broken layers, and a Qty edited by hand (12, not 10): one layer at the row's unit cost
+    assert layers_of(12.0, text, 2.5) == [[12.0, 2.5]]
+
+
+def test_layers_of_an_empty_row():
+    assert layers_of(0.0, "", 2.5) == []
+    assert layers_of(0.0, "[[5,2.0]]", 2.5) == []  # emptied by hand
+
+
+def test_receive_appends_a_layer_per_price():
+    layers = receive([], 10, 20.0)
+    layers = receive(layers, 5, 15.0)
+    assert layers == [[10, 2.0], [5, 3.0]]
+
+
+def test_receive_merges_a_delivery_at_the_last_price():
+    assert receive([[10, 2.0], [5, 3.0]], 5, 15.0) == [[10, 2.0], [10.0, 3.0]]
+    assert receive([[5, 3.0], [10, 2.0]], 5, 15.0) == [[5, 3.0], [10, 2.0], [5, 3.0]]  # only the newest layer
+
+
+def test_receive_settles_what_was_owed_first():
+    assert receive([[-4, 2.0]], 10, 30.0) == [[6, 3.0]]
+    assert receive([[-4, 2.0]], 4, 12.0) == []
+    # Partly covered: the rest stays owed, revalued at the latest price
+    assert receive([[-4, 2.0]], 1, 3.0) == [[-3, 3.0]]
+
+
+def test_receive_needs_a_quantity():
+    with pytest.raises(ValueError):
+        receive([], 0, 10.0)
+
+
+def test_consume_takes_the_oldest_first():
+    layers, cost = consume([[10, 2.0], [5, 3.0]], 12, 2.5)
+    assert layers == [[3, 3.0]]
+    assert cost == pytest.approx(10 * 2.0 + 2 * 3.0)
+
+
+def test_consume_past_zero_owes_at_the_last_unit_cost():
+    layers, cost = consume([[2, 2.0]], 5, 2.5)
+    assert layers == [[-3, 2.5]]
+    assert cost == pytest.approx(2 * 2.0 + 3 * 2.5)
+    layers, cost = consume(layers, 1, 2.5)  # owing more
+    assert layers == [[-4, 2.5]] and cost == pytest.approx(2.5)
+
+
+def test_materialize():
+    row = materialize([[10, 2.0], [5, 3.0]], 0.0)
+    assert (row["Qty"], row["Cost"], row["Unit Cost"]) == (15, 35.0, round(35 / 15, 6))
+    assert json.loads(row["Layers"]) == [[10, 2.0], [5, 3.0]]
+    assert materialize([], 2.5)["Unit Cost"] == 2.5  # empty: keeps its last cost
+    assert materialize([[-3, 2.5]], 1.0)["Unit Cost"] == 2.5
+    assert materialize([[-3, 2.5]], 1.0)["Cost"] == -7.5
+
+
+def test_ingredient_row():
+    assert ingredient_row("Flour", 10, 500.0) == {"Ingredient": "Flour", "Qty": 10, "Cost": 500.0,
+                                                  "Unit Cost": 50.0, "Layers": "[[10,50.0]]"}
+    assert ingredient_row("Salt")["Qty"] == 0 and ingredient_row("Salt")["Layers"] == "[]"